@@ -0,0 +1,142 @@
+# command line entry point - runs a stage of the alignment pipeline, the whole pipeline, or the benchmarks.
+#
+# usage: python3 alignment_ml.py [--config ru] [--set key=value] [--log-level DEBUG] [--profile sample] <command> [options]
+#   download   download original language and target language resources
+#   ingest     load alignments into the database (--projects to load from projects instead of resources)
+#   twords     get original language words for the translation words
+#   training   generate alignment training data for translation words lemmas
+#   features   save feature store of all alignments for model training (--force to rebuild)
+#   scores     score how unusual each alignment is and save the ranked scores (--top N alignments in the CSV)
+#   warnings   generate alignment warnings reports
+#   pipeline   run all the stages, skipping stages whose inputs have not changed (--force to rerun)
+#   batch      run the pipeline for several configs (options of process_all_languages.py)
+#   bench      benchmark the pipeline stages (options of benchmarks/run_benchmarks.py)
+#
+# The stage modules (and pandas) are only imported when a command runs, so --help is quick.
+
+import sys
+import time
+import argparse
+import contextlib
+from datetime import timedelta
+import utils.instrument_utils as instrument
+import utils.profile_utils as profiler
+
+def loadConfig(configName, overrides = ()):
+    import config
+    cfg = config.loadConfig(configName, tuple(overrides))
+    config.ensureConfigFolders(cfg)
+    return cfg
+
+def runDownload(cfg, args):
+    import download_resource_files
+    download_resource_files.downloadResourceFiles(cfg)
+
+def runIngest(cfg, args):
+    if args.projects:
+        import db_load_alignments_from_projects
+        db_load_alignments_from_projects.downloadProjects(cfg)
+        db_load_alignments_from_projects.loadAlignmentsFromProjects(cfg)
+    else:
+        import db_load_alignments_from_resources
+        db_load_alignments_from_resources.loadAlignmentsFromResources(cfg)
+
+def runTWords(cfg, args):
+    import fetch_translation_words
+    fetch_translation_words.fetchTranslationWords(cfg)
+
+def runTraining(cfg, args):
+    import fetch_alignment_training_data
+    fetch_alignment_training_data.fetchAlignmentTrainingData(cfg)
+
+def runFeatures(cfg, args):
+    import fetch_alignment_training_data
+    fetch_alignment_training_data.fetchAlignmentFeatures(cfg, force=args.force)
+
+def runScores(cfg, args):
+    import score_alignments
+    score_alignments.scoreAlignments(cfg, top=args.top)
+
+def runWarnings(cfg, args):
+    import create_alignment_warning_csv
+    create_alignment_warning_csv.createAlignmentWarnings(cfg)
+
+def runPipeline(cfg, args):
+    import utils.system_utils as system
+    import alignment_pipeline
+    system.printSystemInfo()
+    alignment_pipeline.runAlignmentPipeline(cfg, fromProjects=args.projects, force=args.force, maxWorkers=args.workers)
+
+# commands that take the options of another script
+def runBatch(argv):
+    import process_all_languages
+    return process_all_languages.main(argv)
+
+def runBench(argv):
+    from benchmarks import run_benchmarks
+    return run_benchmarks.main(argv)
+
+passThroughCommands = {
+    'batch': runBatch,
+    'bench': runBench,
+}
+
+def getParser():
+    import config # only reads the config file names, configs are loaded by loadConfig
+    parser = argparse.ArgumentParser(prog='alignment_ml.py', description='Alignment pipeline stages')
+    parser.add_argument('--config', default=None,
+                        help='config name, e.g. ru for configs/config_ru.py (default from ALIGNMENT_CONFIG or config.py)')
+    config.addConfigArguments(parser)
+    parser.add_argument('--log-level', default=None, help='DEBUG, INFO, WARNING or ERROR (default from ALIGNMENT_LOG_LEVEL or INFO)')
+    profiler.addProfileArguments(parser)
+    subparsers = parser.add_subparsers(dest='command', metavar='command', required=True)
+
+    subparsers.add_parser('download', help='download resources').set_defaults(func=runDownload)
+    ingest = subparsers.add_parser('ingest', help='load alignments into the database')
+    ingest.add_argument('--projects', action='store_true', help='load alignments from projects instead of resources')
+    ingest.set_defaults(func=runIngest)
+    subparsers.add_parser('twords', help='get original language words for translation words').set_defaults(func=runTWords)
+    subparsers.add_parser('training', help='generate alignment training data').set_defaults(func=runTraining)
+    features = subparsers.add_parser('features', help='save feature store for model training')
+    features.add_argument('--force', action='store_true', help='rebuild even if the database has not changed')
+    features.set_defaults(func=runFeatures)
+    scores = subparsers.add_parser('scores', help='score alignments for how unusual they are')
+    scores.add_argument('--top', type=int, default=None, help='number of highest scoring alignments saved to the CSV')
+    scores.set_defaults(func=runScores)
+    subparsers.add_parser('warnings', help='generate alignment warnings reports').set_defaults(func=runWarnings)
+    pipeline = subparsers.add_parser('pipeline', help='run all the stages')
+    pipeline.add_argument('--projects', action='store_true', help='load alignments from projects instead of resources')
+    pipeline.add_argument('--force', action='store_true', help='rerun stages even if inputs have not changed')
+    pipeline.add_argument('--workers', type=int, default=4, help='number of stages run at once')
+    pipeline.set_defaults(func=runPipeline, profileCommand=False) # each stage is profiled by the pipeline
+
+    # all the options after these commands are passed on (including --profile), use `<command> --help` for them
+    subparsers.add_parser('batch', add_help=False, help='run the pipeline for several configs')
+    subparsers.add_parser('bench', add_help=False, help='benchmark the pipeline stages')
+    return parser
+
+def main(argv = None):
+    parser = getParser()
+    args, extra = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+    if args.command in passThroughCommands:
+        return passThroughCommands[args.command](extra)
+    if extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+
+    instrument.configureLogging(args.log_level)
+    profiler.configureProfilingFromArgs(args)
+    try:
+        cfg = loadConfig(args.config, args.configOverrides)
+    except ValueError as e: # bad --set
+        parser.error(str(e))
+
+    start = time.time()
+    profiled = profiler.profiled(args.command) if getattr(args, 'profileCommand', True) else contextlib.nullcontext()
+    with instrument.timed(f'command.{args.command}'), profiled:
+        args.func(cfg, args)
+    instrument.logReport()
+    elapsed = str(timedelta(seconds=time.time() - start))
+    print(f'{args.command}, total elapsed time: {elapsed}')
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+# pipeline of stages from downloading resources through generating warnings.  Each stage declares its inputs and
+#   outputs so stages whose inputs have not changed are skipped, and independent stages run concurrently.
+
+import utils.db_utils as db
+import utils.pipeline_utils as pipeline
+import utils.feature_utils as features
+import config
+import download_resource_files
+import db_load_alignments_from_projects
+import db_load_alignments_from_resources
+import fetch_translation_words
+import fetch_alignment_training_data
+import create_alignment_warning_csv
+import score_alignments
+
+def getStatePath(cfg):
+    return f"{cfg['baseDataPath']}/pipeline_state.json"
+
+def getTrainingDataPaths(cfg, type_):
+    basePath = f"{cfg['trainingDataPath']}/{type_}_{cfg['targetBibleType']}_{cfg['testamentStr']}_alignments"
+    minAlignments = fetch_alignment_training_data.minAlignments
+    return [ f"{basePath}_filtered_{minAlignments}.json", f"{basePath}_all.json" ]
+
+def getWarningsPaths(cfg, type_, minAlignments=0):
+    basePath = f"{cfg['baseDataPath']}/{type_}_{cfg['targetBibleType']}_{cfg['testamentStr']}"
+    return [ f"{basePath}_warnings_{minAlignments}.csv", f"{basePath}_summary.csv" ]
+
+def getTWordsInputs(cfg, type_):
+    if cfg.get('tWordsUseEnUlt', False):
+        enUltPath = fetch_translation_words.enUltPath
+        testamentStr = cfg['testamentStr']
+        return [ f'{enUltPath}/{type_}_en_ult_{testamentStr}_{ext}' for ext in ['lemmas.csv', 'lemmas.json', 'quotes.json'] ]
+
+    # greek groups folder, not the whole type folder which also has the quotes cache (see bible.harvestTwordsQuotes)
+    return [ cfg['dbPath'], f"{cfg['tWordsGreekPath']}/{type_}/groups", f"{cfg['tWordsTargetPath']}/{type_}" ]
+
+def getOrigLangPath(cfg, fromProjects=True):
+    if fromProjects:
+        return cfg['origLangPath']
+    return cfg['origLangPathGreek']
+
+def getOrigLangStages(cfg, fromProjects=True):
+    stages = [
+        pipeline.Stage('download_orig_lang',
+                       lambda: download_resource_files.downloadOrigLangResources(cfg),
+                       outputs=[getOrigLangPath(cfg, fromProjects), cfg['tWordsGreekPath']],
+                       params=[cfg['origLangResourceUrl'], cfg['origLangVersion']])
+    ]
+    return stages
+
+# if includeOrigLang is False, the original language download is left out (e.g. when shared by a batch run)
+def getPipelineStages(cfg, fromProjects=True, includeOrigLang=True):
+    dbPath = cfg['dbPath']
+    dbPathOwIdx = db.getOrigLangIndexSqlPath(dbPath)
+    tWordsTypeList = cfg['tWordsTypeList']
+    stages = []
+
+    ############################################
+    # download resources
+
+    if includeOrigLang:
+        stages.extend(getOrigLangStages(cfg, fromProjects))
+    stages.append(pipeline.Stage('download_target_twords',
+                                 lambda: download_resource_files.downloadTargetTWords(cfg),
+                                 outputs=[cfg['tWordsTargetPath']],
+                                 params=[cfg['targetTWordsLangResourceUrl'], cfg['targetLangTWordsVersion']]))
+
+    ############################################
+    # extract alignments
+
+    if fromProjects:
+        projectsFolder = db_load_alignments_from_projects.getProjectsFolder(cfg)
+        stages.append(pipeline.Stage('download_projects',
+                                     lambda: db_load_alignments_from_projects.downloadProjects(cfg),
+                                     outputs=[projectsFolder],
+                                     params=[cfg['projectsUrl'], cfg['targetBibleType'], cfg['newTestament']]))
+        stages.append(pipeline.Stage('ingest',
+                                     lambda: db_load_alignments_from_projects.loadAlignmentsFromProjects(cfg),
+                                     inputs=[getOrigLangPath(cfg, fromProjects), projectsFolder],
+                                     outputs=[dbPath, dbPathOwIdx],
+                                     dependsOn=['download_orig_lang', 'download_projects']))
+    else:
+        stages.append(pipeline.Stage('download_target_bible',
+                                     lambda: download_resource_files.downloadTargetBible(cfg),
+                                     outputs=[cfg['targetLanguagePath']],
+                                     params=[cfg['targetBibleLangResourceUrl'], cfg['targetLangBibleVersion']]))
+        stages.append(pipeline.Stage('ingest',
+                                     lambda: db_load_alignments_from_resources.loadAlignmentsFromResources(cfg),
+                                     inputs=[getOrigLangPath(cfg, fromProjects), cfg['targetLanguagePath']],
+                                     outputs=[dbPath, dbPathOwIdx],
+                                     dependsOn=['download_orig_lang', 'download_target_bible']))
+
+    ############################################
+    # get original language words for tWords and generate ML training data - each type is independent
+
+    for type_ in tWordsTypeList:
+        quotesPath, lemmasPath = config.getTwordsPath(cfg, type_, cfg['targetBibleType'])
+        stages.append(pipeline.Stage(f'twords_{type_}',
+                                     lambda type_=type_: fetch_translation_words.fetchTranslationWordsForType(cfg, type_),
+                                     inputs=getTWordsInputs(cfg, type_),
+                                     outputs=[quotesPath, lemmasPath],
+                                     dependsOn=['ingest', 'download_orig_lang', 'download_target_twords']))
+        stages.append(pipeline.Stage(f'training_{type_}',
+                                     lambda type_=type_: fetch_alignment_training_data.fetchAlignmentTrainingDataForType(cfg, type_),
+                                     inputs=[dbPathOwIdx, lemmasPath],
+                                     outputs=getTrainingDataPaths(cfg, type_),
+                                     dependsOn=['ingest', f'twords_{type_}'],
+                                     params=[fetch_alignment_training_data.minAlignments]))
+
+    # feature store for model training - the pipeline decides when to rebuild, so it is forced
+    stages.append(pipeline.Stage('features',
+                                 lambda: fetch_alignment_training_data.fetchAlignmentFeatures(cfg, force=True),
+                                 inputs=[dbPath, dbPathOwIdx],
+                                 outputs=[f"{fetch_alignment_training_data.getFeatureStorePath(cfg)}/{features.metadataFile}"],
+                                 dependsOn=['ingest']))
+
+    featuresPath = f"{fetch_alignment_training_data.getFeatureStorePath(cfg)}/{features.metadataFile}"
+    stages.append(pipeline.Stage('scores',
+                                 lambda: score_alignments.scoreAlignments(cfg),
+                                 inputs=[featuresPath],
+                                 outputs=[db.getScoresSqlPath(dbPath), score_alignments.getScoresCsvPath(cfg)],
+                                 dependsOn=['features'],
+                                 params=[cfg.get('anomalyScoresTop', score_alignments.defaultTop)]))
+
+    ############################################
+    # generate warnings reports
+
+    if cfg.get('processAllAlignments', True):
+        stages.append(pipeline.Stage('warnings_all_alignments',
+                                     lambda: create_alignment_warning_csv.createAllAlignmentsWarnings(cfg),
+                                     inputs=[dbPathOwIdx],
+                                     outputs=getWarningsPaths(cfg, 'all_alignments'),
+                                     dependsOn=['ingest'],
+                                     params=create_alignment_warning_csv.getThresholds(cfg)))
+
+    if cfg.get('processTWordsAlignments', True):
+        warningTypes = create_alignment_warning_csv.tWordsWarningTypes
+        trainingInputs = []
+        for type_ in warningTypes:
+            trainingInputs.extend(getTrainingDataPaths(cfg, type_))
+        stages.append(pipeline.Stage('warnings_twords',
+                                     lambda: create_alignment_warning_csv.createTWordsWarnings(cfg),
+                                     inputs=trainingInputs,
+                                     outputs=getWarningsPaths(cfg, 'kt') + getWarningsPaths(cfg, 'all_twords'),
+                                     dependsOn=[f'training_{type_}' for type_ in warningTypes if type_ in tWordsTypeList],
+                                     params=create_alignment_warning_csv.getThresholds(cfg)))
+
+    if not includeOrigLang:
+        for stage in stages:
+            stage.dependsOn = [ name for name in stage.dependsOn if name != 'download_orig_lang' ]
+
+    return stages
+
+def runAlignmentPipeline(cfg, fromProjects=True, force=False, maxWorkers=4, includeOrigLang=True):
+    config.ensureConfigFolders(cfg)
+    stages = getPipelineStages(cfg, fromProjects, includeOrigLang)
+    return pipeline.runPipeline(stages, getStatePath(cfg), maxWorkers, force)
@@ -0,0 +1,157 @@
+# make a benchmark corpus by sampling the verses of an existing alignments database.  The sampled verses are written
+#   in the same formats the pipeline reads: original language chapters ({origLangPath}/{book}/{chapter}.json) and
+#   target language chapters with nested alignments ({alignmentsFolder}/{book}/{chapter}.json, as loaded by
+#   db_load_alignments_from_resources), plus a lemmas list for saveAlignmentDataForLemmas.
+#
+# usage: python3 -m benchmarks.corpus --db ./data/ru/rlob/alignments_NT.sqlite --output ./benchmarks/corpus [--fraction 0.5]
+
+import os
+import sys
+import json
+import random
+import argparse
+import utils.db_utils as db
+import utils.bible_utils as bible
+import utils.file_utils as file
+
+corpusInfoFile = 'corpus.json'
+
+def getVerseKey(item):
+    return (item['book_id'], item['chapter'], item['verse'])
+
+def sampleVerses(connection, fraction, seed):
+    query = f"SELECT DISTINCT book_id, chapter, verse FROM {db.alignment_table} ORDER BY id;"
+    verses = [ tuple(row) for row in db.execute_read_query(connection, query) ]
+    if fraction >= 1:
+        return verses
+    count = max(1, round(len(verses) * fraction))
+    sampled = set(random.Random(seed).sample(verses, count))
+    return [ verse for verse in verses if verse in sampled ] # keep reading order
+
+def getOrigWordObject(word):
+    return {
+        'type': 'word',
+        'tag': 'w',
+        'text': word['word'],
+        'lemma': word['lemma'],
+        'strong': word['strong'],
+        'morph': word['morph'],
+        'occurrence': word['occurrence'],
+    }
+
+# nest a zaln milestone for each original word, with the target words inside the last one
+def getAlignmentObject(origWords, targetObjects):
+    children = targetObjects
+    for word in reversed(origWords):
+        milestone = getOrigWordObject(word)
+        milestone.update({ 'type': 'milestone', 'tag': 'zaln', 'content': word['word'], 'children': children })
+        del milestone['text']
+        children = [ milestone ]
+    return children[0]
+
+def getTargetVerseObjects(alignments):
+    verseObjects = []
+    occurrences = {}
+    for alignment in sorted(alignments, key=lambda a: a['alignment_num']):
+        targetObjects = []
+        for word in json.loads(alignment['target_lang_words']):
+            text = word['word']
+            occurrences[text] = occurrences.get(text, 0) + 1 # numbered in the order they are written
+            targetObjects.append({ 'type': 'word', 'tag': 'w', 'text': text, 'occurrence': occurrences[text] })
+        origWords = json.loads(alignment['orig_lang_words'])
+        if origWords:
+            verseObjects.append(getAlignmentObject(origWords, targetObjects))
+    return verseObjects
+
+def writeChapters(baseFolder, chapters):
+    for (bookId, chapter), verses in chapters.items():
+        file.ensureFolderExists(f"{baseFolder}/{bookId}")
+        file.writeJsonFile(f"{baseFolder}/{bookId}/{chapter}.json", verses)
+
+# every chapter of a book is read, so chapters without sampled verses are written empty
+def addEmptyChapters(chapters, books):
+    for bookId in books:
+        for chapter in bible.getChaptersForBook(bookId):
+            chapters.setdefault((bookId, chapter), {})
+
+def getTopLemmas(connection, verses, lemmaCount):
+    sampled = set(verses)
+    counts = {}
+    for word in db.fetchRecordsIter(connection, db.original_words_table):
+        if getVerseKey(word) in sampled and word['lemma']:
+            lemma = counts.setdefault(word['lemma'], { 'count': 0, 'strong': word['strong'] })
+            lemma['count'] += 1
+    top = sorted(counts.items(), key=lambda item: -item[1]['count'])[:lemmaCount]
+    return dict(top)
+
+def exportSampledCorpus(sourceDbPath, outputFolder, fraction = 1.0, seed = 1, lemmaCount = 50):
+    """
+    write sampled verses of alignments database as pipeline input files
+    :param fraction: fraction of verses with alignments to keep
+    :param seed: random seed, the same seed gives the same sample
+    :return: corpus info (also saved to corpus.json in outputFolder)
+    """
+    connection = db.create_read_only_connection(sourceDbPath)
+    verses = sampleVerses(connection, fraction, seed)
+    sampled = set(verses)
+
+    origChapters = {}
+    for word in db.fetchRecordsIter(connection, db.original_words_table):
+        bookId, chapter, verse = getVerseKey(word)
+        if (bookId, chapter, verse) in sampled:
+            verseObjects = origChapters.setdefault((bookId, chapter), {}).setdefault(verse, { 'verseObjects': [] })
+            verseObjects['verseObjects'].append(getOrigWordObject(word))
+
+    alignmentsForVerse = {}
+    for alignment in db.fetchRecordsIter(connection, db.alignment_table):
+        if getVerseKey(alignment) in sampled:
+            alignmentsForVerse.setdefault(getVerseKey(alignment), []).append(alignment)
+    targetChapters = {}
+    for (bookId, chapter, verse), alignments in alignmentsForVerse.items():
+        targetChapters.setdefault((bookId, chapter), {})[verse] = { 'verseObjects': getTargetVerseObjects(alignments) }
+
+    books = list(dict.fromkeys([ verse[0] for verse in verses ]))
+    addEmptyChapters(origChapters, books)
+    addEmptyChapters(targetChapters, books)
+    origLangPath = f"{outputFolder}/orig_lang"
+    alignmentsFolder = f"{outputFolder}/alignments"
+    writeChapters(origLangPath, origChapters)
+    writeChapters(alignmentsFolder, targetChapters)
+
+    file.ensureFolderExists(outputFolder)
+    lemmasPath = f"{outputFolder}/lemmas.json"
+    file.writeJsonFile(lemmasPath, getTopLemmas(connection, verses, lemmaCount))
+    newTestament = books[0] in bible.getBookList(True) if books else True
+    connection.close()
+
+    corpus = {
+        'source': sourceDbPath,
+        'fraction': fraction,
+        'seed': seed,
+        'books': books,
+        'verses': len(verses),
+        'newTestament': newTestament,
+        'origLangPath': origLangPath,
+        'alignmentsFolder': alignmentsFolder,
+        'lemmasPath': lemmasPath,
+    }
+    file.writeJsonFile(f"{outputFolder}/{corpusInfoFile}", corpus)
+    return corpus
+
+def loadCorpusInfo(corpusFolder):
+    return file.readJsonFile(f"{corpusFolder}/{corpusInfoFile}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Make benchmark corpus from sampled verses of an alignments database')
+    parser.add_argument('--db', default='./data/ru/rlob/alignments_NT.sqlite', help='alignments database to sample')
+    parser.add_argument('--output', required=True, help='folder to write corpus to')
+    parser.add_argument('--fraction', type=float, default=1.0, help='fraction of verses to keep')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--lemmas', type=int, default=50, help='number of most common lemmas in lemmas list')
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.db):
+        sys.exit(f"database not found: {args.db}")
+
+    corpus = exportSampledCorpus(args.db, args.output, args.fraction, args.seed, args.lemmas)
+    print(json.dumps(corpus, indent=2))
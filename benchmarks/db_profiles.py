@@ -0,0 +1,124 @@
+# benchmark of the sqlite connection profiles (see db_utils.connectionProfiles).  Replays the words and alignments of
+#   an existing alignments database with the same write pattern as ingest (one insert per verse of words, one commit per
+#   alignment), then runs the notebook query helpers against the result.
+#
+# usage: python3 -m benchmarks.db_profiles [--db ./data/ru/rlob/alignments_NT.sqlite] [--output results.json]
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import utils.db_utils as db
+
+def getVerseGroups(items):
+    groups = {}
+    for item in items:
+        key = (item['book_id'], item['chapter'], item['verse'])
+        groups.setdefault(key, []).append(item)
+    return list(groups.values())
+
+def stripColumns(items, columns):
+    return [ { key: value for key, value in item.items() if key in columns } for item in items ]
+
+def loadSource(sourceDbPath):
+    connection = db.create_connection(sourceDbPath)
+    origWords = db.fetchRecords(connection, db.original_words_table, '')
+    targetWords = db.fetchRecords(connection, db.target_words_table, '')
+    alignments = db.fetchRecords(connection, db.alignment_table, '')
+    connection.close()
+
+    # only keep the columns the destination tables have
+    tempFolder = tempfile.mkdtemp()
+    connections = db.initAlignmentDB(f"{tempFolder}/columns.sqlite")
+    columns = { table: db.getTableColumns(connections['default'], table)
+                for table in [db.original_words_table, db.target_words_table, db.alignment_table] }
+    for connection_ in connections.values():
+        connection_.close()
+    shutil.rmtree(tempFolder)
+
+    return {
+        db.original_words_table: getVerseGroups(stripColumns(origWords, columns[db.original_words_table])),
+        db.target_words_table: getVerseGroups(stripColumns(targetWords, columns[db.target_words_table])),
+        db.alignment_table: stripColumns(alignments, columns[db.alignment_table]),
+    }
+
+def benchmarkWrites(dbPath, profile, source):
+    connections = db.initAlignmentDB(dbPath, profile, allowUnsafe=True)
+    connection = connections['default']
+    rows = 0
+    start = time.time()
+    for table in [db.original_words_table, db.target_words_table]:
+        for verseWords in source[table]:
+            db.addMultipleItemsToDatabase(connection, table, verseWords)
+            rows += len(verseWords)
+    for alignment in source[db.alignment_table]:
+        db.writeRowToDB(connection, db.alignment_table, alignment)
+        rows += 1
+    db.checkpointConnections(connections)
+    elapsed = time.time() - start
+    for connection_ in connections.values():
+        connection_.close()
+    return { 'rows': rows, 'seconds': elapsed, 'rowsPerSecond': rows / elapsed if elapsed else None }
+
+def benchmarkReads(dbPath, profile, lemmaCount = 20, repeat = 3):
+    connections = db.initAlignmentDB(dbPath, profile)
+    connection = connections['default']
+    lemmas = [ row[0] for row in db.execute_read_query(connection,
+        f"SELECT lemma, COUNT(*) AS n FROM {db.original_words_table} GROUP BY lemma ORDER BY n DESC LIMIT {lemmaCount};") ]
+    timings = {}
+
+    def timeIt(name, func):
+        start = time.time()
+        for i in range(repeat):
+            func()
+        timings[name] = (time.time() - start) / repeat
+
+    timeIt('findAlignmentsForWord', lambda: [ db.findAlignmentsForWord(connection, lemma, True, True) for lemma in lemmas ])
+    timeIt('alignmentFrequencies', lambda: [ db.alignmentFrequencies(connection, lemma, True, True) for lemma in lemmas ])
+    timeIt('fetchRecordsDataFrame', lambda: db.fetchRecordsDataFrame(connection, db.original_words_table))
+    timeIt('fetchMorphFieldCounts', lambda: db.fetchMorphFieldCounts(connection, ['role', 'case']))
+    for connection_ in connections.values():
+        connection_.close()
+    return { 'lemmas': len(lemmas), 'seconds': timings }
+
+def benchmarkProfiles(sourceDbPath, profiles):
+    source = loadSource(sourceDbPath)
+    results = {}
+    for profile in profiles:
+        tempFolder = tempfile.mkdtemp()
+        dbPath = f"{tempFolder}/alignments_NT.sqlite"
+        try:
+            # read only connections cannot write, so database is built with the default profile
+            writeProfile = db.PROFILE_DEFAULT if profile == db.PROFILE_READ_ONLY else profile
+            writes = benchmarkWrites(dbPath, writeProfile, source)
+            readProfile = db.PROFILE_DEFAULT if profile in db.unsafeProfiles else profile
+            reads = benchmarkReads(dbPath, readProfile)
+        finally:
+            shutil.rmtree(tempFolder)
+        results[profile] = { 'writes': writes, 'reads': reads }
+        print(f"{profile}: {writes['rowsPerSecond']:.0f} rows/s written (with {writeProfile})", file=sys.stderr)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark sqlite connection profiles')
+    parser.add_argument('--db', default='./data/ru/rlob/alignments_NT.sqlite', help='alignments database to replay')
+    parser.add_argument('--profiles', nargs='*', default=list(db.connectionProfiles.keys()))
+    parser.add_argument('--output', default=None, help='save results json to file')
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.db):
+        sys.exit(f"database not found: {args.db}")
+
+    results = {
+        'sqliteVersion': db.sqlite3.sqlite_version,
+        'source': args.db,
+        'profiles': benchmarkProfiles(args.db, args.profiles)
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
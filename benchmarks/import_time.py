@@ -0,0 +1,99 @@
+# import time benchmark - measures how long importing each module takes in a fresh interpreter (with python -X importtime),
+#   and checks that heavy libraries (pandas, numpy, matplotlib, requests) are not loaded until a function that needs
+#   them runs.  Exits with an error if a module loads a heavy library or is slower than --max-seconds, so it can be
+#   run in CI to keep short commands and worker processes starting quickly.
+#
+# usage: python3 -m benchmarks.import_time [--modules utils.db_utils config] [--repeat 3] [--max-seconds 1.0] [--output results.json]
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+repoPath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+heavyModules = ['pandas', 'numpy', 'matplotlib', 'requests']
+
+defaultModules = [
+    'utils.file_utils',
+    'utils.text_utils',
+    'utils.morph_utils',
+    'utils.bible_utils',
+    'utils.download_utils',
+    'utils.db_utils',
+    'utils.search_utils',
+    'utils.pipeline_utils',
+    'utils.plot_utils',
+    'utils.feature_utils',
+    'utils.score_utils',
+    'config',
+    'alignment_ml',
+    'alignment_pipeline',
+    'process_all_languages',
+]
+
+# parse `import time: self [us] | cumulative | imported package` lines
+def parseImportTimes(output):
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        selfUs, cumulativeUs, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulativeUs)
+    return times
+
+def measureImport(module, repeat = 3):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                cwd=repoPath, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            raise RuntimeError(f"import {module} failed: {result.stderr.splitlines()[-1:]}")
+        if best is None or elapsed < best['seconds']:
+            times = parseImportTimes(result.stderr)
+            best = {
+                'seconds': elapsed, # includes interpreter startup
+                'importSeconds': times.get(module, 0) / 1e6,
+                'heavy': [ name for name in heavyModules if name in times ],
+            }
+    return best
+
+def measureImports(modules, repeat = 3):
+    return { module: measureImport(module, repeat) for module in modules }
+
+def checkResults(results, maxSeconds):
+    problems = []
+    for module, result in results.items():
+        if result['heavy']:
+            problems.append(f"{module} imports {', '.join(result['heavy'])}")
+        if result['seconds'] > maxSeconds:
+            problems.append(f"{module} takes {result['seconds']:.2f}s to import (max {maxSeconds}s)")
+    return problems
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measure import time of modules and check heavy libraries are loaded lazily')
+    parser.add_argument('--modules', nargs='*', default=defaultModules)
+    parser.add_argument('--repeat', type=int, default=3, help='runs of each import, fastest is kept')
+    parser.add_argument('--max-seconds', type=float, default=1.0, help='fail if an import (with interpreter startup) is slower')
+    parser.add_argument('--output', default=None, help='save results json to file')
+    args = parser.parse_args()
+
+    results = measureImports(args.modules, args.repeat)
+    for module, result in results.items():
+        heavy = f", loads {', '.join(result['heavy'])}" if result['heavy'] else ''
+        print(f"{module}: {result['seconds']:.3f}s ({result['importSeconds']:.3f}s importing){heavy}", file=sys.stderr)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
+
+    problems = checkResults(results, args.max_seconds)
+    for problem in problems:
+        print(f"PROBLEM {problem}", file=sys.stderr)
+    if problems:
+        sys.exit(1)
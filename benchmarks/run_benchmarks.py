@@ -0,0 +1,247 @@
+# end to end benchmarks of the alignment pipeline stages on a benchmark corpus (see benchmarks/corpus.py).  Each stage
+#   reports elapsed time, throughput, and memory (peak RSS of the process, and with --trace-memory the peak python
+#   allocations of the stage).  Results are saved as json, and can be compared to a previous run to catch regressions.
+#
+# usage: python3 -m benchmarks.run_benchmarks --corpus ./benchmarks/corpus [--output results.json]
+#                                             [--baseline previous.json] [--tolerance 0.25] [--trace-memory]
+#                                             [--profile cprofile|sample] [--profile-output ./profiles]
+#   if --corpus folder does not have a corpus yet, one is made from --db (and --fraction), or if --synthetic SCALE is
+#   given a synthetic corpus is generated (see benchmarks/synthetic.py, --testament ot for hebrew OT shaped)
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import tracemalloc
+import utils.db_utils as db
+import utils.file_utils as file
+import utils.search_utils as search
+import utils.feature_utils as features
+import utils.score_utils as scores
+import utils.instrument_utils as instrument
+import utils.profile_utils as profiler
+from benchmarks import corpus as bench_corpus
+from benchmarks import synthetic
+
+benchBibleType = 'bench'
+benchTestamentStr = 'NT'
+
+class StageTimer:
+    def __init__(self, traceMemory = False, quiet = True):
+        self.traceMemory = traceMemory
+        self.quiet = quiet
+        self.results = {}
+
+    # run func() as stage name.  func returns the number of items processed (for throughput)
+    def run(self, name, func, unit = 'items'):
+        if self.traceMemory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull:
+            output = contextlib.redirect_stdout(devnull) if self.quiet else contextlib.nullcontext()
+            with output, profiler.profiled(name):
+                count = func()
+        elapsed = time.perf_counter() - start
+        result = {
+            'seconds': elapsed,
+            unit: count,
+            'perSecond': count / elapsed if count and elapsed else None,
+            'unit': unit,
+            'peakRssMB': instrument.getPeakRssMB(),
+        }
+        if self.traceMemory:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            result['peakTracedMB'] = peak / 1024 / 1024
+        self.results[name] = result
+        print(f"{name}: {elapsed:.3f}s, {count} {unit}", file=sys.stderr)
+        return result
+
+def getAlignmentsForWord(connection_owi):
+    alignmentsForWord = {}
+    for origWordItem in db.fetchRecordsIter(connection_owi, db.original_words_index_table):
+        origWord = origWordItem['originalWord']
+        if origWord and origWord not in alignmentsForWord:
+            alignmentsList, rejectedAlignmentsList = db.filterAlignments([origWordItem], 0)
+            alignmentsForWord[origWord] = alignmentsList
+    return alignmentsForWord
+
+def countAlignments(alignmentsForWord):
+    return sum([ len(alignments) for alignments in alignmentsForWord.values() ])
+
+def runQueryHelpers(connection, lemmas):
+    for lemma in lemmas:
+        db.findAlignmentsForWord(connection, lemma, searchOriginal=True, searchLemma=True)
+        db.alignmentFrequencies(connection, lemma, searchOriginal=True, searchLemma=True)
+        db.findWordNormalized(connection, lemma, searchOriginal=True, searchLemma=True, stripAccents=True)
+        search.searchWords(connection, lemma, searchOriginal=True, searchLemma=True)
+        db.findOriginalWordsForLemma(connection, lemma)
+    db.getAlignmentsForOriginalWords(connection, lemmas, searchLemma=True)
+    db.fetchMorphFieldCounts(connection, ['role', 'case'])
+    return len(lemmas)
+
+def runBenchmarks(corpus, workFolder, traceMemory = False, quiet = True, maxInMemory = None):
+    timer = StageTimer(traceMemory, quiet)
+    instrument.resetStats()
+    dbPath = f"{workFolder}/alignments_{benchTestamentStr}.sqlite"
+    trainingDataPath = f"{workFolder}/TrainingData"
+    os.makedirs(trainingDataPath, exist_ok=True)
+    lemmas = list(file.readJsonFile(corpus['lemmasPath']).keys())
+
+    connections = db.initAlignmentDB(dbPath, db.PROFILE_BULK_LOAD)
+    connection = connections['default']
+    alignmentsIndex = db.AlignmentsIndexBuilder(workFolder, maxInMemory)
+
+    def ingest():
+        for book in corpus['books']:
+            db.saveAlignmentsForBook(connections, alignmentsIndex, book, corpus['alignmentsFolder'],
+                                     corpus.get('bibleType', benchBibleType), corpus['origLangPath'],
+                                     corpus.get('targetLanguagePath'), corpus.get('nestedFormat', True))
+        return db.countRecords(connection, db.alignment_table)
+    timer.run('ingest', ingest, 'alignments')
+
+    def buildOwIndex():
+        db.saveAlignmentsIndex(connections, alignmentsIndex)
+        db.checkpointConnections(connections)
+        return db.countRecords(connections[db.original_words_index_table], db.original_words_index_table)
+    timer.run('owIndex', buildOwIndex, 'words')
+    alignmentsIndex.close()
+
+    def buildSearchIndex():
+        search.ensureSearchIndexes(connection, force=True)
+        return sum([ db.countRecords(connection, table) for table in search.ftsColumns ])
+    timer.run('searchIndex', buildSearchIndex, 'rows')
+    for connection_ in connections.values():
+        connection_.close()
+
+    with db.ReadOnlyConnectionPool(dbPath) as pool:
+        connection_ro = pool.getConnection()
+        cfg = {
+            'targetBibleType': benchBibleType,
+            'trainingDataPath': trainingDataPath,
+            'testamentStr': benchTestamentStr,
+        }
+        getTwordsPath = lambda cfg, type_, bibleType: (None, corpus['lemmasPath'])
+        def saveAlignmentData():
+            db.saveAlignmentDataForLemmas(connection_ro, 'bench', cfg, getTwordsPath, 0, pool=pool)
+            return len(lemmas)
+        timer.run('saveAlignmentDataForLemmas', saveAlignmentData, 'lemmas')
+
+        def buildFeatureStore():
+            metadata = features.buildFeatureStore(pool.getConnections(), [dbPath], f"{workFolder}/features", force=True)
+            return metadata['rows']
+        timer.run('featureStore', buildFeatureStore, 'rows')
+        timer.run('scoreAlignments', lambda: scores.scoreAlignments(f"{workFolder}/features", dbPath), 'rows')
+
+        alignmentsForWord = {}
+        def loadAlignments():
+            alignmentsForWord.update(getAlignmentsForWord(connection_ro))
+            return countAlignments(alignmentsForWord)
+        timer.run('loadAlignmentsForWord', loadAlignments, 'alignments')
+
+        def generateWarnings():
+            warningsPath = f"{workFolder}/all_alignments_{benchBibleType}_{benchTestamentStr}_warnings.json"
+            db.generateWarnings(warningsPath, 'all_alignments', benchBibleType, alignmentsForWord, 3, 5, 1, 1, 8, tag='0')
+            return countAlignments(alignmentsForWord)
+        timer.run('generateWarnings', generateWarnings, 'alignments')
+        timer.run('getStatsForAlignments', lambda: len(db.getStatsForAlignments(alignmentsForWord)), 'words')
+
+    # query helpers build the search index tables on first use, so need a writable connection
+    connections = db.initAlignmentDB(dbPath, db.PROFILE_READ_ANALYTICS)
+    timer.run('queryHelpers', lambda: runQueryHelpers(connections['default'], lemmas), 'lemmas')
+    for connection_ in connections.values():
+        connection_.close()
+
+    return timer.results
+
+# find stages whose throughput dropped (or time grew for stages without throughput) by more than tolerance
+def compareResults(results, baseline, tolerance = 0.25):
+    regressions = []
+    for name, stage in results['stages'].items():
+        base = baseline.get('stages', {}).get(name)
+        if not base:
+            continue
+        if stage['perSecond'] and base['perSecond']:
+            change = stage['perSecond'] / base['perSecond'] - 1
+            if change < -tolerance:
+                regressions.append(f"{name}: throughput {stage['perSecond']:.1f} vs {base['perSecond']:.1f} {stage['unit']}/s ({change:.0%})")
+        elif base['seconds']:
+            change = stage['seconds'] / base['seconds'] - 1
+            if change > tolerance:
+                regressions.append(f"{name}: time {stage['seconds']:.3f}s vs {base['seconds']:.3f}s (+{change:.0%})")
+    return regressions
+
+def getSystemInfo():
+    return {
+        'python': platform.python_version(),
+        'sqlite': db.sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description='Benchmark the alignment pipeline stages')
+    parser.add_argument('--corpus', required=True, help='benchmark corpus folder (made from --db if missing)')
+    parser.add_argument('--db', default='./data/ru/rlob/alignments_NT.sqlite', help='alignments database to sample corpus from')
+    parser.add_argument('--fraction', type=float, default=1.0, help='fraction of verses to sample for a new corpus')
+    parser.add_argument('--synthetic', type=float, default=None, metavar='SCALE', help='generate synthetic corpus of this scale')
+    parser.add_argument('--testament', choices=['nt', 'ot'], default='nt', help='testament of synthetic corpus')
+    parser.add_argument('--output', default=None, help='save results json to file')
+    parser.add_argument('--baseline', default=None, help='results json of previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown compared to baseline')
+    parser.add_argument('--trace-memory', action='store_true', help='trace python allocations of each stage (slower)')
+    parser.add_argument('--index-max-in-memory', type=int, default=None,
+                        help='alignments held in memory by original words index builder before spilling to disk')
+    parser.add_argument('--verbose', action='store_true', help='show output of the stages')
+    profiler.addProfileArguments(parser)
+    args = parser.parse_args(argv)
+    instrument.configureLogging()
+    profiler.configureProfilingFromArgs(args)
+
+    if not os.path.isfile(f"{args.corpus}/{bench_corpus.corpusInfoFile}") and args.synthetic:
+        with contextlib.redirect_stdout(sys.stderr):
+            synthetic.generateSyntheticCorpus(args.corpus, args.synthetic, args.testament == 'nt')
+    elif not os.path.isfile(f"{args.corpus}/{bench_corpus.corpusInfoFile}"):
+        if not os.path.isfile(args.db):
+            sys.exit(f"database not found: {args.db}")
+        with contextlib.redirect_stdout(sys.stderr):
+            bench_corpus.exportSampledCorpus(args.db, args.corpus, args.fraction)
+    corpus = bench_corpus.loadCorpusInfo(args.corpus)
+
+    workFolder = tempfile.mkdtemp()
+    try:
+        stages = runBenchmarks(corpus, workFolder, args.trace_memory, quiet=not args.verbose,
+                               maxInMemory=args.index_max_in_memory)
+    finally:
+        shutil.rmtree(workFolder)
+
+    results = {
+        'system': getSystemInfo(),
+        'corpus': corpus,
+        'traceMemory': args.trace_memory,
+        'stages': stages,
+        'instrumentation': instrument.getReport(),
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compareResults(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
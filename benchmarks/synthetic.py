@@ -0,0 +1,277 @@
+# generate a synthetic corpus shaped like UGNT (greek NT) or UHB (hebrew OT) with an aligned target language, for load
+#   testing without downloads.  Books and chapters are the real ones, the number of verses in each chapter is multiplied
+#   by scale (so scale 1 is about the size of the testament, 50 is 50 times larger).  Lemmas are used with a zipf
+#   distribution like real texts, with several inflected forms, morphs, and translations each.  A small number of
+#   alignments are made unusual (rare translations, discontiguous words) so the warnings stages have work to do.
+#
+# Writes the same corpus.json as benchmarks/corpus.py, so the corpus can be used with benchmarks/run_benchmarks.py.
+#   Format 'resources' writes nested aligned target chapters (as read by getAlignmentsFromVerse), 'projects' writes
+#   alignments lists plus target text chapters (as read by bible.loadChapterAlignments).
+#
+# usage: python3 -m benchmarks.synthetic --output ./benchmarks/synthetic [--scale 10] [--testament ot] [--format projects]
+
+import json
+import random
+import argparse
+import unicodedata
+import utils.bible_utils as bible
+import utils.file_utils as file
+from benchmarks import corpus as bench_corpus
+
+FORMAT_RESOURCES = 'resources'
+FORMAT_PROJECTS = 'projects'
+
+syntheticBibleType = 'synth'
+
+greekConsonants = 'βγδζθκλμνπρστφχ'
+greekVowels = 'αεηιοουω'
+hebrewConsonants = 'אבגדהוזחטיכלמנסעפצקרשת'
+hebrewPoints = '\u05b0\u05b4\u05b5\u05b6\u05b7\u05b8\u05b9\u05bb' # vowel points
+hebrewAccents = '\u0591\u0596\u05a3\u05a5\u05ad' # cantillation
+targetSyllables = [ 'ka', 'lo', 'mi', 're', 'ta', 've', 'su', 'no', 'pa', 'di', 'gor', 'tan', 'vel', 'mis', 'ruk' ]
+targetFunctionWords = [ 'de', 'la', 'un', 'se', 'na', 'i', 'po' ]
+
+# morphs for each role, forms of a lemma take morphs from its role
+greekCases = [ c + g + n for c in 'NGDA' for g in 'MFN' for n in 'SP' ]
+greekMorphs = {
+    'N': [ f'Gr,N,,,,,{cgn},' for cgn in greekCases ],
+    'EA': [ f'Gr,EA,,,,{cgn},' for cgn in greekCases ],
+    'V': [ 'Gr,V,IPA3,,S,', 'Gr,V,IAA3,,S,', 'Gr,V,NPA,,,,,', 'Gr,V,PPA,NMP,', 'Gr,V,SPA3,,P,', 'Gr,V,MPA2,,S,', 'Gr,V,IFM1,,P,' ],
+    'RP': [ 'Gr,RP,,,3GMS,', 'Gr,RP,,,1G,P,', 'Gr,RP,,,2A,S,', 'Gr,RP,,,1A,P,' ],
+    'P': [ 'Gr,P,,,,,D,,,', 'Gr,P,,,,,A,,,', 'Gr,P,,,,,G,,,' ],
+    'CC': [ 'Gr,CC,,,,,,,,' ],
+    'CS': [ 'Gr,CS,,,,,,,,' ],
+    'D': [ 'Gr,D,,,,,,,,,' ],
+}
+hebrewMorphs = {
+    'N': [ 'He,Ncmsa', 'He,Ncmpa', 'He,Ncfsa', 'He,Ncmsc', 'He,R:Ncmsa', 'He,C:Ncmpa' ],
+    'V': [ 'He,Vqp3ms', 'He,Vqw3ms', 'He,C:Vqw3ms', 'He,Vhi3ms', 'He,Vqrmsa', 'He,Vpp3cp' ],
+    'Np': [ 'He,Np', 'He,C:Np', 'He,R:Np' ],
+    'S': [ 'He,Sp3ms', 'He,Sp2ms' ],
+    'R': [ 'He,R' ],
+    'C': [ 'He,C' ],
+    'T': [ 'He,Td', 'He,Tn' ],
+}
+greekRoleWeights = { 'N': 30, 'V': 25, 'EA': 3, 'RP': 5, 'P': 5, 'CC': 2, 'CS': 2, 'D': 8 }
+hebrewRoleWeights = { 'N': 35, 'V': 35, 'Np': 15, 'S': 3, 'R': 3, 'C': 2, 'T': 2 }
+
+# shape of each testament: average original words per verse, and number of lemmas
+testamentShapes = {
+    True: { 'wordsPerVerse': 17, 'vocabularySize': 5400, 'strongPrefix': 'G' },
+    False: { 'wordsPerVerse': 13, 'vocabularySize': 8600, 'strongPrefix': 'H' },
+}
+
+# chance of alignments with (original words, target words), similar to the sample alignment databases
+alignmentShapes = [ ((1, 1), 0.74), ((2, 1), 0.15), ((1, 2), 0.06), ((2, 2), 0.02), ((1, 3), 0.015),
+                    ((3, 1), 0.01), ((1, 4), 0.005) ]
+glossWeights = [ 0.8, 0.12, 0.06, 0.02 ]
+rareGlossRate = 0.01 # translation used that is not one of the lemma's usual glosses
+discontiguousRate = 0.01 # two original words aligned with a word between them
+unalignedRate = 0.03 # target words not aligned to anything
+
+def makeGreekWord(rng, syllables):
+    letters = ''.join([ rng.choice(greekConsonants) + rng.choice(greekVowels) for i in range(syllables) ])
+    accented = rng.randrange(len(letters) // 2) * 2 + 1 # accent a vowel
+    return unicodedata.normalize('NFC', letters[:accented + 1] + '\u0301' + letters[accented + 1:])
+
+def makeHebrewWord(rng, consonants, accent = False):
+    letters = [ rng.choice(hebrewConsonants) + rng.choice(hebrewPoints) for i in range(consonants) ]
+    if accent:
+        letters[-1] += rng.choice(hebrewAccents)
+    return ''.join(letters)
+
+def makeTargetWord(rng):
+    return ''.join([ rng.choice(targetSyllables) for i in range(rng.randint(1, 3)) ])
+
+def makeVocabulary(seed, newTestament):
+    rng = random.Random(f"{seed}-vocabulary")
+    shape = testamentShapes[newTestament]
+    roleWeights = greekRoleWeights if newTestament else hebrewRoleWeights
+    morphs = greekMorphs if newTestament else hebrewMorphs
+    roles = list(roleWeights.keys())
+    vocabulary = []
+    for rank in range(shape['vocabularySize']):
+        role = rng.choices(roles, weights=list(roleWeights.values()))[0]
+        if newTestament:
+            lemma = makeGreekWord(rng, rng.randint(2, 4))
+            forms = [ makeGreekWord(rng, rng.randint(2, 4)) for i in range(rng.randint(1, 6)) ]
+        else:
+            lemma = makeHebrewWord(rng, rng.randint(2, 3))
+            forms = [ makeHebrewWord(rng, rng.randint(2, 4), accent=True) for i in range(rng.randint(1, 6)) ]
+        vocabulary.append({
+            'lemma': lemma,
+            'strong': f"{shape['strongPrefix']}{rank + 1:04d}" + ('0' if newTestament else ''),
+            'forms': [ (form, rng.choice(morphs[role])) for form in forms ],
+            'glosses': [ makeTargetWord(rng) for i in range(rng.randint(1, len(glossWeights))) ],
+        })
+    return vocabulary
+
+def getZipfWeights(count, exponent = 1.1):
+    weights = [ 1 / (rank ** exponent) for rank in range(1, count + 1) ]
+    cumulative = []
+    total = 0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    return cumulative
+
+def getVerseCount(verses, scale):
+    return max(1, round(int(verses) * scale))
+
+def makeVerseWords(rng, vocabulary, zipfWeights, wordsPerVerse, lemmaCounts):
+    count = rng.randint(max(1, wordsPerVerse // 2), wordsPerVerse * 3 // 2)
+    ranks = rng.choices(range(len(vocabulary)), cum_weights=zipfWeights, k=count)
+    words = []
+    occurrences = {}
+    for rank in ranks:
+        entry = vocabulary[rank]
+        text, morph = rng.choice(entry['forms'])
+        occurrences[text] = occurrences.get(text, 0) + 1
+        lemmaCounts[rank] = lemmaCounts.get(rank, 0) + 1
+        words.append({ 'word': text, 'lemma': entry['lemma'], 'strong': entry['strong'], 'morph': morph,
+                       'occurrence': occurrences[text], 'rank': rank })
+    return words
+
+# split verse words into groups of original words for alignments, with the number of target words for each
+def makeAlignmentGroups(rng, words):
+    shapes = [ shape for shape, weight in alignmentShapes ]
+    weights = [ weight for shape, weight in alignmentShapes ]
+    remaining = list(range(len(words)))
+    groups = []
+    while remaining:
+        origCount, targetCount = rng.choices(shapes, weights=weights)[0]
+        origCount = min(origCount, len(remaining))
+        if (origCount == 2) and (len(remaining) > 2) and (rng.random() < discontiguousRate):
+            indices = [ remaining[0], remaining[2] ]
+        else:
+            indices = remaining[:origCount]
+        remaining = [ index for index in remaining if index not in indices ]
+        groups.append(([ words[index] for index in indices ], targetCount))
+    return groups
+
+def makeTargetWords(rng, vocabulary, origWords, targetCount):
+    glosses = vocabulary[origWords[0]['rank']]['glosses']
+    if rng.random() < rareGlossRate:
+        gloss = makeTargetWord(rng)
+    else:
+        gloss = rng.choices(glosses, weights=glossWeights[:len(glosses)])[0]
+    return [ gloss ] + [ rng.choice(targetFunctionWords) for i in range(targetCount - 1) ]
+
+def makeVerse(rng, vocabulary, zipfWeights, wordsPerVerse, lemmaCounts):
+    words = makeVerseWords(rng, vocabulary, zipfWeights, wordsPerVerse, lemmaCounts)
+    alignments = []
+    occurrences = {}
+
+    def getTargetObject(text):
+        occurrences[text] = occurrences.get(text, 0) + 1 # numbered in the order they are written
+        return { 'type': 'word', 'tag': 'w', 'text': text, 'occurrence': occurrences[text] }
+
+    verseObjects = []
+    for origWords, targetCount in makeAlignmentGroups(rng, words):
+        if rng.random() < unalignedRate:
+            verseObjects.append(getTargetObject(rng.choice(targetFunctionWords)))
+        targetObjects = [ getTargetObject(text) for text in makeTargetWords(rng, vocabulary, origWords, targetCount) ]
+        verseObjects.append(bench_corpus.getAlignmentObject(origWords, targetObjects))
+        alignments.append({ 'topWords': [ bench_corpus.getOrigWordObject(word) for word in origWords ],
+                            'bottomWords': targetObjects })
+    return words, verseObjects, alignments
+
+def getTargetWordObjects(verseObjects):
+    words = []
+    for vo in verseObjects:
+        if vo['type'] == 'word':
+            words.append(vo)
+        else:
+            words.extend(getTargetWordObjects(vo['children']))
+    return words
+
+def writeChapter(folder, chapter, data):
+    file.ensureFolderExists(folder)
+    with open(f"{folder}/{chapter}.json", 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+
+def generateSyntheticCorpus(outputFolder, scale = 1.0, newTestament = True, format_ = FORMAT_RESOURCES, seed = 1,
+                            lemmaCount = 50, books = None):
+    """
+    write synthetic original language and aligned target language chapters
+    :param scale: multiplier for number of verses in each chapter (1 is about the size of the testament)
+    :param newTestament: if True greek NT shaped (UGNT), otherwise hebrew OT shaped (UHB)
+    :param format_: FORMAT_RESOURCES for nested alignments, or FORMAT_PROJECTS for alignments list and target text
+    :param books: optional list of book ids to generate, default is all books of testament
+    :return: corpus info (also saved to corpus.json in outputFolder)
+    """
+    shape = testamentShapes[newTestament]
+    vocabulary = makeVocabulary(seed, newTestament)
+    zipfWeights = getZipfWeights(len(vocabulary))
+    books = books or bible.getBookList(newTestament)
+    origLangPath = f"{outputFolder}/orig_lang"
+    alignmentsFolder = f"{outputFolder}/alignments"
+    targetLanguagePath = f"{outputFolder}/target_lang" if format_ == FORMAT_PROJECTS else None
+
+    lemmaCounts = {}
+    totals = { 'verses': 0, 'words': 0, 'alignments': 0 }
+    for bookId in books:
+        print(f"generateSyntheticCorpus - {bookId}")
+        for chapter, verses in bible.BOOK_CHAPTER_VERSES[bookId].items():
+            rng = random.Random(f"{seed}-{bookId}-{chapter}") # chapters do not depend on each other
+            origChapter = {}
+            targetChapter = {}
+            alignmentsChapter = {}
+            for verse in range(1, getVerseCount(verses, scale) + 1):
+                words, verseObjects, alignments = makeVerse(rng, vocabulary, zipfWeights, shape['wordsPerVerse'], lemmaCounts)
+                verse = str(verse)
+                origChapter[verse] = { 'verseObjects': [ bench_corpus.getOrigWordObject(word) for word in words ] }
+                if format_ == FORMAT_PROJECTS:
+                    targetChapter[verse] = { 'verseObjects': getTargetWordObjects(verseObjects) }
+                    alignmentsChapter[verse] = { 'alignments': alignments }
+                else:
+                    targetChapter[verse] = { 'verseObjects': verseObjects }
+                totals['verses'] += 1
+                totals['words'] += len(words)
+                totals['alignments'] += len(alignments)
+
+            writeChapter(f"{origLangPath}/{bookId}", chapter, origChapter)
+            if format_ == FORMAT_PROJECTS:
+                writeChapter(f"{targetLanguagePath}/{bookId}", chapter, targetChapter)
+                writeChapter(f"{alignmentsFolder}/{file.getRepoName(syntheticBibleType, bookId)}", chapter, alignmentsChapter)
+            else:
+                writeChapter(f"{alignmentsFolder}/{bookId}", chapter, targetChapter)
+
+    topRanks = sorted(lemmaCounts.keys(), key=lambda rank: -lemmaCounts[rank])[:lemmaCount]
+    lemmas = { vocabulary[rank]['lemma']: { 'count': lemmaCounts[rank], 'strong': vocabulary[rank]['strong'] }
+               for rank in topRanks }
+    lemmasPath = f"{outputFolder}/lemmas.json"
+    file.writeJsonFile(lemmasPath, lemmas)
+
+    corpus = {
+        'source': 'synthetic',
+        'scale': scale,
+        'seed': seed,
+        'format': format_,
+        'nestedFormat': format_ != FORMAT_PROJECTS,
+        'bibleType': syntheticBibleType,
+        'books': books,
+        'newTestament': newTestament,
+        'origLangPath': origLangPath,
+        'alignmentsFolder': alignmentsFolder,
+        'targetLanguagePath': targetLanguagePath,
+        'lemmasPath': lemmasPath,
+        **totals
+    }
+    file.writeJsonFile(f"{outputFolder}/{bench_corpus.corpusInfoFile}", corpus)
+    return corpus
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate synthetic aligned corpus for load testing')
+    parser.add_argument('--output', required=True, help='folder to write corpus to')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplier for verses in each chapter, 1 is about testament size')
+    parser.add_argument('--testament', choices=['nt', 'ot'], default='nt', help='greek NT (UGNT) or hebrew OT (UHB) shaped')
+    parser.add_argument('--format', choices=[FORMAT_RESOURCES, FORMAT_PROJECTS], default=FORMAT_RESOURCES)
+    parser.add_argument('--books', nargs='*', default=None, help='book ids to generate, default is all')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--lemmas', type=int, default=50, help='number of most common lemmas in lemmas list')
+    args = parser.parse_args()
+
+    corpus = generateSyntheticCorpus(args.output, args.scale, args.testament == 'nt', args.format, args.seed,
+                                     args.lemmas, args.books)
+    print(json.dumps(corpus, indent=2))
@@ -1,7 +1,18 @@
 # shared configuration file
+#
+# Configs are loaded once with loadConfig() and cached as an immutable Config, which is passed to the stages (and
+#   pickled to worker processes).  The config is chosen by the import below, by ALIGNMENT_CONFIG=<name> (e.g. ru for
+#   configs/config_ru.py), or by --config on the command line.  Single values can be overridden without editing the
+#   config files with `--set key=value` or ALIGNMENT_CONFIG_SET="key=value;key=value", values are parsed as json if
+#   they can be (e.g. --set alignmentFrequencyMinThreshold=10), otherwise used as strings.
 
-import utils.db_utils as db
+import os
+import json
+import importlib
+import functools
+from collections.abc import Mapping
 import utils.file_utils as file
+import utils.instrument_utils as instrument
 import time
 from datetime import timedelta
 from pathlib import Path
@@ -15,29 +26,115 @@ import configs.config_en_unfoldingword as config_ # en from unfoldingWord
 # import configs.config_hi_str as config_ # hi STR
 
 home = str(Path.home())
+logger = instrument.getLogger('config')
+
+# select config by name instead of the import above, e.g. 'ru' for configs/config_ru.py
+def selectConfig(configName):
+    global config_
+    config_ = importlib.import_module(f'configs.config_{configName}')
+
+def getConfigName():
+    return config_.__name__.split('.config_', 1)[1]
+
+def getConfigNames():
+    names = []
+    for fileName in sorted(file.listFolder('./configs')):
+        if fileName.startswith('config_') and fileName.endswith('.py'):
+            names.append(fileName[len('config_'):-len('.py')])
+    return names
+
+if os.environ.get('ALIGNMENT_CONFIG'):
+    selectConfig(os.environ['ALIGNMENT_CONFIG'])
 
 ############################################
 # configure these values for your system
 ############################################
 
-def getConfig():
-    cfg = config_.getConfig()  # look in the config referenced in the import for specific configuration
+class Config(Mapping):
+    """
+    read only configuration values, used like the dict from getConfig() of the config files (cfg['dbPath'],
+        cfg.get('tWordsUseEnUlt', False)).  Plain values only, so it pickles cheaply for worker processes.
+    """
+    def __init__(self, name, values):
+        self.__dict__['name'] = name
+        self.__dict__['_values'] = dict(values)
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Config is read only, use withOverrides() to make a changed copy')
 
-    def getConfig(key, defaultValue=None):
-        if key in cfg:
-            return cfg[key]
+    def __reduce__(self):
+        return (Config, (self.name, self._values))
 
-        return defaultValue
+    def __repr__(self):
+        return f"Config({self.name!r}, {len(self._values)} values)"
 
-    cfg['get'] = getConfig # insert getter function
+    def withOverrides(self, overrides):
+        """
+        copy of config with values replaced.  Values derived from an overridden value in the config file (e.g. dbPath
+            from baseDataPath) are not changed.
+        :param overrides: dict of key: value
+        """
+        for key in overrides:
+            if key not in self._values: # optional settings like dbLoadAllowUnsafe, or a typo
+                logger.warning(f"config '{self.name}' has no value '{key}', adding it")
+        return Config(self.name, { **self._values, **overrides })
+
+def parseOverride(override):
+    key, sep, value = override.partition('=')
+    if not sep or not key.strip():
+        raise ValueError(f"config override '{override}' should be key=value")
+    try:
+        value = json.loads(value)
+    except ValueError:
+        pass # plain string, e.g. a path
+    return key.strip(), value
+
+def getEnvOverrides():
+    overrides = os.environ.get('ALIGNMENT_CONFIG_SET', '')
+    return tuple(override for override in overrides.split(';') if override.strip())
+
+@functools.lru_cache(maxsize=None)
+def loadConfig(configName = None, overrides = ()):
+    """
+    load config once - later calls with the same arguments return the same Config.
+    :param configName: e.g. 'ru' for configs/config_ru.py, default is the selected config
+    :param overrides: tuple of 'key=value' strings, applied after those from ALIGNMENT_CONFIG_SET
+    """
+    if configName is None:
+        configName = getConfigName()
+    module = importlib.import_module(f'configs.config_{configName}')
+    cfg = Config(configName, module.getConfig())
+    overrides = dict(parseOverride(override) for override in getEnvOverrides() + tuple(overrides))
+    if overrides:
+        cfg = cfg.withOverrides(overrides)
     return cfg
 
-def getTwordsPath(type_, bibleType, testamentStr=''):
-    cfg = getConfig()
+def getConfig():
+    return loadConfig(getConfigName())
+
+def addConfigArguments(parser):
+    parser.add_argument('--set', dest='configOverrides', action='append', default=[], metavar='KEY=VALUE',
+                        help='override a config value, e.g. --set alignmentFrequencyMinThreshold=10 (repeatable)')
+    return parser
+
+# create the folders that outputs are written to - getConfig does not, so just reading a config has no side effects
+def ensureConfigFolders(cfg):
+    for key in ['resourceBasePath', 'baseDataPath', 'tWordsDataFolder', 'trainingDataPath']:
+        file.ensureFolderExists(cfg[key])
+
+def getTwordsPath(cfg, type_, bibleType, testamentStr=''):
     tWordsDataFolder = cfg['tWordsDataFolder']
     if not testamentStr:
         testamentStr = cfg['testamentStr']
     quotesPath = f'{tWordsDataFolder}/{type_}_{bibleType}_{testamentStr}_quotes.json'
     lemmasPath = f'{tWordsDataFolder}/{type_}_{bibleType}_{testamentStr}_lemmas.json'
     return quotesPath, lemmasPath
-
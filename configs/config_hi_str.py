@@ -8,8 +8,6 @@
 # 514 items in original_words_index_table
 # 875 items in alignment_table
 
-import utils.db_utils as db
-import utils.file_utils as file
 import time
 from datetime import timedelta
 from pathlib import Path
@@ -61,11 +59,6 @@ def getConfig():
 
     baseLangResourceUrl = 'https://cdn.door43.org'
 
-    file.ensureFolderExists(resourceBasePath)
-    file.ensureFolderExists(baseDataPath)
-    file.ensureFolderExists(tWordsDataFolder)
-    file.ensureFolderExists(trainingDataPath)
-
     cfg = {
         'newTestament': newTestament,
         'testamentStr': testamentStr,
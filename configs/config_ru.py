@@ -1,7 +1,5 @@
 # shared configuration file
 
-import utils.db_utils as db
-import utils.file_utils as file
 import time
 from datetime import timedelta
 from pathlib import Path
@@ -62,11 +60,6 @@ def getConfig():
 
     baseLangResourceUrl = 'https://cdn.door43.org'
 
-    file.ensureFolderExists(resourceBasePath)
-    file.ensureFolderExists(baseDataPath)
-    file.ensureFolderExists(tWordsDataFolder)
-    file.ensureFolderExists(trainingDataPath)
-
     cfg = {
         'newTestament': newTestament,
         'testamentStr': testamentStr,
@@ -1,37 +1,27 @@
 # Creating CSV of alignment warnings
 
+import sys
 import json
 import csv
 import time
 from datetime import timedelta
-import pandas as pd
 import utils.db_utils as db
 import utils.file_utils as file
 import config
+import alignment_ml
 
-############################################
-# get configuration
-cfg = config.getConfig() # configure values in config.js
-############################################
-
-targetLang = cfg['targetLang']
-bibleType = cfg['targetBibleType']
-trainingDataPath = cfg['trainingDataPath']
-baseDataPath = cfg['baseDataPath']
-testamentStr = cfg['testamentStr']
-tWordsTypeList = cfg['tWordsTypeList']
-dbPath = cfg.get('dbPath')
-processAllAlignments = cfg.get('processAllAlignments', True)
-processTWordsAlignments = cfg.get('processTWordsAlignments', True)
-alignmentOrigWordsThreshold = cfg.get('alignmentOrigWordsThreshold', 3)
-alignmentTargetWordsThreshold = cfg.get('alignmentTargetWordsThreshold', 5)
-origWordsBetweenThreshold = cfg.get('origWordsBetweenThreshold', 1)
-targetWordsBetweenThreshold = cfg.get('targetWordsBetweenThreshold', 1)
-alignmentFrequencyMinThreshold = cfg.get('alignmentFrequencyMinThreshold', 8) # % of the max frequency of alignments for original word
+tWordsWarningTypes = ['kt', 'other', 'names']
 
 #############################
 
-start = time.time()
+def getThresholds(cfg):
+    alignmentOrigWordsThreshold = cfg.get('alignmentOrigWordsThreshold', 3)
+    alignmentTargetWordsThreshold = cfg.get('alignmentTargetWordsThreshold', 5)
+    origWordsBetweenThreshold = cfg.get('origWordsBetweenThreshold', 1)
+    targetWordsBetweenThreshold = cfg.get('targetWordsBetweenThreshold', 1)
+    alignmentFrequencyMinThreshold = cfg.get('alignmentFrequencyMinThreshold', 8) # % of the max frequency of alignments for original word
+    return (alignmentOrigWordsThreshold, alignmentTargetWordsThreshold, origWordsBetweenThreshold,
+            targetWordsBetweenThreshold, alignmentFrequencyMinThreshold)
 
 def sortDictByKey(dict_):
     dict_sorted = {}
@@ -41,7 +31,11 @@ def sortDictByKey(dict_):
         dict_sorted[key] = dict_[key]
     return dict_sorted
 
-if processAllAlignments:
+def createAllAlignmentsWarnings(cfg):
+    bibleType = cfg['targetBibleType']
+    baseDataPath = cfg['baseDataPath']
+    testamentStr = cfg['testamentStr']
+    dbPath = cfg.get('dbPath')
 
     ############################################
 
@@ -51,26 +45,24 @@ if processAllAlignments:
     minAlignments = 0
     remove = []
 
-    connections = db.initAlignmentDB(dbPath)
-    connection = db.getConnectionForTable(connections, 'default')
-    connection_owi = db.getConnectionForTable(connections, db.original_words_index_table)
+    alignmentsForWord = {}
+    with db.ReadOnlyConnectionPool(dbPath) as pool:
+        connection_owi = db.getConnectionForTable(pool.getConnections(), db.original_words_index_table)
 
-    #############################
+        #############################
 
-    items_orig_idx = db.fetchRecords(connection_owi, db.original_words_index_table, '')
-    print (f"{len(items_orig_idx)} items in original_words_index_table")
+        print (f"{db.countRecords(connection_owi, db.original_words_index_table)} items in original_words_index_table")
 
-    alignmentsForWord = {}
-    for origWordItem in items_orig_idx:
-        orig_word = origWordItem['originalWord']
-        if orig_word:
-            if orig_word in alignmentsForWord:
-                print(f"duplicate {orig_word} in database")
+        for origWordItem in db.fetchRecordsIter(connection_owi, db.original_words_index_table):
+            orig_word = origWordItem['originalWord']
+            if orig_word:
+                if orig_word in alignmentsForWord:
+                    print(f"duplicate {orig_word} in database")
+                else:
+                    alignmentsList, rejectedAlignmentsList = db.filterAlignments([origWordItem], minAlignments)
+                    alignmentsForWord[orig_word] = alignmentsList
             else:
-                alignmentsList, rejectedAlignmentsList = db.filterAlignments([origWordItem], minAlignments)
-                alignmentsForWord[orig_word] = alignmentsList
-        else:
-            print(f"missing 'originalWord'' in alignment: {origWordItem}")
+                print(f"missing 'originalWord'' in alignment: {origWordItem}")
 
     # for orig_word in alignmentsForWord:
     #     length = len(alignmentsForWord[orig_word])
@@ -82,9 +74,7 @@ if processAllAlignments:
     #############################
 
     warningPath = f'{baseDataPath}/{type_}_{bibleType}_{testamentStr}_warnings.json'
-    warningData = db.generateWarnings(warningPath, type_, bibleType, alignmentsForWord, alignmentOrigWordsThreshold,
-                                      alignmentTargetWordsThreshold, origWordsBetweenThreshold,
-                                      targetWordsBetweenThreshold, alignmentFrequencyMinThreshold,
+    warningData = db.generateWarnings(warningPath, type_, bibleType, alignmentsForWord, *getThresholds(cfg),
                                       tag=f'{minAlignments}')
     print(f"Found {len(warningData)} alignments with warnings - min count threshold {minAlignments}")
 
@@ -99,7 +89,12 @@ if processAllAlignments:
 
     #############################
 
-if processTWordsAlignments:
+def createTWordsWarnings(cfg):
+    import pandas as pd
+    bibleType = cfg['targetBibleType']
+    trainingDataPath = cfg['trainingDataPath']
+    baseDataPath = cfg['baseDataPath']
+    testamentStr = cfg['testamentStr']
 
     #############################
 
@@ -110,9 +105,7 @@ if processTWordsAlignments:
     print(f"\nTesting tWords {type_} with minimum of {minAlignments} alignments")
 
     warningPath = f'{baseDataPath}/{type_}_{bibleType}_{testamentStr}_warnings.json'
-    warningData = db.generateWarnings(warningPath, type_, bibleType, filteredAlignmentsForWord, alignmentOrigWordsThreshold,
-                                      alignmentTargetWordsThreshold, origWordsBetweenThreshold,
-                                      targetWordsBetweenThreshold, alignmentFrequencyMinThreshold,
+    warningData = db.generateWarnings(warningPath, type_, bibleType, filteredAlignmentsForWord, *getThresholds(cfg),
                                       tag=f'{minAlignments}')
     print(f"Found {len(warningData)} alignments with warnings - min count threshold {minAlignments}")
 
@@ -130,14 +123,11 @@ if processTWordsAlignments:
     print(f"\nTesting all tWords")
     type_ = 'all_twords'
     minAlignments = 0
-    types = ['kt', 'other', 'names']
-    alignmentsForWord, filteredAlignmentsForWord0 = db.fetchAlignmentDataForAllTWordsCached(trainingDataPath, bibleType, types, minAlignments, remove)
+    alignmentsForWord, filteredAlignmentsForWord0 = db.fetchAlignmentDataForAllTWordsCached(trainingDataPath, bibleType, tWordsWarningTypes, minAlignments, remove)
     print(f"Original Language Alignments: {len(filteredAlignmentsForWord)}")
 
     warningPath = f'{baseDataPath}/{type_}_{bibleType}_{testamentStr}_warnings.json'
-    warningData2 = db.generateWarnings(warningPath, type_, bibleType, filteredAlignmentsForWord0, alignmentOrigWordsThreshold,
-                                       alignmentTargetWordsThreshold, origWordsBetweenThreshold,
-                                       targetWordsBetweenThreshold, alignmentFrequencyMinThreshold,
+    warningData2 = db.generateWarnings(warningPath, type_, bibleType, filteredAlignmentsForWord0, *getThresholds(cfg),
                                        tag=f'{minAlignments}')
     print(f"Found {len(warningData2)} alignments with warnings - min count threshold {minAlignments}")
 
@@ -152,10 +142,21 @@ if processTWordsAlignments:
 
     #############################
 
-delta = (time.time() - start)
-elapsed = str(timedelta(seconds=delta))
-print(f'Elapsed time: {elapsed}')
+def createAlignmentWarnings(cfg):
+    start = time.time()
 
-# generated CSV with 1823 warnings, Elapsed time: 0:00:08
+    if cfg.get('processAllAlignments', True):
+        createAllAlignmentsWarnings(cfg)
 
+    if cfg.get('processTWordsAlignments', True):
+        createTWordsWarnings(cfg)
 
+    delta = (time.time() - start)
+    elapsed = str(timedelta(seconds=delta))
+    print(f'Elapsed time: {elapsed}')
+
+if __name__ == "__main__":
+    # same as: python3 alignment_ml.py [options] warnings
+    sys.exit(alignment_ml.main(sys.argv[1:] + ['warnings']))
+
+# generated CSV with 1823 warnings, Elapsed time: 0:00:08
@@ -1,28 +1,14 @@
 # load all the alignments in project format (i.e. topWords, bottomWords) into data folder
 
-import pandas as pd
+import sys
 import utils.db_utils as db
 import utils.file_utils as file
 import utils.bible_utils as bible
 import time
 from datetime import timedelta
-from config import getConfig
+import alignment_ml
 
-############################################
-# get configuration
-cfg = getConfig() # configure values in config.js
-############################################
-
-targetBibleType = cfg['targetBibleType']
-origLangPath =  cfg['origLangPath']
-targetLanguagePath = cfg['targetLanguagePath']
-dbPath = cfg['dbPath']
-newTestament = cfg['newTestament']
-testamentStr = cfg['testamentStr']
-projectsUrl = cfg['projectsUrl']
-projectsFolder = './data/AlignmentsFromProjects'
-
-############################################
+projectsBaseFolder = './data/AlignmentsFromProjects'
 
 original_words_table = db.original_words_table
 target_words_table = db.target_words_table
@@ -31,55 +17,74 @@ original_words_index_table = db.original_words_index_table
 
 ########################
 
-# move old sqlite
-file.moveFile(f"{dbPath}.save", f"{dbPath}.save2", ifExists=True, overWrite=True)
-file.moveFile(dbPath, f"{dbPath}.save", ifExists=True, overWrite=True)
-dbPathOwIdx = db.getOrigLangIndexSqlPath(dbPath)
-file.moveFile(f"{dbPathOwIdx}.save", f"{dbPathOwIdx}.save2", ifExists=True, overWrite=True)
-file.moveFile(dbPathOwIdx, f"{dbPathOwIdx}.save", ifExists=True, overWrite=True)
+def getProjectsFolder(cfg):
+    # separate folder for each bible type since converted books are saved by book id
+    return f"{projectsBaseFolder}/{cfg['targetBibleType']}"
 
-connections = db.initAlignmentDB(dbPath)
-connection = db.getConnectionForTable(connections, 'default')
-connection_owi = db.getConnectionForTable(connections, db.original_words_index_table)
+def downloadProjects(cfg):
+    targetBibleType = cfg['targetBibleType']
+    newTestament = cfg['newTestament']
+    projectsUrl = cfg['projectsUrl']
+    projectsFolder = getProjectsFolder(cfg)
 
-########################
+    # download  testament alignments into data
+    bible.downloadTestamentAlignments(projectsUrl, targetBibleType, newTestament, projectsFolder)
 
-# download  testament alignments into data
-bible.downloadTestamentAlignments(projectsUrl, targetBibleType, newTestament, projectsFolder)
+def loadAlignmentsFromProjects(cfg):
+    targetBibleType = cfg['targetBibleType']
+    origLangPath =  cfg['origLangPath']
+    dbPath = cfg['dbPath']
+    newTestament = cfg['newTestament']
+    projectsFolder = getProjectsFolder(cfg)
 
-#################
+    # move old sqlite
+    file.moveFile(f"{dbPath}.save", f"{dbPath}.save2", ifExists=True, overWrite=True)
+    file.moveFile(dbPath, f"{dbPath}.save", ifExists=True, overWrite=True)
+    dbPathOwIdx = db.getOrigLangIndexSqlPath(dbPath)
+    file.moveFile(f"{dbPathOwIdx}.save", f"{dbPathOwIdx}.save2", ifExists=True, overWrite=True)
+    file.moveFile(dbPathOwIdx, f"{dbPathOwIdx}.save", ifExists=True, overWrite=True)
 
-# db.saveAlignmentsForBook(connection, bookId, projectsFolder, bibleType, origLangPathGreek)
+    # database is rebuilt from scratch, so the unsafe bulk-load profile can be enabled with 'dbLoadAllowUnsafe'
+    allowUnsafe = cfg.get('dbLoadAllowUnsafe', False)
+    profile = db.PROFILE_BULK_LOAD_UNSAFE if allowUnsafe else db.PROFILE_BULK_LOAD
+    connections = db.initAlignmentDB(dbPath, profile, allowUnsafe)
+    connection = db.getConnectionForTable(connections, 'default')
+    connection_owi = db.getConnectionForTable(connections, db.original_words_index_table)
 
-#################
+    #################
 
-# # get alignments for OT (not working yet)
-# start = time.time()
-# db.getAlignmentsForTestament(connection, 0, dataFolder, bibleType)
-# delta = (time.time() - start)
-# elapsed = str(timedelta(seconds=delta))
-# print(f'Get OT alignments, Elapsed time: {elapsed}')
+    # db.saveAlignmentsForBook(connection, bookId, projectsFolder, bibleType, origLangPathGreek)
 
-# get alignments for NT
-start = time.time()
-db.getAlignmentsForTestament(connections, newTestament, projectsFolder, origLangPath, projectsFolder, targetBibleType, nestedFormat=True)
-delta = (time.time() - start)
-elapsed = str(timedelta(seconds=delta))
-print(f'Get NT alignments, Elapsed time: {elapsed}')
+    #################
 
-########################
+    # # get alignments for OT (not working yet)
+    # start = time.time()
+    # db.getAlignmentsForTestament(connection, 0, dataFolder, bibleType)
+    # delta = (time.time() - start)
+    # elapsed = str(timedelta(seconds=delta))
+    # print(f'Get OT alignments, Elapsed time: {elapsed}')
+
+    # get alignments for NT
+    start = time.time()
+    db.getAlignmentsForTestament(connections, newTestament, projectsFolder, origLangPath, projectsFolder, targetBibleType, nestedFormat=True)
+    db.checkpointConnections(connections) # so database file sizes include the write ahead log
+    delta = (time.time() - start)
+    elapsed = str(timedelta(seconds=delta))
+    print(f'Get NT alignments, Elapsed time: {elapsed}')
+
+    ########################
+
+    print (f"{db.countRecords(connection, target_words_table)} items in target_words_table")
 
-items_target = db.fetchRecords(connection, target_words_table, '')
-print (f"{len(items_target)} items in target_words_table")
+    print (f"{db.countRecords(connection, alignment_table)} items in alignment_table")
 
-items_align = db.fetchRecords(connection, alignment_table, '')
-print (f"{len(items_align)} items in alignment_table")
+    print (f"{db.countRecords(connection, original_words_table)} items in original_words_table")
 
-items_orig = db.fetchRecords(connection, original_words_table, '')
-print (f"{len(items_orig)} items in original_words_table")
+    print (f"{db.countRecords(connection_owi, original_words_index_table)} items in original_words_index_table")
 
-items_orig_idx = db.fetchRecords(connection_owi, original_words_index_table, '')
-print (f"{len(items_orig_idx)} items in original_words_index_table")
+if __name__ == "__main__":
+    # same as: python3 alignment_ml.py [options] ingest --projects
+    sys.exit(alignment_ml.main(sys.argv[1:] + ['ingest', '--projects']))
 
 # 69050 items in target_words_table
 # 48892 items in alignment_table
@@ -1,6 +1,9 @@
 # download all the en ult new testament alignments into data
 
 import utils.bible_utils as bible
+import utils.instrument_utils as instrument
+
+instrument.configureLogging()
 
 userUrl = 'https://git.door43.org/lrsallee'
 bibleType = 'en_ult'
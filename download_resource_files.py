@@ -1,32 +1,47 @@
+import sys
 import utils.system_utils as system
-from config import getConfig
+import alignment_ml
 
 ############################################
-# get configuration
-cfg = getConfig() # configure values in config.js
-############################################
+# download resources
 
-resourceBasePath = cfg['resourceBasePath'].replace('./', '../')
-origLangResourceUrl = cfg['origLangResourceUrl']
-origLangId = cfg['origLangId']
-origLangBibleId = cfg['origLangBibleId']
-origLangVersion = cfg['origLangVersion']
-targetBibleLangResourceUrl = cfg['targetBibleLangResourceUrl']
-targetLang = cfg['targetLang']
-targetBibleId = cfg['targetBibleId']
-targetLangBibleVersion = cfg['targetLangBibleVersion']
-targetTWordsLangResourceUrl = cfg['targetTWordsLangResourceUrl']
-tWordsId = cfg['tWordsId']
-targetLangTWordsVersion = cfg['targetLangTWordsVersion']
-tWordsResourceName = cfg['tWordsResourceName']
-
-system.printSystemInfo()
+def getResourceBasePath(cfg):
+    return cfg['resourceBasePath'].replace('./', '../') # node runs from node_stuff
 
-############################################
-# download resources
+def downloadOrigLangResources(cfg):
+    resourceBasePath = getResourceBasePath(cfg)
+    origLangResourceUrl = cfg['origLangResourceUrl']
+    origLangId = cfg['origLangId']
+    origLangBibleId = cfg['origLangBibleId']
+    origLangVersion = cfg['origLangVersion']
+
+    # download original language bible and tW
+    print(f"Saving resources to {resourceBasePath}")
+    system.downloadAndProcessResource(cfg, origLangResourceUrl, resourceBasePath, origLangId, origLangBibleId, origLangVersion, origLangBibleId)
+
+def downloadTargetBible(cfg):
+    resourceBasePath = getResourceBasePath(cfg)
+    targetBibleLangResourceUrl = cfg['targetBibleLangResourceUrl']
+    targetLang = cfg['targetLang']
+    targetBibleId = cfg['targetBibleId']
+    targetLangBibleVersion = cfg['targetLangBibleVersion']
+    system.downloadAndProcessResource(cfg, targetBibleLangResourceUrl, resourceBasePath, targetLang, targetBibleId, targetLangBibleVersion, targetBibleId)
+
+def downloadTargetTWords(cfg):
+    resourceBasePath = getResourceBasePath(cfg)
+    targetTWordsLangResourceUrl = cfg['targetTWordsLangResourceUrl']
+    targetLang = cfg['targetLang']
+    tWordsId = cfg['tWordsId']
+    targetLangTWordsVersion = cfg['targetLangTWordsVersion']
+    tWordsResourceName = cfg['tWordsResourceName']
+    system.downloadAndProcessResource(cfg, targetTWordsLangResourceUrl, resourceBasePath, targetLang, tWordsId, targetLangTWordsVersion, tWordsResourceName)
+
+def downloadResourceFiles(cfg):
+    system.printSystemInfo()
+    downloadOrigLangResources(cfg)
+    downloadTargetBible(cfg)
+    downloadTargetTWords(cfg)
 
-# download original language bible and tW
-print(f"Saving resources to {resourceBasePath}")
-system.downloadAndProcessResource(cfg, origLangResourceUrl, resourceBasePath, origLangId, origLangBibleId, origLangVersion, origLangBibleId)
-system.downloadAndProcessResource(cfg, targetBibleLangResourceUrl, resourceBasePath, targetLang, targetBibleId, targetLangBibleVersion, targetBibleId)
-system.downloadAndProcessResource(cfg, targetTWordsLangResourceUrl, resourceBasePath, targetLang, tWordsId, targetLangTWordsVersion, tWordsResourceName)
+if __name__ == "__main__":
+    # same as: python3 alignment_ml.py [options] download
+    sys.exit(alignment_ml.main(sys.argv[1:] + ['download']))
@@ -1,35 +1,15 @@
-import time
-from datetime import timedelta
-from config import getConfig
+import sys
+import alignment_ml
 
 ############################################
-# get configuration
-cfg = getConfig() # configure values in config.js
-
-start = time.time()
-
-############################################
-
-print("\n\ndownload resources:")
-import download_resource_files
-
-print("\n\nextract alignments:")
-import db_load_alignments_from_resources
-
-print("\n\nget original language words for tWords:")
-import fetch_translation_words
-
-print("\n\ngenerate ML training data:")
-import fetch_alignment_training_data
-
-print("\n\ngenerate warnings reports:")
-import create_alignment_warning_csv
-
-############################################
-
-delta = (time.time() - start)
-elapsed = str(timedelta(seconds=delta))
-print(f'Parse alignments, total elapsed time: {elapsed}')
+# download resources, extract alignments, get original language words for tWords, generate ML training data, and
+#   generate warnings reports.  Stages with unchanged inputs are skipped, --force to rerun all stages.
+#   Same as: python3 alignment_ml.py [options] pipeline [--force]
+
+if __name__ == "__main__":
+    argv = [ arg for arg in sys.argv[1:] if arg != '--force' ]
+    command = ['pipeline'] + (['--force'] if '--force' in sys.argv else [])
+    sys.exit(alignment_ml.main(argv + command))
 
 # Dell Windows: Parse alignments, total elapsed time: 0:02:13
 # MBP M1 Rosetta (native node): Parse alignments, total elapsed time: 0:00:18
@@ -5,9 +5,12 @@ import pandas as pd
 import utils.db_utils as db
 import utils.file_utils as file
 import utils.bible_utils as bible
+import utils.instrument_utils as instrument
 import time
 from datetime import timedelta
 
+instrument.configureLogging()
+
 original_words_table = db.original_words_table
 target_words_table = db.target_words_table
 alignment_table = db.alignment_table
@@ -1,35 +1,44 @@
 # save
 
+import sys
 import utils.db_utils as db
 import utils.file_utils as file
+import utils.feature_utils as features
 import time
 from datetime import timedelta
 import config
-
-############################################
-# get configuration
-cfg = config.getConfig() # configure values in config.js
-############################################
+import alignment_ml
 
 minAlignments = 40
-targetLang = cfg['targetLang']
-bibleType = cfg['targetBibleType']
-tWordsTypeList = cfg['tWordsTypeList']
-dbPath = cfg['dbPath']
-trainingDataPath = cfg['trainingDataPath']
-testamentStr = cfg['testamentStr']
-
-connections = db.initAlignmentDB(dbPath)
-connection = db.getConnectionForTable(connections, 'default')
-connection_owi = db.getConnectionForTable(connections, db.original_words_index_table)
 
 ################################
 
-start = time.time()
-for type_ in tWordsTypeList:
-    db.saveAlignmentDataForLemmas(connection_owi, type_, cfg, config.getTwordsPath, minAlignments)
-delta = (time.time() - start)
-elapsed = str(timedelta(seconds=delta))
-print(f'fetch alignments for tW lemmas, Elapsed time: {elapsed}')
+def fetchAlignmentTrainingDataForType(cfg, type_):
+    dbPath = cfg['dbPath']
+    with db.ReadOnlyConnectionPool(dbPath) as pool:
+        connection_owi = db.getConnectionForTable(pool.getConnections(), db.original_words_index_table)
+        db.saveAlignmentDataForLemmas(connection_owi, type_, cfg, config.getTwordsPath, minAlignments, pool=pool)
+
+def fetchAlignmentTrainingData(cfg):
+    start = time.time()
+    for type_ in cfg['tWordsTypeList']:
+        fetchAlignmentTrainingDataForType(cfg, type_)
+    delta = (time.time() - start)
+    elapsed = str(timedelta(seconds=delta))
+    print(f'fetch alignments for tW lemmas, Elapsed time: {elapsed}')
+
+def getFeatureStorePath(cfg):
+    return f"{cfg['trainingDataPath']}/features_{cfg['targetBibleType']}_{cfg['testamentStr']}"
+
+# feature store of all alignments for model training (see utils/feature_utils.py), rebuilt only if the database changed
+def fetchAlignmentFeatures(cfg, force=False):
+    dbPath = cfg['dbPath']
+    with db.ReadOnlyConnectionPool(dbPath) as pool:
+        dbPaths = [dbPath, db.getOrigLangIndexSqlPath(dbPath)]
+        return features.buildFeatureStore(pool.getConnections(), dbPaths, getFeatureStorePath(cfg), force=force)
+
+if __name__ == "__main__":
+    # same as: python3 alignment_ml.py [options] training
+    sys.exit(alignment_ml.main(sys.argv[1:] + ['training']))
 
-# fetch alignments for lemmas, Elapsed time: 0:00:22
\ No newline at end of file
+# fetch alignments for lemmas, Elapsed time: 0:00:22
@@ -0,0 +1,59 @@
+/**
+ * Long running worker that converts USFM books to chapter json files, so that a whole testament only pays the
+ *  node and tc-source-content-updater startup once.
+ * Syntax: node ./usfmWorker.js
+ *  - reads one json job per line on stdin: {"id": 1, "sourceUsfmPath": "...", "outputJsonPath": "..."}
+ *  - writes one json result per line on stdout: {"id": 1, "success": true, "error": null}
+ */
+const readline = require('readline');
+const PackageParseHelpers = require('tc-source-content-updater').packageParseHelpers;
+
+// stdout is reserved for results, so send any logging from the parser to stderr
+console.log = console.error;
+console.info = console.error;
+
+/**
+ * write result of job to stdout
+ * @param {Object} result
+ */
+function sendResult(result) {
+  process.stdout.write(JSON.stringify(result) + '\n');
+}
+
+/**
+ * convert the book described by job
+ * @param {String} line - json job
+ * @return {Promise<void>}
+ */
+async function processJob(line) {
+  let job = {};
+
+  try {
+    job = JSON.parse(line);
+    await PackageParseHelpers.parseUsfmOfBook(job.sourceUsfmPath, job.outputJsonPath);
+    sendResult({ id: job.id, success: true, error: null });
+  } catch (e) {
+    sendResult({
+      id: job.id,
+      success: false,
+      error: `Failed to parse ${job.sourceUsfmPath} to ${job.outputJsonPath}: ${e && e.message || e}`,
+    });
+  }
+}
+
+// run as main
+if (require.main === module) {
+  const lines = readline.createInterface({ input: process.stdin, terminal: false });
+  let queue = Promise.resolve();
+
+  lines.on('line', (line) => {
+    if (line.trim()) {
+      queue = queue.then(() => processJob(line)); // jobs run in order they were received
+    }
+  });
+  lines.on('close', () => {
+    queue.then(() => {
+      process.exitCode = 0;
+    });
+  });
+}
@@ -0,0 +1,113 @@
+# batch mode - runs the alignment pipeline for several configs in one run.  The original language resources,
+#   parsed original language words, and greek tWords quotes are prepared once and shared, then each target language
+#   is processed in its own worker process.  Outputs go to the usual data/<lang>/<bible> folder for each config.
+#
+# usage: python3 process_all_languages.py [--projects] [--force] [--workers N] [--set key=value] [config names...]
+#   config names are the suffixes of the files in ./configs (e.g. ru en_unfoldingword hi_str), default is all
+
+import sys
+import time
+import argparse
+import contextlib
+from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor
+import utils.db_utils as db
+import utils.bible_utils as bible
+import utils.pipeline_utils as pipeline
+import utils.system_utils as system
+import utils.instrument_utils as instrument
+import utils.profile_utils as profiler
+import config
+import alignment_pipeline
+
+def prepareSharedOrigLang(cfg, fromProjects, force):
+    origLangPath = alignment_pipeline.getOrigLangPath(cfg, fromProjects)
+    print(f"\n\nPreparing shared original language resources {origLangPath}")
+    statePath = f"{cfg['resourceBasePath']}/pipeline_state_{cfg['origLangBibleId']}.json"
+    pipeline.runPipeline(alignment_pipeline.getOrigLangStages(cfg, fromProjects), statePath, force=force)
+    db.saveOrigLangCorpusCache(origLangPath, cfg['newTestament'])
+
+def prepareSharedTWords(cfg):
+    for type_ in cfg['tWordsTypeList']:
+        bible.harvestTwordsQuotes(cfg['tWordsGreekPath'], type_, cfg['newTestament'])
+
+# cfg is the Config loaded by the main process (pickled to the worker), so overrides apply to workers too
+def processLanguage(cfg, fromProjects, force, profileSettings=None):
+    configName = cfg.name
+    logPath = f"{cfg['baseDataPath']}/batch_log.txt"
+    start = time.time()
+    with open(logPath, 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+        instrument.configureLogging() # worker processes may not inherit logging setup
+        if profileSettings and profileSettings['mode']: # profiles of each language in their own folder
+            profiler.configureProfiling(profileSettings['mode'], f"{profileSettings['outputFolder']}/{configName}",
+                                        profileSettings['top'], profileSettings['interval'])
+        instrument.resetStats() # only count this language in its log
+        db.loadOrigLangCorpusCache(alignment_pipeline.getOrigLangPath(cfg, fromProjects), cfg['newTestament'])
+        results = alignment_pipeline.runAlignmentPipeline(cfg, fromProjects, force, includeOrigLang=False)
+        instrument.logReport(title=f'Instrumentation summary for {configName}')
+    return results, time.time() - start, logPath
+
+def processAllLanguages(configNames, fromProjects=False, force=False, maxWorkers=None, overrides=()):
+    configs = {}
+    for configName in configNames:
+        configs[configName] = config.loadConfig(configName, tuple(overrides))
+        config.ensureConfigFolders(configs[configName])
+
+    dbPaths = [ cfg['dbPath'] for cfg in configs.values() ]
+    if len(set(dbPaths)) != len(dbPaths):
+        raise ValueError(f"configs {configNames} write to the same data folder, run them separately")
+
+    # shared work is done once for each original language
+    prepared = set()
+    for configName, cfg in configs.items():
+        origLangPath = alignment_pipeline.getOrigLangPath(cfg, fromProjects)
+        if origLangPath not in prepared:
+            prepareSharedOrigLang(cfg, fromProjects, force)
+            prepared.add(origLangPath)
+
+    preparedTWords = set()
+    for configName, cfg in configs.items():
+        tWordsGreekPath = cfg['tWordsGreekPath']
+        if not cfg.get('tWordsUseEnUlt', False) and tWordsGreekPath not in preparedTWords:
+            prepareSharedTWords(cfg)
+            preparedTWords.add(tWordsGreekPath)
+
+    print(f"\n\nProcessing target languages: {configNames}")
+    maxWorkers = maxWorkers or len(configNames)
+    with ProcessPoolExecutor(max_workers=maxWorkers) as executor:
+        futures = { configName: executor.submit(processLanguage, cfg, fromProjects, force, profiler.getSettings()) for configName, cfg in configs.items() }
+
+    failed = []
+    for configName, future in futures.items():
+        try:
+            results, elapsed, logPath = future.result()
+            print(f"{configName} finished, Elapsed time: {timedelta(seconds=elapsed)}, log: {logPath}")
+        except Exception as e:
+            print(f"{configName} failed: {e}")
+            failed.append(configName)
+    return failed
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description='Run the alignment pipeline for several languages')
+    parser.add_argument('configNames', nargs='*', help='config names, e.g. ru en_unfoldingword hi_str')
+    parser.add_argument('--projects', action='store_true', help='load alignments from projects instead of resources')
+    parser.add_argument('--force', action='store_true', help='rerun stages even if inputs have not changed')
+    parser.add_argument('--workers', type=int, default=None, help='number of languages processed at once')
+    config.addConfigArguments(parser)
+    profiler.addProfileArguments(parser)
+    args = parser.parse_args(argv)
+
+    instrument.configureLogging()
+    profiler.configureProfilingFromArgs(args)
+    configNames = args.configNames or config.getConfigNames()
+    system.printSystemInfo()
+    start = time.time()
+    failed = processAllLanguages(configNames, args.projects, args.force, args.workers, args.configOverrides)
+    delta = (time.time() - start)
+    elapsed = str(timedelta(seconds=delta))
+    instrument.logReport(title='Instrumentation summary for shared resources')
+    print(f'Processed {len(configNames)} languages, total elapsed time: {elapsed}')
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+# score every alignment for how unusual it is for its lemma (see utils/score_utils.py), save scores to the
+#   alignment_scores table, and the highest scoring alignments to a CSV for review
+
+import sys
+import time
+from datetime import timedelta
+import utils.db_utils as db
+import utils.score_utils as scores
+import fetch_alignment_training_data
+import alignment_ml
+
+defaultTop = 1000 # highest scoring alignments saved to the CSV
+
+################################
+
+def getScoresCsvPath(cfg):
+    return f"{cfg['baseDataPath']}/all_alignments_{cfg['targetBibleType']}_{cfg['testamentStr']}_scores.csv"
+
+def scoreAlignments(cfg, top=None):
+    dbPath = cfg['dbPath']
+    top = top or cfg.get('anomalyScoresTop', defaultTop)
+    start = time.time()
+
+    fetch_alignment_training_data.fetchAlignmentFeatures(cfg) # only rebuilt if the database changed
+    scores.scoreAlignments(fetch_alignment_training_data.getFeatureStorePath(cfg), dbPath)
+
+    csvPath = getScoresCsvPath(cfg)
+    topScores = scores.getTopScores(dbPath, top)
+    db.saveListToCSV(csvPath, topScores)
+    delta = (time.time() - start)
+    elapsed = str(timedelta(seconds=delta))
+    print(f'saved top {len(topScores)} alignment scores to {csvPath}, Elapsed time: {elapsed}')
+
+if __name__ == "__main__":
+    # same as: python3 alignment_ml.py [options] scores
+    sys.exit(alignment_ml.main(sys.argv[1:] + ['scores']))
@@ -1,6 +1,12 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 import utils.file_utils as file
 import utils.system_utils as system
+import utils.download_utils as download
+import utils.instrument_utils as instrument
+import utils.pipeline_utils as pipeline
+
+logger = instrument.getLogger('bible_utils')
 
 BIBLE_BOOKS = {
     'oldTestament': {
@@ -1490,121 +1496,236 @@ def getBookList(newTestament):
         outputList.append(book)
     return outputList
 
-def downloadChapterAlignments(userUrl, bibleType, bookId, chapter, outputBasePath):
+def downloadChapterAlignments(userUrl, bibleType, bookId, chapter, outputBasePath, manager=None):
     url = file.getBibleUrl(userUrl, bibleType, bookId, chapter)
     outputFolder = outputBasePath + '/' + file.getRepoName(bibleType, bookId)
     file.makeFolder(outputFolder)
     outputPath = outputFolder + '/' + chapter + '.json'
-    if not os.path.isfile(outputPath):
-        file.downloadJsonFile(url, outputPath)
-    else:
-        print('file already exists, skipping ' + outputPath)
+    if manager is None:
+        with download.DownloadManager(download.getManifestPath(outputBasePath)) as manager:
+            return manager.download(url, outputPath, validateJson=True)
+    return manager.download(url, outputPath, validateJson=True)
 
-def downloadBookAlignments(userUrl, bibleType, bookId, outputBasePath):
-    # https://git.door43.org/lrsallee/en_ult_act_book/raw/branch/master/en_ult_act_book.usfm
-    url = file.getBookUrl(userUrl, bibleType, bookId)
+def downloadBookAlignmentsChapters(userUrl, bibleType, bookId, outputBasePath, maxWorkers=8):
+    outputFolder = outputBasePath + '/' + file.getRepoName(bibleType, bookId)
+    file.ensureFolderExists(outputFolder)
+    jobs = []
+    for chapter in getChaptersForBook(bookId):
+        url = file.getBibleUrl(userUrl, bibleType, bookId, chapter)
+        jobs.append((url, outputFolder + '/' + chapter + '.json'))
+    with download.DownloadManager(download.getManifestPath(outputBasePath), maxWorkers) as manager:
+        results = manager.downloadAll(jobs, validateJson=True)
+    file.removeEmptyFolder(outputFolder) # don't leave empty folders behind
+    return results
+
+def getBookUsfmPaths(bibleType, bookId, outputBasePath):
     repoName = file.getRepoName(bibleType, bookId)
     outputFolder = outputBasePath + '/' + repoName
-    file.ensureFolderExists(outputFolder)
     usfmDestPath = outputFolder + '/' + repoName + '.usfm'
     jsonOutput = outputBasePath + '/' + bookId
-    if not os.path.isfile(usfmDestPath):
-        try:
-            file.downloadFile(url, usfmDestPath)
-            file.ensureFolderExists(jsonOutput)
-            system.convertUsfmToJson(usfmDestPath, jsonOutput)
-        except:
-            print(f'download of {url} failed')
+    return outputFolder, usfmDestPath, jsonOutput
+
+def needsConversion(status, jsonOutput):
+    if status == download.DOWNLOADED:
+        return True
+    if status in [download.SKIPPED, download.NOT_MODIFIED]: # resume conversion if it did not finish
+        return not (os.path.isdir(jsonOutput) and len(os.listdir(jsonOutput)))
+    return False
+
+def convertBookAlignments(bibleType, bookId, outputBasePath):
+    outputFolder, usfmDestPath, jsonOutput = getBookUsfmPaths(bibleType, bookId, outputBasePath)
+    file.ensureFolderExists(jsonOutput)
+    try:
+        system.convertUsfmToJson(usfmDestPath, jsonOutput)
+    except (system.UsfmConversionError, system.NodeCommandError) as e:
+        logger.error(f'conversion of {usfmDestPath} failed: {e}')
+
+def downloadBookAlignments(userUrl, bibleType, bookId, outputBasePath, manager=None, refresh=False):
+    # https://git.door43.org/lrsallee/en_ult_act_book/raw/branch/master/en_ult_act_book.usfm
+    url = file.getBookUrl(userUrl, bibleType, bookId)
+    outputFolder, usfmDestPath, jsonOutput = getBookUsfmPaths(bibleType, bookId, outputBasePath)
+    file.ensureFolderExists(outputFolder)
+    if manager is None:
+        with download.DownloadManager(download.getManifestPath(outputBasePath)) as manager:
+            status = manager.download(url, usfmDestPath, refresh)
     else:
-        print('file already exists, skipping ' + usfmDestPath)
+        status = manager.download(url, usfmDestPath, refresh)
+
+    if needsConversion(status, jsonOutput):
+        convertBookAlignments(bibleType, bookId, outputBasePath)
+    elif status in [download.MISSING, download.FAILED]:
+        logger.error(f'download of {url} failed')
 
     file.removeEmptyFolder(outputFolder) # don't leave empty folders behind
+    return status
 
-def downloadTestamentAlignments(userUrl, bibleType, newTestament, outputBasePath):
+# downloads the book usfm files for testament concurrently over a pooled connection, and then converts the
+#   new downloads to json with a pool of long running node workers.  Manifest of completed downloads in outputBasePath allows interrupted runs to resume.
+def downloadTestamentAlignments(userUrl, bibleType, newTestament, outputBasePath, maxWorkers=8, refresh=False, maxConversionWorkers=2):
     file.ensureFolderExists(outputBasePath)
     books = getBookList(newTestament)
+    jobs = []
     for bookId in books:
-        print('downloadTestamentAlignments downloading book ' + bookId)
-        downloadBookAlignments(userUrl, bibleType, bookId, outputBasePath)
+        outputFolder, usfmDestPath, jsonOutput = getBookUsfmPaths(bibleType, bookId, outputBasePath)
+        file.ensureFolderExists(outputFolder)
+        jobs.append((file.getBookUrl(userUrl, bibleType, bookId), usfmDestPath))
+
+    logger.info(f'downloadTestamentAlignments downloading {len(books)} books')
+    with download.DownloadManager(download.getManifestPath(outputBasePath), maxWorkers) as manager:
+        results = manager.downloadAll(jobs, refresh)
+
+    conversionJobs = []
+    for bookId, (url, usfmDestPath) in zip(books, jobs):
+        status = results[usfmDestPath]
+        outputFolder, usfmDestPath, jsonOutput = getBookUsfmPaths(bibleType, bookId, outputBasePath)
+        if needsConversion(status, jsonOutput):
+            file.ensureFolderExists(jsonOutput)
+            conversionJobs.append((usfmDestPath, jsonOutput))
+        elif status in [download.MISSING, download.FAILED]:
+            logger.error(f'download of {url} failed')
+        file.removeEmptyFolder(outputFolder) # don't leave empty folders behind
+
+    if len(conversionJobs):
+        logger.info(f'downloadTestamentAlignments converting {len(conversionJobs)} books')
+        conversions = system.convertUsfmBooksToJson(conversionJobs, maxConversionWorkers)
+        for conversion in conversions:
+            if not conversion['success']:
+                logger.error(f"conversion of {conversion['sourceUsfmPath']} failed: {conversion['error']}")
+    return results
 
 def loadChapterAlignments(inputBasePath, bibleType, bookId, chapter):
     inputFolder = inputBasePath + '/' + file.getRepoName(bibleType, bookId)
     inputPath = inputFolder + '/' + chapter + '.json'
-    print(f"loadChapterAlignments - {inputPath}")
+    logger.debug("loadChapterAlignments - %s", inputPath)
     if os.path.isfile(inputPath):
         data = file.readJsonFile(inputPath)
     else:
-        print('file missing ' + inputPath)
+        logger.warning('file missing ' + inputPath)
         data = ''
     return data
 
 def loadChapterAlignmentsFromResource(inputBasePath, bookId, chapter):
     inputPath = f"{inputBasePath}/{bookId}/{chapter}.json"
-    print(f"loadChapterAlignmentsFromResource - {inputPath}")
+    logger.debug("loadChapterAlignmentsFromResource - %s", inputPath)
     if os.path.isfile(inputPath):
         data = file.readJsonFile(inputPath)
     else:
-        print('file missing ' + inputPath)
+        logger.warning('file missing ' + inputPath)
         data = ''
     return data
 
-def getQuotesForBook(tWordsGreekPath, tWordsTargetPath, bookId, tWordsType):
-    tWordsPath = f"{tWordsGreekPath}/{tWordsType}/groups/{bookId}"
+def getReferenceStr(contextId):
+    reference = contextId.get('reference', {})
+    return f"{reference.get('bookId', '')} {reference.get('chapter', '')}:{reference.get('verse', '')}"
+
+def readTwordQuotes(tWordPath):
+    # returns dict of unique quotes (in order found) mapped to list of verse references
+    quotes = {}
+    wordInstances = file.readJsonFile(tWordPath)
+    for item in wordInstances:
+        contextId = item['contextId']
+        quote = contextId['quote']
+        if isinstance(quote, str): # we will skip quote arrays since it makes things too complicated
+            ref = getReferenceStr(contextId)
+            quotes.setdefault(quote, {})[ref] = True # dict keeps refs unique and in order found
+    return { quote: list(refs) for quote, refs in quotes.items() }
+
+def mergeQuotes(quotesFound, tWord, quotes):
+    if tWord in quotesFound:
+        currentQuotes = quotesFound[tWord]
+        for quote, refs in quotes.items():
+            if quote in currentQuotes:
+                currentRefs = currentQuotes[quote]
+                seen = set(currentRefs)
+                currentRefs.extend(ref for ref in refs if ref not in seen)
+            else:
+                currentQuotes[quote] = list(refs)
+    else:
+        quotesFound[tWord] = { quote: list(refs) for quote, refs in quotes.items() }
+
+def getTwordsListForType(tWordsTargetPath, tWordsType):
     tWordsTypePath = f"{tWordsTargetPath}/{tWordsType}/index.json"
     wordsIndex = file.readJsonFile(tWordsTypePath)
     tWordsListForType = list(map(lambda word: word['id'], wordsIndex))
     tWordsListForType.sort()
+    return tWordsListForType
+
+def getQuotesForBook(tWordsGreekPath, tWordsTargetPath, bookId, tWordsType, withReferences=False, tWordsListForType=None):
+    tWordsPath = f"{tWordsGreekPath}/{tWordsType}/groups/{bookId}"
+    if tWordsListForType is None:
+        tWordsListForType = getTwordsListForType(tWordsTargetPath, tWordsType)
 
     quotesMap = {}
     for tWord in tWordsListForType:
         tWordPath = f"{tWordsPath}/{tWord}.json"
         if os.path.isfile(tWordPath):
-            wordInstances = file.readJsonFile(tWordPath)
-            # print(f"in {tWordPath} found {len(wordInstances)} items:")
-            foundQuotes = []
-            for item in wordInstances:
-                quote = item['contextId']['quote']
-                if isinstance(quote, str): # we will skip quote arrays since it makes things too complicated
-                    # print(f"Quote = '{quote}'")
-                    if not quote in foundQuotes:
-                        # print(f"found Quote = '{quote}'")
-                        foundQuotes.append(quote)
-            # print(f"for {tWord}, found unique Quotes = '{foundQuotes}' out of {len(wordInstances)}")
-            if len(foundQuotes):
-                quotesMap[tWord] = foundQuotes
-        # else:
-        #     print(f"{tWordPath} was not found")
+            quotes = readTwordQuotes(tWordPath)
+            if len(quotes):
+                quotesMap[tWord] = quotes if withReferences else list(quotes.keys())
     # print(f"Quotes found in {bookId}: {quotesMap}")
     return quotesMap
 
-def getTwordsQuotes(tWordsGreekPath, tWordsTargetPath, tWordsType, newTestament = True):
+def getTwordsQuotesCachePath(tWordsGreekPath, tWordsType, newTestament = True):
+    testament = 'NT' if newTestament else 'OT'
+    # the greek tWords path is versioned, so cache is shared by all target languages using that version
+    return f"{tWordsGreekPath}/{tWordsType}/quotes_{testament}.json"
+
+# read quotes and verse references for every tWord in the greek tWords groups for testament.  Group files are read
+#   in parallel, and results are cached next to the greek tWords so other target languages can reuse them.  The cache
+#   is keyed on the size and modified time of the group files, so it is rebuilt if any of them change.
+# returns dict of tWord mapped to dict of quote to list of verse references
+def harvestTwordsQuotes(tWordsGreekPath, tWordsType, newTestament = True, maxWorkers = 8, useCache = True):
+    jobs = []
+    for bookId in getBookList(newTestament):
+        tWordsPath = f"{tWordsGreekPath}/{tWordsType}/groups/{bookId}"
+        if file.doesFolderExist(tWordsPath):
+            files = file.listFolder(tWordsPath)
+            tWords = sorted(fileName[:-5] for fileName in files if fileName.endswith('.json'))
+            jobs.extend((tWord, f"{tWordsPath}/{tWord}.json") for tWord in tWords)
+
+    cachePath = getTwordsQuotesCachePath(tWordsGreekPath, tWordsType, newTestament)
+    version = pipeline.getPathsHash([ tWordPath for tWord, tWordPath in jobs ])
+    if useCache and file.doesFileExist(cachePath):
+        cached = file.initJsonFile(cachePath)
+        if cached.get('version') == version:
+            logger.info(f"harvestTwordsQuotes - using cached quotes {cachePath}")
+            return cached['quotes']
+
     quotesFound = {}
-    books = getBookList(newTestament)
-    # books = ['tit', 'eph']
-    for bookId in books:
-        # print(f"searching: {bookId}")
-        quotesFound_ = getQuotesForBook(tWordsGreekPath, tWordsTargetPath, bookId, tWordsType)
-        for keyTerm, quotes in quotesFound_.items():
-            if keyTerm in quotesFound:
-                # print(f"Merging {keyTerm}: {quotes}")
-                currentQuotes = quotesFound[keyTerm]
-                for quote in quotes:
-                    if not quote in currentQuotes:
-                        currentQuotes.append(quote)
-            else:
-                # print(f"Adding {keyTerm}: {quotes}")
-                quotesFound[keyTerm] = quotes
+    with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+        # map() keeps the job order so results are merged in book order like a sequential read
+        results = executor.map(lambda job: readTwordQuotes(job[1]), jobs)
+        for (tWord, tWordPath), quotes in zip(jobs, results):
+            if len(quotes):
+                mergeQuotes(quotesFound, tWord, quotes)
+
+    if useCache:
+        file.writeJsonFile(cachePath, { 'version': version, 'quotes': quotesFound })
+        logger.info(f"harvestTwordsQuotes - saved quotes cache to {cachePath}")
+    return quotesFound
+
+def getTwordsQuotes(tWordsGreekPath, tWordsTargetPath, tWordsType, newTestament = True, withReferences = False, maxWorkers = 8, useCache = True):
+    harvested = harvestTwordsQuotes(tWordsGreekPath, tWordsType, newTestament, maxWorkers, useCache)
+    tWordsListForType = set(getTwordsListForType(tWordsTargetPath, tWordsType))
+    quotesFound = {}
+    for keyTerm, quotes in harvested.items():
+        if keyTerm in tWordsListForType:
+            quotesFound[keyTerm] = quotes if withReferences else list(quotes.keys())
     # print(f"{len(quotesFound.keys())} unique quotes found in testament: {quotesFound}")
     return quotesFound
 
 def saveTwordsQuotes(outputFolder, tWordsGreekPath, tWordsTargetPath, tWordsType, bibleType, newTestament=True):
-    quotesFound = getTwordsQuotes(tWordsGreekPath, tWordsTargetPath, tWordsType, newTestament)
+    quotesRefs = getTwordsQuotes(tWordsGreekPath, tWordsTargetPath, tWordsType, newTestament, withReferences=True)
+    quotesFound = { keyTerm: list(quotes.keys()) for keyTerm, quotes in quotesRefs.items() }
     if newTestament:
         testament = 'NT'
     else:
         testament = 'OT'
-    print(f"{len(quotesFound.keys())} unique quotes found in {testament}: {quotesFound}")
+    logger.info(f"{len(quotesFound.keys())} unique quotes found in {testament}: {quotesFound}")
     outputPath = f"{outputFolder}/{tWordsType}_{bibleType}_{testament}_quotes.json"
-    print(f"saving quotes to: {outputPath}")
+    logger.info(f"saving quotes to: {outputPath}")
     file.writeJsonFile(outputPath, quotesFound)
+    refsPath = outputPath.replace('_quotes.json', '_quote_refs.json')
+    logger.info(f"saving quote references to: {refsPath}")
+    file.writeJsonFile(refsPath, quotesRefs)
     return quotesFound
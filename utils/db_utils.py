@@ -1,32 +1,162 @@
-import pandas as pd
 import time
 import csv
 import json
 import sqlite3
 import math
+import os
+import pathlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from sqlite3 import Error
 import utils.file_utils as file
 import utils.bible_utils as bible
+import utils.morph_utils as mu
+import utils.text_utils as tu
+import utils.instrument_utils as instrument
+import utils.pipeline_utils as pipeline
+
+# pandas is imported by the functions that use it (import pandas is slow), so scripts that only load or query the
+#   database start quickly
+
+logger = instrument.getLogger('db_utils')
 
 original_words_table = 'original_words'
 target_words_table = 'target_words'
 alignment_table = 'alignment_table'
 original_words_index_table = 'original_words_index_table'
+alignment_scores_table = 'alignment_scores'
+
+# decoded morph fields saved with each original word (coded same as morph_utils.getIndexForChar, -1 if not present)
+morphColumns = [ 'morph_' + field for field in mu.morphFields ]
+
+# precomputed alignment text saved with each alignment (same as origWordsTxt, targetWordsTxt, and alignmentTxt
+#   generated by findAlignmentsForWord)
+alignmentTextColumns = [ 'orig_words_txt', 'target_words_txt', 'alignment_txt' ]
+
+# normalized lookup keys saved with words: *_norm is NFC and case folded, *_key also has accents removed
+#   (see text_utils.getNormalizedKey and text_utils.foldText)
+origWordKeyColumns = [ 'word_norm', 'word_key', 'lemma_norm', 'lemma_key' ]
+targetWordKeyColumns = [ 'word_norm', 'word_key' ]
 
 #########################
 
-def fetchRecords(connection, table, filter, caseInsensitive = False, maxRows = None):
-    select_items = f"SELECT * FROM {table}"
+def getSelectQuery(table, filter, caseInsensitive = False, maxRows = None, columns = '*'):
+    select_items = f"SELECT {columns} FROM {table}"
     if len(filter):
         select_items += f"\nWHERE {filter}"
     if caseInsensitive:
         select_items += ' COLLATE NOCASE'
     if not maxRows is None:
         select_items += f'\n LIMIT {maxRows}'
+    return select_items
+
+def fetchRecords(connection, table, filter, caseInsensitive = False, maxRows = None):
+    select_items = getSelectQuery(table, filter, caseInsensitive, maxRows)
     # print(f"getRecords:\n{select_items}")
     items = execute_read_query_dict(connection, select_items)
     return items
 
+# generator version of fetchRecords - rows are read chunkSize at a time so memory use does not grow with table size
+def fetchRecordsIter(connection, table, filter = '', caseInsensitive = False, maxRows = None, chunkSize = 1000):
+    query = getSelectQuery(table, filter, caseInsensitive, maxRows)
+    for rows in execute_read_query_chunks(connection, query, chunkSize, sqlite3.Row):
+        for row in rows:
+            yield dict(row)
+
+# generator of DataFrames of up to chunkSize rows each
+def fetchDataFrameChunks(connection, table, filter = '', caseInsensitive = False, maxRows = None, chunkSize = 10000, columns = '*'):
+    import pandas as pd
+    query = getSelectQuery(table, filter, caseInsensitive, maxRows, columns)
+    cursor = connection.cursor()
+    cursor.row_factory = None
+    try:
+        with instrument.timedQuery(query):
+            cursor.execute(query)
+    except Error as e:
+        logQueryError("fetchDataFrameChunks", e, query)
+        return
+    columnNames = [ description[0] for description in cursor.description ]
+    while True:
+        rows = cursor.fetchmany(chunkSize)
+        if not rows:
+            break
+        yield pd.DataFrame.from_records(rows, columns=columnNames)
+
+# types for columns of DataFrames of words and alignments.  Other columns are left as read, as are integer columns
+#   with values that are not numbers.
+dataFrameTypes = {
+    'book_id': 'category',
+    'lemma': 'category',
+    'strong': 'category',
+    'morph': 'category',
+    'chapter': 'int16',
+    'verse': 'int16',
+    'word_num': 'int16',
+    'occurrence': 'int16',
+    'alignment_id': 'int32',
+    **{ column: 'int8' for column in morphColumns }
+}
+
+def getTypedColumn(values, dtype):
+    import pandas as pd
+    if dtype == 'category':
+        return pd.Categorical(values)
+    if dtype.startswith('int'):
+        series = pd.Series(values)
+        numbers = pd.to_numeric(series, errors='coerce') # chapter and verse are saved as TEXT
+        if (numbers.isna() & series.notna()).any():
+            return series # keep as read if any value is not a number (e.g. verse span '1-2' or 'front')
+        if numbers.isna().any():
+            return numbers.astype(dtype.capitalize()) # nullable integer type
+        return numbers.astype(dtype)
+    return pd.Series(values).astype(dtype)
+
+# make DataFrame from dict of column name mapped to list of values, converting columns found in dtypes
+def createTypedDataFrame(columns, dtypes = None):
+    import pandas as pd
+    dtypes = dataFrameTypes if dtypes is None else dtypes
+    data = {}
+    for name, values in columns.items():
+        if name in dtypes:
+            data[name] = getTypedColumn(values, dtypes[name])
+        else:
+            data[name] = pd.Series(values) if len(values) else pd.Series([], dtype=object)
+    return pd.DataFrame(data)
+
+# run query and read results column-wise into DataFrame with typed columns
+def readDataFrame(connection, query, dtypes = None):
+    cursor = connection.cursor()
+    cursor.row_factory = None
+    try:
+        with instrument.timedQuery(query):
+            cursor.execute(query)
+            rows = cursor.fetchall()
+    except Error as e:
+        logQueryError("readDataFrame", e, query)
+        return None
+    names = [ description[0] for description in cursor.description ]
+    values = list(zip(*rows)) if rows else [ () for name in names ]
+    return createTypedDataFrame({ name: list(column) for name, column in zip(names, values) }, dtypes)
+
+# DataFrame version of fetchRecords with typed columns
+def fetchRecordsDataFrame(connection, table, filter = '', caseInsensitive = False, maxRows = None, columns = '*', dtypes = None):
+    query = getSelectQuery(table, filter, caseInsensitive, maxRows, columns)
+    return readDataFrame(connection, query, dtypes)
+
+# convert the columns of df found in dtypes
+def setDataFrameTypes(df, dtypes = None):
+    dtypes = dataFrameTypes if dtypes is None else dtypes
+    for name, dtype in dtypes.items():
+        if name in df.columns:
+            df[name] = getTypedColumn(df[name].values, dtype)
+    return df
+
+def countRecords(connection, table, filter = ''):
+    query = getSelectQuery(table, filter, columns = 'COUNT(*)')
+    response = execute_query_single(connection, query)
+    return response[0] if response else 0
+
 def fetchWordsForVerse(connection, table, bookId, chapter, verse, maxRows = None):
     filter = f"(book_id = '{bookId}') AND (chapter = '{chapter}') AND (verse = '{verse}')"
     items = fetchRecords(connection, table, filter, maxRows)
@@ -103,29 +233,69 @@ def findAlignmentsForOriginalWord(connection, word, searchLemma = False):
     found = findAlignmentsForField(connection, field, matchStr)
     return found
 
-def lookupWords(connection, alignment, getOriginalWords):
+# ways to get the words of an alignment:
+#   'query' - look up each word id separately
+#   'batch' - look up all the word ids in one query (or use wordsById if already fetched)
+#   'json' - decode the words saved in the alignment (rows as they were at ingest, no queries)
+HYDRATE_QUERY = 'query'
+HYDRATE_BATCH = 'batch'
+HYDRATE_JSON = 'json'
+
+def getAlignmentWordIds(alignment, getOriginalWords):
     if getOriginalWords:
         alignedWords = alignment['orig_lang_keys']
-        table = original_words_table
     else:
         alignedWords = alignment['target_lang_keys']
+    return [ id for id in alignedWords.split(",") if id ]
+
+def lookupWords(connection, alignment, getOriginalWords, hydrate=HYDRATE_QUERY, wordsById=None):
+    if hydrate == HYDRATE_JSON:
+        field = 'orig_lang_words' if getOriginalWords else 'target_lang_words'
+        return json.loads(alignment[field])
+
+    if getOriginalWords:
+        table = original_words_table
+    else:
         table = target_words_table
     words = []
     # print(f"found ID = {foundId}")
-    ids = alignedWords.split(",")
-    for id in ids:
-        if id:
-            found = findWordById(connection, id, table)
+    ids = getAlignmentWordIds(alignment, getOriginalWords)
+    if hydrate == HYDRATE_BATCH:
+        if wordsById is None:
+            wordsById = fetchWordsByIds(connection, ids, table)
+        for id in ids:
+            found = wordsById.get(int(id))
             if found:
                 words.append(found)
+            else:
+                logger.warning(f"lookupWords - {id} not found")
+        return words
+
+    for id in ids:
+        found = findWordById(connection, id, table)
+        if found:
+            words.append(found)
     return words
 
+# fetch words for list of ids with as few queries as possible.  Returns dict of id mapped to word
+def fetchWordsByIds(connection, ids, table, chunkSize=500):
+    return fetchRecordsByIds(connection, ids, table, chunkSize)
+
+def fetchRecordsByIds(connection, ids, table, chunkSize=500):
+    ids = sorted(set([ int(id) for id in ids if int(id) >= 0 ]))
+    recordsById = {}
+    for i in range(0, len(ids), chunkSize):
+        idsStr = ','.join([ str(id) for id in ids[i:i + chunkSize] ])
+        for record in fetchRecords(connection, table, f"id IN ({idsStr})"):
+            recordsById[record['id']] = record
+    return recordsById
+
 def findWordById(connection, id, table):
     search = f"id = {str(id)}"
     items = fetchRecords(connection, table, search)
     if items:
         return items[0]
-    print(f"findWordById - {id} not found")
+    logger.warning(f"findWordById - {id} not found")
     return None
 
 def findWord(connection, word, searchOriginal = True, searchLemma = False, caseInsensitive = False, maxRows = None):
@@ -143,6 +313,34 @@ def findWord(connection, word, searchOriginal = True, searchLemma = False, caseI
     # print (f"{len(words)} items in search: {search}")
     return words
 
+# find word ignoring unicode composition and case (and accents if stripAccents) using the precomputed lookup keys
+def findWordNormalized(connection, word, searchOriginal = True, searchLemma = False, stripAccents = False, maxRows = None):
+    column = getWordKeyColumn(searchLemma, stripAccents)
+    key = getWordKey(word, column).replace("'", "''")
+    table = original_words_table if searchOriginal else target_words_table
+    return fetchRecords(connection, table, f"{column} = '{key}'", maxRows=maxRows)
+
+# batch version of findWordNormalized.  Returns dict of word mapped to list of found words
+def findWordsNormalized(connection, words, searchOriginal = True, searchLemma = False, stripAccents = False, chunkSize = 500):
+    column = getWordKeyColumn(searchLemma, stripAccents)
+    table = original_words_table if searchOriginal else target_words_table
+    wordsForKeys = {}
+    for word in words:
+        wordsForKeys.setdefault(getWordKey(word, column), []).append(word)
+
+    results = { word: [] for word in words }
+    keys = list(wordsForKeys.keys())
+    for i in range(0, len(keys), chunkSize):
+        keysStr = ', '.join([ "'" + key.replace("'", "''") + "'" for key in keys[i:i + chunkSize] ])
+        for record in fetchRecords(connection, table, f"{column} IN ({keysStr}) ORDER BY id"):
+            for word in wordsForKeys[record[column]]:
+                results[word].append(record)
+    return results
+
+def getWordKeyColumn(searchLemma, stripAccents):
+    field = 'lemma' if searchLemma else 'word'
+    return f"{field}_key" if stripAccents else f"{field}_norm"
+
 def findWords(connection, words, searchOriginal = True, searchLemma = False, caseInsensitive = False, maxRows = None):
     searches = ''
     for word in words:
@@ -195,6 +393,7 @@ def addMultipleItemsToDatabase(connection, table, db_words):
         add_words = createCommandToAddToDatabase(table, db_words)
         # print(f"addMultipleItemsToDatabase:\n{add_words}")
         execute_query(connection, add_words)
+        instrument.increment(f'rows.{table}', len(db_words))
 
 def getRowCount(connection, table):
     command = f'SELECT COUNT(*) FROM {table};'
@@ -212,16 +411,18 @@ def writeRowToDB(connection, table, data, update=False):
     sql = f''' {cmd} INTO {table}({header})
               VALUES({row}) '''
     cur = connection.cursor()
-    cur.execute(sql)
-    connection.commit()
+    with instrument.timedQuery(sql):
+        cur.execute(sql)
+        connection.commit()
+    instrument.increment(f'rows.{table}')
     return cur.lastrowid
 
 def resetTable(connection, table):
-    print(f"resetTable - dropping table: {table}")
+    logger.info(f"resetTable - dropping table: {table}")
     command = f"DROP TABLE {table};"
     execute_query(connection, create_alignment_table)
 
-    print(f"resetTable - initializing table: {table}")
+    logger.info(f"resetTable - initializing table: {table}")
     if table == target_words_table:
         execute_query(connection, create_target_words_table)
     elif table == alignment_table:
@@ -229,56 +430,145 @@ def resetTable(connection, table):
     elif table == original_words_table:
         execute_query(connection, create_original_words_table)
     else:
-        print(f"resetTable - unknown table: {table}")
+        logger.warning(f"resetTable - unknown table: {table}")
 
 #########################
 
-def create_connection(path):
+# connection profiles - PRAGMAs applied for each kind of workload
+PROFILE_DEFAULT = 'default'
+PROFILE_BULK_LOAD = 'bulk-load'
+PROFILE_BULK_LOAD_UNSAFE = 'bulk-load-unsafe'
+PROFILE_READ_ANALYTICS = 'read-analytics'
+PROFILE_READ_ONLY = 'read-only'
+
+connectionProfiles = {
+    # larger page cache and memory mapped reads, sqlite defaults for journal and sync
+    PROFILE_DEFAULT: {
+        'cache_size': -65536, # in KB
+        'temp_store': 'MEMORY',
+        'mmap_size': 268435456,
+    },
+    # write ahead log with fewer syncs - still safe on crash (may lose the last transactions, not corrupt)
+    PROFILE_BULK_LOAD: {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -262144,
+        'temp_store': 'MEMORY',
+    },
+    # no syncs and journal in memory - a crash or power loss can corrupt the database, so only for databases that
+    #   are being rebuilt from scratch
+    PROFILE_BULK_LOAD_UNSAFE: {
+        'journal_mode': 'MEMORY',
+        'synchronous': 'OFF',
+        'locking_mode': 'EXCLUSIVE',
+        'cache_size': -262144,
+        'temp_store': 'MEMORY',
+    },
+    PROFILE_READ_ANALYTICS: {
+        'cache_size': -262144,
+        'temp_store': 'MEMORY',
+        'mmap_size': 1073741824,
+    },
+    PROFILE_READ_ONLY: {
+        'query_only': 'ON',
+        'cache_size': -65536,
+        'temp_store': 'MEMORY',
+        'mmap_size': 1073741824,
+    },
+}
+
+unsafeProfiles = [ PROFILE_BULK_LOAD_UNSAFE ]
+
+def applyConnectionProfile(connection, profile = PROFILE_DEFAULT, allowUnsafe = False):
+    if profile not in connectionProfiles:
+        raise ValueError(f"applyConnectionProfile - unknown profile '{profile}'")
+    if (profile in unsafeProfiles) and not allowUnsafe:
+        raise ValueError(f"applyConnectionProfile - profile '{profile}' can corrupt the database on a crash, must set allowUnsafe")
+
+    cursor = connection.cursor()
+    for pragma, value in connectionProfiles[profile].items():
+        cursor.execute(f"PRAGMA {pragma} = {value};")
+        cursor.fetchall() # some pragmas (e.g. journal_mode) return the new value
+
+# copy write ahead log into the database files (no-op if not in WAL mode)
+def checkpointConnections(connections):
+    for connection in connections.values():
+        execute_query(connection, "PRAGMA wal_checkpoint(TRUNCATE);")
+
+def logQueryError(name, e, query):
+    instrument.increment('sql.errors')
+    logger.error(f"{name} - The error '{e}' occurred, query: {query}")
+
+def create_connection(path, profile = None, allowUnsafe = False):
     connection = None
     try:
         connection = sqlite3.connect(path)
-        print("Connection to SQLite DB successful")
+        if instrument.traceSql:
+            instrument.traceConnection(connection)
+        if profile:
+            applyConnectionProfile(connection, profile, allowUnsafe)
+        logger.debug("Connection to SQLite DB successful")
     except Error as e:
-        print(f"create_connection - The error '{e}' occurred")
+        logger.error(f"create_connection - The error '{e}' occurred")
 
     return connection
 
 def execute_query(connection, query):
     cursor = connection.cursor()
     try:
-        cursor.execute(query)
-        connection.commit()
+        with instrument.timedQuery(query):
+            cursor.execute(query)
+            connection.commit()
         # print("Query executed successfully")
     except Error as e:
-        print(f"execute_query - The error '{e}' occurred, query: {query}")
+        logQueryError("execute_query", e, query)
 
 def execute_read_query(connection, query):
     cursor = connection.cursor()
     result = None
     try:
-        cursor.execute(query)
-        result = cursor.fetchall()
+        with instrument.timedQuery(query):
+            cursor.execute(query)
+            result = cursor.fetchall()
         return result
     except Error as e:
-        print(f"execute_read_query - The error '{e}' occurred, query: {query}")
+        logQueryError("execute_read_query", e, query)
 
 def execute_query_single(connection, query):
     cursor = connection.cursor()
     result = None
     try:
-        cursor.execute(query)
-        result = cursor.fetchone()
+        with instrument.timedQuery(query):
+            cursor.execute(query)
+            result = cursor.fetchone()
         return result
     except Error as e:
-        print(f"execute_read_query - The error '{e}' occurred, query: {query}")
+        logQueryError("execute_read_query", e, query)
+
+# generator of lists of up to chunkSize rows
+def execute_read_query_chunks(connection, query, chunkSize = 1000, rowFactory = None):
+    cursor = connection.cursor()
+    cursor.row_factory = rowFactory
+    try:
+        with instrument.timedQuery(query):
+            cursor.execute(query)
+    except Error as e:
+        logQueryError("execute_read_query_chunks", e, query)
+        return
+    while True:
+        rows = cursor.fetchmany(chunkSize)
+        if not rows:
+            break
+        yield rows
 
 def execute_read_query_dict(connection, query):
-    connection.row_factory = sqlite3.Row
     cursor = connection.cursor()
+    cursor.row_factory = sqlite3.Row # only for this cursor, so other queries on connection still get tuples
     result = None
     try:
-        cursor.execute(query)
-        found = cursor.fetchall()
+        with instrument.timedQuery(query):
+            cursor.execute(query)
+            found = cursor.fetchall()
         result = []
         for r in found:
             row = dict(r)
@@ -286,7 +576,7 @@ def execute_read_query_dict(connection, query):
             result.append(row)
         return result
     except Error as e:
-        print(f"execute_read_query_dict - The error '{e}' occurred, query: {query}")
+        logQueryError("execute_read_query_dict", e, query)
 
 create_original_words_table = f"""
 CREATE TABLE IF NOT EXISTS {original_words_table} (
@@ -300,7 +590,9 @@ CREATE TABLE IF NOT EXISTS {original_words_table} (
   strong TEXT,
   lemma TEXT,
   morph TEXT,
-  alignment_id INTEGER
+  alignment_id INTEGER,
+  {', '.join([ column + ' INTEGER' for column in morphColumns ])},
+  {', '.join([ column + ' TEXT' for column in origWordKeyColumns ])}
 );
 """
 
@@ -313,7 +605,8 @@ CREATE TABLE IF NOT EXISTS {target_words_table} (
   word_num INTEGER,
   word TEXT NOT NULL,
   occurrence INTEGER,
-  alignment_id INTEGER
+  alignment_id INTEGER,
+  {', '.join([ column + ' TEXT' for column in targetWordKeyColumns ])}
 );
 """
 
@@ -327,10 +620,33 @@ CREATE TABLE IF NOT EXISTS {alignment_table} (
   orig_lang_keys TEXT NOT NULL,
   target_lang_keys TEXT NOT NULL,
   orig_lang_words TEXT NOT NULL,
-  target_lang_words TEXT NOT NULL
+  target_lang_words TEXT NOT NULL,
+  orig_words_txt TEXT,
+  target_words_txt TEXT,
+  alignment_txt TEXT
 );
 """
 
+# anomaly scores of alignments (see utils/score_utils.py), one row for each original word of an alignment.  Saved in
+#   its own database (getScoresSqlPath) so scoring does not change the alignments database read by the other stages
+create_alignment_scores_table = f"""
+CREATE TABLE IF NOT EXISTS {alignment_scores_table} (
+  alignment_id INTEGER NOT NULL,
+  original_word TEXT NOT NULL,
+  lemma TEXT NOT NULL,
+  alignment_text TEXT NOT NULL,
+  score REAL NOT NULL,
+  rank INTEGER NOT NULL,
+  top_percent REAL NOT NULL, -- rank as % of all rows, e.g. 1.0 is in the 1% most unusual
+  frequency_score REAL,
+  orig_words_score REAL,
+  target_words_score REAL,
+  orig_words_between_score REAL,
+  target_words_between_score REAL,
+  in_training INTEGER
+)
+"""
+
 create_original_words_index_table = f"""
 CREATE TABLE IF NOT EXISTS {original_words_index_table} (
   originalWord TEXT PRIMARY KEY,
@@ -342,22 +658,255 @@ CREATE TABLE IF NOT EXISTS {original_words_index_table} (
 );
 """
 
+def getTableColumns(connection, table):
+    rows = execute_read_query(connection, f"PRAGMA table_info({table});")
+    return [ row[1] for row in rows ]
+
+# add columns missing from table (for databases created by older versions)
+def ensureColumns(connection, table, columns, type_='INTEGER'):
+    existing = getTableColumns(connection, table)
+    added = []
+    for column in columns:
+        if column not in existing:
+            execute_query(connection, f"ALTER TABLE {table} ADD COLUMN {column} {type_};")
+            added.append(column)
+    return added
+
+def createMorphIndexes(connection):
+    for column in morphColumns:
+        execute_query(connection, f"CREATE INDEX IF NOT EXISTS idx_{original_words_table}_{column} ON {original_words_table} ({column});")
+
+def createWordIndexes(connection):
+    for table in [original_words_table, target_words_table]:
+        # for finding the words of an alignment while loading (fetchForWordInVerse), without this common words need
+        #   a scan of all their occurrences
+        execute_query(connection, f"CREATE INDEX IF NOT EXISTS idx_{table}_verse_word ON {table} (book_id, chapter, verse, word, occurrence);")
+        execute_query(connection, f"CREATE INDEX IF NOT EXISTS idx_{table}_word ON {table} (word);")
+        execute_query(connection, f"CREATE INDEX IF NOT EXISTS idx_{table}_word_nocase ON {table} (word COLLATE NOCASE);")
+        execute_query(connection, f"CREATE INDEX IF NOT EXISTS idx_{table}_alignment_id ON {table} (alignment_id);")
+    execute_query(connection, f"CREATE INDEX IF NOT EXISTS idx_{original_words_table}_lemma ON {original_words_table} (lemma);")
+    for table, keyColumns in getWordKeyColumns().items():
+        for column in keyColumns:
+            execute_query(connection, f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ({column});")
+    execute_query(connection, f"CREATE INDEX IF NOT EXISTS idx_{original_words_table}_lemma_nocase ON {original_words_table} (lemma COLLATE NOCASE);")
+
+# set alignment_id of original and target words from alignments.  If a word is in more than one alignment, the
+#   first alignment is used (same as findAlignmentForWord)
+def updateWordAlignmentIds(connection, alignments):
+    for table, keysField in [(original_words_table, 'orig_lang_keys'), (target_words_table, 'target_lang_keys')]:
+        alignmentIds = {}
+        for alignment in alignments:
+            for id in alignment[keysField].split(','):
+                if id and (id not in alignmentIds):
+                    alignmentIds[id] = alignment['id']
+        cursor = connection.cursor()
+        cursor.executemany(f"UPDATE {table} SET alignment_id = ? WHERE id = ?;",
+                           [ (alignmentId, int(id)) for id, alignmentId in alignmentIds.items() ])
+    connection.commit()
+
+@instrument.timer('ingest.wordAlignmentIds')
+def updateWordAlignmentIdsForBook(connection, bookId):
+    query = f"SELECT id, orig_lang_keys, target_lang_keys FROM {alignment_table} WHERE book_id = '{bookId}' ORDER BY id;"
+    alignments = execute_read_query_dict(connection, query)
+    updateWordAlignmentIds(connection, alignments)
+
+def getWordKeyColumns():
+    return {
+        original_words_table: origWordKeyColumns,
+        target_words_table: targetWordKeyColumns
+    }
+
+# fill in normalized lookup keys for words that do not have them yet
+def backfillWordKeyColumns(connection):
+    total = 0
+    for table, keyColumns in getWordKeyColumns().items():
+        fields = [ column.rsplit('_', 1)[0] for column in keyColumns ]
+        uniqueFields = list(dict.fromkeys(fields))
+        rows = execute_read_query(connection, f"SELECT id, {', '.join(uniqueFields)} FROM {table} WHERE word_key IS NULL;")
+        if not rows:
+            continue
+
+        values = []
+        for row in rows:
+            fieldValues = dict(zip(uniqueFields, row[1:]))
+            keys = [ getWordKey(fieldValues[field], column) for field, column in zip(fields, keyColumns) ]
+            values.append(keys + [row[0]])
+        setStr = ', '.join([ f"{column} = ?" for column in keyColumns ])
+        cursor = connection.cursor()
+        cursor.executemany(f"UPDATE {table} SET {setStr} WHERE id = ?;", values)
+        connection.commit()
+        total += len(rows)
+    if total:
+        logger.info(f"backfillWordKeyColumns - added lookup keys for {total} words")
+    return total
+
+# fill in alignment text columns and word alignment ids for alignments that do not have them yet
+def backfillAlignmentColumns(connection):
+    query = f"SELECT id, orig_lang_keys, target_lang_keys, orig_lang_words, target_lang_words FROM {alignment_table} WHERE alignment_txt IS NULL ORDER BY id;"
+    alignments = execute_read_query_dict(connection, query)
+    if not alignments:
+        return 0
+
+    values = []
+    for alignment in alignments:
+        texts = getAlignmentTexts(json.loads(alignment['orig_lang_words']), json.loads(alignment['target_lang_words']))
+        values.append(list(texts) + [alignment['id']])
+    setStr = ', '.join([ f"{column} = ?" for column in alignmentTextColumns ])
+    cursor = connection.cursor()
+    cursor.executemany(f"UPDATE {alignment_table} SET {setStr} WHERE id = ?;", values)
+    connection.commit()
+    updateWordAlignmentIds(connection, alignments)
+    logger.info(f"backfillAlignmentColumns - added text for {len(alignments)} alignments")
+    return len(alignments)
+
+# fill in decoded morph columns for original words that do not have them yet
+def backfillMorphColumns(connection):
+    rows = execute_read_query(connection, f"SELECT id, morph FROM {original_words_table} WHERE morph_role IS NULL;")
+    if not rows:
+        return 0
+
+    ids = [ row[0] for row in rows ]
+    decoded = mu.decodeMorphColumn([ row[1] for row in rows ])
+    values = decoded[mu.morphFields].astype(int).values.tolist()
+    setStr = ', '.join([ f"{column} = ?" for column in morphColumns ])
+    cursor = connection.cursor()
+    cursor.executemany(f"UPDATE {original_words_table} SET {setStr} WHERE id = ?;",
+                       [ codes + [id] for codes, id in zip(values, ids) ])
+    connection.commit()
+    logger.info(f"backfillMorphColumns - decoded morphs for {len(ids)} words")
+    return len(ids)
+
+# true if database has been created or migrated by this version, so every aligned word has alignment_id (a NULL
+#   alignment_id is an unaligned word).  Databases loaded by older versions and not migrated (e.g. only opened
+#   read only) do not have the alignment text columns, which migrateAlignmentDB adds with the word alignment ids
+def isAlignmentDBMigrated(connection):
+    return alignmentTextColumns[-1] in getTableColumns(connection, alignment_table)
+
+# add columns and indexes missing from databases created by older versions
+def migrateAlignmentDB(connection):
+    ensureColumns(connection, original_words_table, morphColumns)
+    backfillMorphColumns(connection)
+    createMorphIndexes(connection)
+    ensureColumns(connection, alignment_table, alignmentTextColumns, 'TEXT')
+    backfillAlignmentColumns(connection)
+    ensureColumns(connection, original_words_table, origWordKeyColumns, 'TEXT')
+    ensureColumns(connection, target_words_table, targetWordKeyColumns, 'TEXT')
+    backfillWordKeyColumns(connection)
+    createWordIndexes(connection)
+
 # will create and initialize the database if it does not exist or tables not created
+# profile selects the PRAGMAs for the workload (see connectionProfiles), unsafe profiles also need allowUnsafe
 # will return connection
-def initAlignmentDB(dbPath):
-    connection = create_connection(dbPath)
+def initAlignmentDB(dbPath, profile = PROFILE_DEFAULT, allowUnsafe = False):
+    connection = create_connection(dbPath, profile, allowUnsafe)
     owIndexPath = getOrigLangIndexSqlPath(dbPath)
-    connection_owi = create_connection(owIndexPath)
-    execute_query(connection, create_original_words_table)
-    execute_query(connection, create_target_words_table)
-    execute_query(connection, create_alignment_table)
-    execute_query(connection_owi, create_original_words_index_table)
+    connection_owi = create_connection(owIndexPath, profile, allowUnsafe)
+    if profile != PROFILE_READ_ONLY: # read only connections cannot create or update tables
+        execute_query(connection, create_original_words_table)
+        execute_query(connection, create_target_words_table)
+        execute_query(connection, create_alignment_table)
+        execute_query(connection_owi, create_original_words_index_table)
+        migrateAlignmentDB(connection)
     connections = {
         'default': connection,
         'original_words_index_table': connection_owi
     }
     return connections
 
+# name the original words index database is attached as on read only connections
+owIndexSchema = 'ow_index'
+# and the scores database, if alignments have been scored
+scoresSchema = 'scores'
+
+def getReadOnlyUri(path):
+    return pathlib.Path(path).resolve().as_uri() + '?mode=ro'
+
+# open read only connection to alignments database with the original words index database (and scores database if
+#   there is one) attached, so all can be queried on the same connection (table names are unique, so they do not need
+#   the schema prefix).  Does not create
+#   or update any tables, the databases must already have been loaded.
+def create_read_only_connection(dbPath, profile = PROFILE_READ_ONLY):
+    connection = None
+    try:
+        # check_same_thread off so pool can close it, each connection is still only used by the thread that opened it
+        connection = sqlite3.connect(getReadOnlyUri(dbPath), uri=True, check_same_thread=False)
+        if instrument.traceSql:
+            instrument.traceConnection(connection)
+        connection.execute(f"ATTACH DATABASE ? AS {owIndexSchema};", (getReadOnlyUri(getOrigLangIndexSqlPath(dbPath)),))
+        scoresPath = getScoresSqlPath(dbPath)
+        if os.path.isfile(scoresPath):
+            connection.execute(f"ATTACH DATABASE ? AS {scoresSchema};", (getReadOnlyUri(scoresPath),))
+        if profile:
+            applyConnectionProfile(connection, profile)
+    except Error as e:
+        logger.error(f"create_read_only_connection - The error '{e}' occurred, path: {dbPath}")
+        if connection:
+            connection.close()
+        connection = None
+
+    return connection
+
+# pool of read only connections to an alignments database, one for each thread (and process, connections are not
+#   shared with forked processes).  getConnections() returns the same dict as initAlignmentDB, so it can be used with
+#   getConnectionForTable and the existing query functions.
+class ReadOnlyConnectionPool:
+    def __init__(self, dbPath, profile = PROFILE_READ_ONLY):
+        self.dbPath = dbPath
+        self.profile = profile
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.opened = []
+        self.pid = os.getpid()
+
+    def getConnection(self):
+        if os.getpid() != self.pid: # forked, connections of parent process cannot be used
+            self.local = threading.local()
+            self.opened = []
+            self.pid = os.getpid()
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = create_read_only_connection(self.dbPath, self.profile)
+            if connection is None:
+                raise RuntimeError(f"ReadOnlyConnectionPool - could not open {self.dbPath}")
+            self.local.connection = connection
+            with self.lock:
+                self.opened.append(connection)
+        return connection
+
+    def getConnections(self):
+        connection = self.getConnection()
+        return {
+            'default': connection,
+            original_words_index_table: connection
+        }
+
+    # call func(connection, item) for each of items using up to maxWorkers threads, returns results in order of items
+    def map(self, func, items, maxWorkers = 4):
+        if maxWorkers <= 1:
+            connection = self.getConnection()
+            return [ func(connection, item) for item in items ]
+
+        with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+            return list(executor.map(lambda item: func(self.getConnection(), item), items))
+
+    # close connections opened by this process, call after the worker threads have finished
+    def close(self):
+        with self.lock:
+            opened = self.opened
+            self.opened = []
+        for connection in opened:
+            try:
+                connection.close()
+            except Error:
+                pass
+        self.local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
 def getConnectionForTable(connections, table):
     if table in connections:
         return connections[table]
@@ -367,6 +916,9 @@ def getConnectionForTable(connections, table):
 def getOrigLangIndexSqlPath(dbPath):
     return dbPath.replace('.sqlite', '.ow_index.sqlite')
 
+def getScoresSqlPath(dbPath):
+    return dbPath.replace('.sqlite', '.scores.sqlite')
+
 def getWordsFromVerse(verseObjects):
     words = []
     for i in range(len(verseObjects)):
@@ -477,6 +1029,10 @@ def getDbOrigLangWordsForVerse(words, bookId, chapter, verse):
             'lemma': getKey(word,'lemma'),
             'morph': getKey(word,'morph')
         }
+        morphCodes = mu.getMorphFieldCodes(db_word['morph'])
+        for column, code in zip(morphColumns, morphCodes):
+            db_word[column] = code
+        addWordKeys(db_word, origWordKeyColumns)
         # print(f'At {i} new word entry: {db_word}')
         db_words.append(db_word)
     return db_words
@@ -494,10 +1050,22 @@ def getDbTargetLangWordsForVerse(words, bookId, chapter, verse):
             'word': text,
             'occurrence': getOccurrences(text, db_words) + 1
         }
+        addWordKeys(db_word, targetWordKeyColumns)
         # print(f'At {i} new word entry: {db_word}')
         db_words.append(db_word)
     return db_words
 
+def getWordKey(value, column):
+    if column.endswith('_key'):
+        return tu.foldText(value)
+    return tu.getNormalizedKey(value)
+
+# modifies db_word
+def addWordKeys(db_word, keyColumns):
+    for column in keyColumns:
+        field = column.rsplit('_', 1)[0] # e.g. 'word' for 'word_norm'
+        db_word[column] = getWordKey(db_word[field], column)
+
 def getWordText(word):
     key = 'text'
     if key in word:
@@ -514,6 +1082,7 @@ def getDataItems(db_word):
             line_data += ', '
 
         if isinstance(value, str):
+            value = value.replace("'", "''")
             line_data = f"{line_data}'{value}'"
         else:
             line_data = f"{line_data}{value}"
@@ -538,17 +1107,20 @@ def getVerses(chapter_dict):
             foundNonNumericalVerse.append(verse)
     return verses
 
-def loadAllWordsFromBookIntoDB(connection, origLangPath, bookId, table):
-    deleteWordsForBook(connection, table, bookId)
+# parsed original language words by (origLangPath, bookId), shared by all target languages in a batch run
+origLangWordsCache = {}
 
+def getWordsForBook(origLangPath, bookId, table):
     if table == original_words_table:
         getWordsForVerse = getDbOrigLangWordsForVerse
     else:
         getWordsForVerse = getDbTargetLangWordsForVerse
 
+    # returns list of db_words for each verse
+    bookWords = []
     chapters = bible.getChaptersForBook(bookId)
     for chapter in chapters:
-        print(f"{bookId} - Reading chapter {chapter}")
+        logger.debug("%s - Reading chapter %s", bookId, chapter)
 
         chapterPath = f"{origLangPath}/{bookId}/{chapter}.json"
         chapter_dict = file.readJsonFile(chapterPath)
@@ -558,15 +1130,112 @@ def loadAllWordsFromBookIntoDB(connection, origLangPath, bookId, table):
             # print(f"Reading verse {verse}")
             words = getVerseWordsFromChapter(chapter_dict, verse)
             db_words = getWordsForVerse(words, bookId, chapter, verse)
+            bookWords.append(db_words)
+    return bookWords
+
+@instrument.timer('ingest.words')
+def loadAllWordsFromBookIntoDB(connection, origLangPath, bookId, table):
+    deleteWordsForBook(connection, table, bookId)
+
+    cacheKey = (origLangPath, bookId)
+    if (table == original_words_table) and (cacheKey in origLangWordsCache):
+        logger.debug(f"{bookId} - Using cached original language words")
+        bookWords = origLangWordsCache[cacheKey]
+    else:
+        bookWords = getWordsForBook(origLangPath, bookId, table)
+
+    for db_words in bookWords:
+        # print(f"For {chapter}:{verse} Saving {len(db_words)}")
+        addMultipleItemsToDatabase(connection, table, db_words)
+
+ORIG_LANG_CORPUS_CACHE_VERSION = 1 # change when format of cached words changes
+
+# cache is saved next to the (versioned) original language folder, not in it, so saving it does not change the inputs
+#   of the pipeline stages that read that folder
+def getOrigLangCorpusCachePath(origLangPath, newTestament):
+    testamentStr = "NT" if newTestament else "OT"
+    return f"{os.path.normpath(origLangPath)}.original_words_{testamentStr}.json"
 
-            # print(f"For {chapter}:{verse} Saving {len(db_words)}")
-            addMultipleItemsToDatabase(connection, table, db_words)
+# hash of the book folders the cache is made from, so a cache of changed files is not used
+def getOrigLangCorpusSource(origLangPath, newTestament):
+    return pipeline.getPathsHash([ f"{origLangPath}/{bookId}" for bookId in bible.getBookList(newTestament) ])
+
+# load cached original language words for testament if the cache is current, returns True if loaded
+def loadOrigLangCorpusCache(origLangPath, newTestament):
+    cachePath = getOrigLangCorpusCachePath(origLangPath, newTestament)
+    if not file.doesFileExist(cachePath):
+        return False
+    try:
+        cached = file.readJsonFile(cachePath)
+    except ValueError as e:
+        logger.warning(f"loadOrigLangCorpusCache - ignoring unreadable cache {cachePath}: {e}")
+        return False
+    if not isinstance(cached, dict) or cached.get('formatVersion') != ORIG_LANG_CORPUS_CACHE_VERSION:
+        logger.info(f"loadOrigLangCorpusCache - ignoring cache of older format {cachePath}")
+        return False
+    if cached.get('source') != getOrigLangCorpusSource(origLangPath, newTestament):
+        logger.info(f"loadOrigLangCorpusCache - ignoring stale cache {cachePath}")
+        return False
+    for bookId, bookWords in cached['books'].items():
+        origLangWordsCache[(origLangPath, bookId)] = bookWords
+    logger.info(f"loadOrigLangCorpusCache - loaded original language words from {cachePath}")
+    return True
+
+# parse the original language words for testament once and save them so other processes can load them.  The cache is
+#   only written if it is missing or stale.
+def saveOrigLangCorpusCache(origLangPath, newTestament):
+    cachePath = getOrigLangCorpusCachePath(origLangPath, newTestament)
+    if loadOrigLangCorpusCache(origLangPath, newTestament):
+        return cachePath
+
+    source = getOrigLangCorpusSource(origLangPath, newTestament)
+    corpus = {}
+    for bookId in bible.getBookList(newTestament):
+        bookWords = getWordsForBook(origLangPath, bookId, original_words_table)
+        origLangWordsCache[(origLangPath, bookId)] = bookWords
+        corpus[bookId] = bookWords
+    file.writeJsonFileAtomic(cachePath, { 'formatVersion': ORIG_LANG_CORPUS_CACHE_VERSION, 'source': source, 'books': corpus })
+    logger.info(f"saveOrigLangCorpusCache - saved original language words to {cachePath}")
+    return cachePath
 
 def loadAllWordsFromTestamentIntoDB(connection, origLangPath, newTestament, table):
     books = bible.getBookList(newTestament)
     for book in books:
-        print (f"loadAllWordsFromTestamentIntoDB - reading {book}")
+        logger.debug(f"loadAllWordsFromTestamentIntoDB - reading {book}")
         loadAllWordsFromBookIntoDB(connection, origLangPath, book, table)
+    if table == original_words_table:
+        # in case words came from a corpus cache saved without these columns
+        backfillMorphColumns(connection)
+        backfillWordKeyColumns(connection)
+
+# make filter for original words on decoded morph fields, e.g. getMorphFilter(role='V', tense='A')
+def getMorphFilter(**fieldChars):
+    filters = []
+    for field, char in fieldChars.items():
+        if field not in mu.morphFields:
+            raise ValueError(f"getMorphFilter - unknown morph field '{field}'")
+        filters.append(f"(morph_{field} = {mu.getIndexForChar(char)})")
+    return ' AND '.join(filters)
+
+# count original words grouped by morph fields (e.g. ['role', 'case']), optionally limited by filter.
+#   Returns list of dicts with code and key (char) for each field, and count
+def fetchMorphFieldCounts(connection, fields, filter=''):
+    columns = ', '.join([ 'morph_' + field for field in fields ])
+    query = f"SELECT {columns}, COUNT(*) AS count FROM {original_words_table}"
+    if len(filter):
+        query += f"\nWHERE {filter}"
+    query += f"\nGROUP BY {columns}\nORDER BY count DESC;"
+    rows = execute_read_query_dict(connection, query)
+    results = []
+    for row in rows:
+        result = {}
+        for field in fields:
+            code = row['morph_' + field]
+            result[field] = code
+            result[field + '_key'] = mu.getCharForIndex(code)
+        result['count'] = row['count']
+        results.append(result)
+    return results
 
 def findWordsForAlignment(connection, bookId, chapter, verse, alignment, alignmentNum, alignmentId):
     topwords = alignment['topWords']
@@ -590,7 +1259,7 @@ def findWordsForAlignment(connection, bookId, chapter, verse, alignment, alignme
         else:
             pos = '-1'
             missingWord = True
-            print(f"saveTargetWordsForAlignment - missing {word}-{occurrence} in {bookId}-{chapter}:{verse}")
+            logger.warning(f"saveTargetWordsForAlignment - missing {word}-{occurrence} in {bookId}-{chapter}:{verse}")
         targetIndices += pos
     targetIndices = f",{targetIndices}," # wrap to make searching easier
 
@@ -609,14 +1278,15 @@ def findWordsForAlignment(connection, bookId, chapter, verse, alignment, alignme
         else:
             pos = '-1'
             missingWord = True
-            print(f"saveTargetWordsForAlignment - missing {word}-{occurrence} in {bookId}-{chapter}:{verse}")
+            logger.warning(f"saveTargetWordsForAlignment - missing {word}-{occurrence} in {bookId}-{chapter}:{verse}")
         originalIndices = originalIndices + pos
     originalIndices = f",{originalIndices}," # wrap to make searching easier
 
     if missingWord:
-        print(f"saveTargetWordsForAlignment - ignoring broken alignment in {bookId}-{chapter}:{verse}")
+        logger.warning(f"saveTargetWordsForAlignment - ignoring broken alignment in {bookId}-{chapter}:{verse}")
         return None, None, None
 
+    origWordsTxt, targetWordsTxt, alignmentTxt = getAlignmentTexts(originalWords, targetWords)
     alignment_ = {
         'id': alignmentId,
         'book_id': bookId,
@@ -626,7 +1296,10 @@ def findWordsForAlignment(connection, bookId, chapter, verse, alignment, alignme
         'orig_lang_keys':originalIndices,
         'target_lang_keys': targetIndices,
         'orig_lang_words': json.dumps(originalWords, ensure_ascii = False),
-        'target_lang_words': json.dumps(targetWords, ensure_ascii = False)
+        'target_lang_words': json.dumps(targetWords, ensure_ascii = False),
+        'orig_words_txt': origWordsTxt,
+        'target_words_txt': targetWordsTxt,
+        'alignment_txt': alignmentTxt
     }
     return alignment_, originalWords, targetWords
 
@@ -639,6 +1312,25 @@ def getNextAlignmentId(connection, alignment_table):
 
     return 1
 
+# summary of alignment saved in original words index - the full word lists are not kept, so index stays small
+def getAlignmentSummary(alignmentKey, alignment, originalWords, targetWords):
+    origWordsTxt, origWordsCount = combineWordList2(originalWords)
+    targetWordsTxt, targetWordsCount = combineWordList2(targetWords)
+    return {
+        'alignment_key': alignmentKey,
+        'book_id': alignment['book_id'],
+        'chapter': alignment['chapter'],
+        'verse': alignment['verse'],
+        'alignment_num': str(alignment['alignment_num']),
+        'origWordsText': origWordsTxt,
+        'origWordsCount': origWordsCount,
+        'origWordsBetween': getSpan(originalWords) - (origWordsCount - 1),
+        'targetWordsText': targetWordsTxt,
+        'targetWordsCount': targetWordsCount,
+        'targetWordsBetween': getSpan(targetWords) - (targetWordsCount - 1),
+        'alignmentText': f"{origWordsTxt} = {targetWordsTxt}",
+    }
+
 def saveAlignmentsForVerse(connection, alignmentsIndex, bookId, chapter, verse, verseAlignments):
     alignmentsFound = False
     numAlignments = len(verseAlignments)
@@ -650,33 +1342,14 @@ def saveAlignmentsForVerse(connection, alignmentsIndex, bookId, chapter, verse,
         if alignment:
             alignmentsFound = True
             id = writeRowToDB(connection, alignment_table, alignment)
+            summary = getAlignmentSummary(id, alignment, originalWords, targetWords)
             for origW in originalWords:
-                wordText = origW['word']
-                alignmentData = {
-                    'alignment_key': id,
-                    'originalWords': originalWords,
-                    'targetWords': targetWords,
-                    'book_id': alignment['book_id'],
-                    'chapter': alignment['chapter'],
-                    'verse': alignment['verse'],
-                    'alignment_num': str(alignment['alignment_num'])
-                }
-                if wordText in alignmentsIndex:
-                    alignmentsIndexForOrigWord = alignmentsIndex[wordText]
-                    alignmentsIndexForOrigWord['alignmentsFull'].append(alignment)
-                    alignmentsIndexForOrigWord['alignments'].append(alignmentData)
-                else:
-                    alignmentsIndex[wordText] = {
-                        'originalWord': wordText,
-                        'lemma': origW['lemma'],
-                        'strong': origW['strong'],
-                        'alignmentsFull': [ alignment ],
-                        'alignments': [ alignmentData ]
-                    }
+                alignmentsIndex.add(origW, summary)
             # addMultipleItemsToDatabase(connection, alignment_table, alignments)
     if not alignmentsFound:
-        print(f"saveAlignmentsForVerse - no alignments found in {bookId} {chapter}:{verse}")
+        logger.debug("saveAlignmentsForVerse - no alignments found in %s %s:%s", bookId, chapter, verse)
 
+@instrument.timer('ingest.alignments')
 def saveAlignmentsForChapter(connection, alignmentsIndex, bookId, chapter, dataFolder, bibleType='', nestedFormat=False):
     if nestedFormat:
         data = bible.loadChapterAlignmentsFromResource(dataFolder, bookId, chapter)
@@ -695,6 +1368,7 @@ def saveAlignmentsForChapter(connection, alignmentsIndex, bookId, chapter, dataF
         # print(f"reading alignments for {bookId} {chapter}:{verseAl}")
         saveAlignmentsForVerse(connection, alignmentsIndex, bookId, chapter, verseAl, verseAlignments)
 
+@instrument.timer('ingest.book')
 def saveAlignmentsForBook(connections, alignmentsIndex, bookId, aligmentsFolder, bibleType, origLangPath, targetLanguagePath, nestedFormat=False):
     connection = getConnectionForTable(connections, 'default')
     deleteWordsForBook(connection, alignment_table, bookId)
@@ -707,86 +1381,188 @@ def saveAlignmentsForBook(connections, alignmentsIndex, bookId, aligmentsFolder,
 
     files = file.listFolder(bookFolder)
     if files: # make sure folder has files
-        print("reading original language words")
+        logger.debug("reading original language words")
         loadAllWordsFromBookIntoDB(connection, origLangPath, bookId, original_words_table)
         if not nestedFormat:
-            print("reading target language words")
+            logger.debug("reading target language words")
             loadAllWordsFromBookIntoDB(connection, targetLanguagePath, bookId, target_words_table)
 
         chapters = bible.getChaptersForBook(bookId)
         for chapterAL in chapters:
-            print(f"reading alignments for {bookId} - {chapterAL}")
+            logger.debug("reading alignments for %s - %s", bookId, chapterAL)
             saveAlignmentsForChapter(connection, alignmentsIndex, bookId, chapterAL, aligmentsFolder, bibleType, nestedFormat)
+        updateWordAlignmentIdsForBook(connection, bookId)
 
     else:
-        print(f"No alignments for {bookId} at {bookFolder}")
+        logger.info(f"No alignments for {bookId} at {bookFolder}")
 
-def getAlignmentsForTestament(connections, newTestament, alignmentsFolder, origLangPath, targetLanguagePath, bibleType, nestedFormat=False):
+def getAlignmentsForTestament(connections, newTestament, alignmentsFolder, origLangPath, targetLanguagePath, bibleType, nestedFormat=False, maxInMemory=None):
     books = bible.getBookList(newTestament)
-    alignmentsIndex = {}
-    for book in books:
-        print (f"reading {book}")
-        saveAlignmentsForBook(connections, alignmentsIndex, book, alignmentsFolder, bibleType, origLangPath, targetLanguagePath, nestedFormat)
+    spillFolder = os.path.dirname(getDatabaseFile(getConnectionForTable(connections, original_words_index_table)))
+    with AlignmentsIndexBuilder(spillFolder or None, maxInMemory) as alignmentsIndex:
+        for book in books:
+            logger.info(f"reading {book}")
+            saveAlignmentsForBook(connections, alignmentsIndex, book, alignmentsFolder, bibleType, origLangPath, targetLanguagePath, nestedFormat)
+            instrument.logMemory(f"after {book}", logger, **alignmentsIndex.getStats())
+        saveAlignmentsIndex(connections, alignmentsIndex)
+
+# path of the main database file of connection ('' for in memory databases)
+def getDatabaseFile(connection):
+    for seq, name, path in connection.execute("PRAGMA database_list;").fetchall():
+        if name == 'main':
+            return path or ''
+    return ''
+
+# maximum number of alignment summaries AlignmentsIndexBuilder keeps in memory before spilling to disk
+defaultIndexMaxInMemory = int(os.environ.get('ALIGNMENT_INDEX_MAX_IN_MEMORY', 500000))
+
+# collects the alignments for each original word while the books are loaded, for saveAlignmentsIndex.  To bound
+#   memory for large testaments, when more than maxInMemory alignments are held they are spilled to a temporary
+#   sqlite file (in spillFolder) and read back one word at a time when the index is saved.  Words are kept in the
+#   order first seen, and alignments in the order added.
+class AlignmentsIndexBuilder:
+    def __init__(self, spillFolder = None, maxInMemory = None):
+        self.spillFolder = spillFolder
+        self.maxInMemory = maxInMemory or defaultIndexMaxInMemory
+        self.words = {} # word: { 'order', 'lemma', 'strong', 'count' }
+        self.pending = {} # word: alignment summaries not spilled yet
+        self.pendingCount = 0
+        self.spilledCount = 0
+        self.spillPath = None
+        self.spillConnection = None
+        self.spillIndexed = False
+
+    def add(self, origWord, summary):
+        word = origWord['word']
+        entry = self.words.get(word)
+        if entry is None:
+            entry = { 'order': len(self.words), 'lemma': origWord['lemma'], 'strong': origWord['strong'], 'count': 0 }
+            self.words[word] = entry
+        entry['count'] += 1
+        self.pending.setdefault(word, []).append(summary)
+        self.pendingCount += 1
+        if self.pendingCount >= self.maxInMemory:
+            self.spill()
+
+    def openSpill(self):
+        fd, self.spillPath = tempfile.mkstemp(prefix='ow_index_spill_', suffix='.sqlite', dir=self.spillFolder)
+        os.close(fd)
+        # scratch file that is deleted when done, so crash safety is not needed
+        self.spillConnection = create_connection(self.spillPath, PROFILE_BULK_LOAD_UNSAFE, allowUnsafe=True)
+        self.spillConnection.execute("CREATE TABLE spill (word_order INTEGER NOT NULL, alignment TEXT NOT NULL);")
+
+    # write alignments held in memory to spill file
+    def spill(self):
+        if not self.pendingCount:
+            return
+        if self.spillConnection is None:
+            self.openSpill()
+        rows = []
+        for word, summaries in self.pending.items():
+            order = self.words[word]['order']
+            rows.extend([ (order, json.dumps(summary, ensure_ascii = False)) for summary in summaries ])
+        self.spillConnection.executemany("INSERT INTO spill (word_order, alignment) VALUES (?, ?);", rows)
+        self.spillConnection.commit()
+        logger.debug("AlignmentsIndexBuilder - spilled %s alignments to %s", len(rows), self.spillPath)
+        instrument.increment('index.spilledAlignments', len(rows))
+        self.spilledCount += len(rows)
+        self.pending = {}
+        self.pendingCount = 0
+
+    # get all the alignments for word - spilled first (they were added first), then those still in memory
+    def getAlignments(self, word):
+        alignments = []
+        if self.spillConnection is not None:
+            if not self.spillIndexed: # faster to index once all rows are written
+                self.spillConnection.execute("CREATE INDEX idx_spill_word ON spill (word_order);")
+                self.spillIndexed = True
+            order = self.words[word]['order']
+            rows = self.spillConnection.execute("SELECT alignment FROM spill WHERE word_order = ? ORDER BY rowid;", (order,))
+            alignments = [ json.loads(row[0]) for row in rows ]
+        alignments.extend(self.pending.get(word, []))
+        return alignments
+
+    def getWord(self, word):
+        return self.words[word]
+
+    def getStats(self):
+        return {
+            'words': len(self.words),
+            'inMemory': self.pendingCount,
+            'spilled': self.spilledCount,
+        }
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.words
+
+    # remove spill file
+    def close(self):
+        if self.spillConnection is not None:
+            self.spillConnection.close()
+            self.spillConnection = None
+            for path in [self.spillPath, self.spillPath + '-wal', self.spillPath + '-shm']:
+                if os.path.exists(path):
+                    os.remove(path)
+        self.pending = {}
+        self.pendingCount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
-    print(f"Saving Alignments by original Word index:")
+# save alignments found for each original word (collected by saveAlignmentsForBook) to original words index table
+@instrument.timer('ingest.owIndex')
+def saveAlignmentsIndex(connections, alignmentsIndex):
+    logger.info(f"Saving Alignments by original Word index:")
     connection_owi = getConnectionForTable(connections, original_words_index_table)
     for word in alignmentsIndex:
-        row = alignmentsIndex[word]
-        alignments_ = row['alignments']
-        alignmentsFull = row['alignmentsFull']
+        wordEntry = alignmentsIndex.getWord(word)
+        # copy since summaries in memory are shared by the original words of an alignment
+        alignments_ = [ dict(alignment) for alignment in alignmentsIndex.getAlignments(word) ]
         frequencies = {}
-        alignmentsCount = len(alignmentsFull)
-        for i in range(alignmentsCount):
-            alignment = alignments_[i]
-            original_words = alignment['originalWords']
-            del alignment['originalWords']
-            origWordsTxt, origWordsCount = combineWordList2(original_words)
-            alignment['origWordsText'] = origWordsTxt
-            alignment['origWordsCount'] = origWordsCount
-            origSpan = getSpan(original_words)
-            origWordsBetween = origSpan - (origWordsCount - 1)
-            alignment['origWordsBetween'] = origWordsBetween
-            target_words = alignment['targetWords']
-            del alignment['targetWords']
-            targetWordsTxt, targetWordsCount = combineWordList2(target_words)
-            alignment['targetWordsText'] = targetWordsTxt
-            alignment['targetWordsCount'] = targetWordsCount
-            targetSpan = getSpan(target_words)
-            targetWordsBetween = targetSpan - (targetWordsCount - 1)
-            alignment['targetWordsBetween'] = targetWordsBetween
-            alignmentTxt = f"{origWordsTxt} = {targetWordsTxt}"
-            alignment['alignmentText'] = alignmentTxt
+        alignmentsCount = len(alignments_)
+        for alignment in alignments_:
+            alignmentTxt = alignment['alignmentText']
             if alignmentTxt in frequencies:
                 frequencies[alignmentTxt] += 1
             else:
                 frequencies[alignmentTxt] = 1
 
-        # alignmentTxtFrequency_ = []
-        for i in range(alignmentsCount):
-            alignment = alignments_[i]
+        for alignment in alignments_:
             alignmentTxt = alignment['alignmentText']
             count = frequencies[alignmentTxt]
             alignment['alignmentTxtFrequency'] = (count / alignmentsCount) * 100
 
             # sanity checking
             if (len(alignment['origWordsText'].split(' ')) != alignment['origWordsCount']):
-                print(f"wrong word count {alignment['origWordsCount']} in original word list '{alignment['origWordsText']}': {alignment}")
+                logger.warning(f"wrong word count {alignment['origWordsCount']} in original word list '{alignment['origWordsText']}': {alignment}")
             if (len(alignment['targetWordsText'].split(' ')) != alignment['targetWordsCount']):
-                print(f"wrong word count {alignment['targetWordsCount']} in target word list '{alignment['targetWordsText']}': {alignment}")
+                logger.warning(f"wrong word count {alignment['targetWordsCount']} in target word list '{alignment['targetWordsText']}': {alignment}")
             origWordsBetween = alignment['origWordsBetween']
             if (origWordsBetween < 0):
-                print(f"invalid original words between {origWordsBetween} in alignment': {alignment}")
+                logger.warning(f"invalid original words between {origWordsBetween} in alignment': {alignment}")
             targetWordsBetween = alignment['targetWordsBetween']
             if (targetWordsBetween < 0):
-                print(f"invalid target words between {targetWordsBetween} in alignment': {alignment}")
-
-        row['frequencies'] = json.dumps(frequencies, ensure_ascii = False)
-        row['alignmentsTotal'] = alignmentsCount
-        row['alignments'] = json.dumps(alignments_, ensure_ascii = False)
-
-        del row['alignmentsFull']
-        if (len(alignments_) != alignmentsCount):
-            print(f"### Invalid aligments count! ### - {row}")
+                logger.warning(f"invalid target words between {targetWordsBetween} in alignment': {alignment}")
+
+        row = {
+            'originalWord': word,
+            'lemma': wordEntry['lemma'],
+            'strong': wordEntry['strong'],
+            'alignments': json.dumps(alignments_, ensure_ascii = False),
+            'frequencies': json.dumps(frequencies, ensure_ascii = False),
+            'alignmentsTotal': alignmentsCount,
+        }
+        if (wordEntry['count'] != alignmentsCount):
+            logger.warning(f"### Invalid aligments count! ### - {word} has {alignmentsCount} of {wordEntry['count']}")
         writeRowToDB(connection_owi, original_words_index_table, row, update=True)
 
 def combineWordList(words):
@@ -795,6 +1571,19 @@ def combineWordList(words):
         words_.append(word['word'])
     return ' '.join(words_)
 
+# get text for original words, target words and alignment.  Applies same combining of apostrophe 's' in target
+#   words as addDataToAlignmentsAndClean
+def getAlignmentTexts(origWords, targetWords):
+    origWordsTxt = combineWordList(origWords)
+    words = [ word['word'] for word in targetWords ]
+    if (len(words) > 1) and ('s' in words): # combine apostrophe
+        pos = words.index('s')
+        if pos > 0:
+            words[pos-1] = words[pos-1] + "'" + words[pos]
+            words.remove('s')
+    targetWordsTxt = ' '.join(words)
+    return origWordsTxt, targetWordsTxt, f"{origWordsTxt} = {targetWordsTxt}"
+
 def combineWordList2(words):
     words_ = []
     for word in words:
@@ -817,75 +1606,149 @@ def getSpan(origWords):
         span = max(wordNums) - min(wordNums)
     return span
 
-def getAlignmentForWord(connection, origWord, searchOriginal):
+# modifies alignment
+def addWordsToAlignment(alignment, origWords, targetWords):
+    # original language words
+    alignment['origSpan'] = getSpan(origWords)
+    alignment['origWords'] = origWords
+    origWordsTxt = combineWordList(origWords)
+    alignment['origWordsTxt'] = origWordsTxt
+    alignment['alignmentOrigWords'] = len(origWords)
+
+    # target language words
+    alignment['targetSpan'] = getSpan(targetWords)
+    alignment['targetWords'] = targetWords
+    targetWordsTxt = combineWordList(targetWords)
+    alignment['targetWordsTxt'] = targetWordsTxt
+    alignment['alignmentTargetWords'] = len(targetWords)
+
+    alignment['alignmentTxt'] = f"{origWordsTxt} = {targetWordsTxt}"
+
+def getAlignmentForWord(connection, origWord, searchOriginal, hydrate=HYDRATE_BATCH):
     alignment = findAlignmentForWord(connection, origWord, searchOriginal)
 
     if alignment:
-        # get original language words
-        origWords = lookupWords(connection, alignment, 1)
-        alignment['origSpan'] = getSpan(origWords)
-        alignment['origWords'] = origWords
-        origWordsTxt = combineWordList(origWords)
-        alignment['origWordsTxt'] = origWordsTxt
-        alignment['alignmentOrigWords'] = len(origWords)
-
-        # get target language words
-        targetWords = lookupWords(connection, alignment, 0)
-        alignment['targetSpan'] = getSpan(targetWords)
-        alignment['targetWords'] = targetWords
-        targetWordsTxt = combineWordList(targetWords)
-        alignment['targetWordsTxt'] = targetWordsTxt
-        alignment['alignmentTargetWords'] = len(targetWords)
-
-        alignment['alignmentTxt'] = f"{origWordsTxt} = {targetWordsTxt}"
+        origWords = lookupWords(connection, alignment, 1, hydrate)
+        targetWords = lookupWords(connection, alignment, 0, hydrate)
+        addWordsToAlignment(alignment, origWords, targetWords)
 
     return alignment
 
-def getAlignmentsForWord(connection, origWord, searchOriginal):
+def getAlignmentsForWord(connection, origWord, searchOriginal, hydrate=HYDRATE_BATCH):
     alignments = findAlignmentsForWord(connection, origWord, searchOriginal)
+    return hydrateAlignments(connection, alignments, hydrate)
+
+# add words to each of alignments.  For 'batch' all the words of all the alignments are fetched in two queries
+def hydrateAlignments(connection, alignments, hydrate=HYDRATE_BATCH):
+    origWordsById = None
+    targetWordsById = None
+    if hydrate == HYDRATE_BATCH:
+        origIds = []
+        targetIds = []
+        for alignment in alignments:
+            origIds.extend(getAlignmentWordIds(alignment, True))
+            targetIds.extend(getAlignmentWordIds(alignment, False))
+        origWordsById = fetchWordsByIds(connection, origIds, original_words_table)
+        targetWordsById = fetchWordsByIds(connection, targetIds, target_words_table)
 
     for alignment in alignments:
-        # get original language words
-        origWords = lookupWords(connection, alignment, 1)
-        alignment['origSpan'] = getSpan(origWords)
-        alignment['origWords'] = origWords
-        origWordsTxt = combineWordList(origWords)
-        alignment['origWordsTxt'] = origWordsTxt
-        alignment['alignmentOrigWords'] = len(origWords)
-
-        # get target language words
-        targetWords = lookupWords(connection, alignment, 0)
-        alignment['targetSpan'] = getSpan(targetWords)
-        alignment['targetWords'] = targetWords
-        targetWordsTxt = combineWordList(targetWords)
-        alignment['targetWordsTxt'] = targetWordsTxt
-        alignment['alignmentTargetWords'] = len(targetWords)
-
-        alignment['alignmentTxt'] = f"{origWordsTxt} = {targetWordsTxt}"
-
+        origWords = lookupWords(connection, alignment, 1, hydrate, origWordsById)
+        targetWords = lookupWords(connection, alignment, 0, hydrate, targetWordsById)
+        addWordsToAlignment(alignment, origWords, targetWords)
     return alignments
 
-def getAlignmentsForWords(connection, words, searchOriginal):
+# get alignment containing each of words.  Except for 'query' hydration, the alignments are found by the
+#   alignment_id of the words in one query instead of searching the alignment keys for each word.  Words without
+#   alignment_id are not aligned, unless the database has not been migrated (loaded by an older version and only
+#   opened read only), then they are searched for by their keys like 'query' does.
+def getAlignmentsForWords(connection, words, searchOriginal, hydrate=HYDRATE_BATCH):
     alignments = []
+    if hydrate == HYDRATE_QUERY:
+        for word in words:
+            alignment = getAlignmentForWord(connection, word, searchOriginal, hydrate)
+            if alignment:
+                alignments.append(alignment)
+        return alignments
+
+    alignmentIds = [ word['alignment_id'] for word in words if word.get('alignment_id') is not None ]
+    alignmentsById = fetchRecordsByIds(connection, alignmentIds, alignment_table)
+    searchKeys = len(alignmentIds) < len(words) and not isAlignmentDBMigrated(connection)
+    missingIds = 0
     for word in words:
-        alignment = getAlignmentForWord(connection, word, searchOriginal)
+        alignment = None
+        if word.get('alignment_id') is not None:
+            alignment = alignmentsById.get(word['alignment_id'])
+            if alignment:
+                alignment = dict(alignment) # copy since same alignment may be used by more than one word
+        elif searchKeys:
+            missingIds += 1
+            alignment = findAlignmentForWord(connection, word, searchOriginal)
         if alignment:
             alignments.append(alignment)
-    return alignments
+    if missingIds:
+        instrument.increment('lookup.wordsWithoutAlignmentId', missingIds)
+        logger.debug(f"getAlignmentsForWords - {missingIds} words without alignment_id searched by keys, open database with initAlignmentDB to migrate it")
+    return hydrateAlignments(connection, alignments, hydrate)
 
-def findAlignmentsForWord(connection, word, searchOriginal = True, searchLemma = False, caseInsensitive = False):
+def findAlignmentsForWord(connection, word, searchOriginal = True, searchLemma = False, caseInsensitive = False, hydrate = HYDRATE_BATCH):
+    import pandas as pd
     foundWords = findWord(connection, word, searchOriginal, searchLemma, caseInsensitive)
     # print (f"{len(foundWords)} items in search")
 
-    alignments = getAlignmentsForWords(connection, foundWords, searchOriginal)
+    alignments = getAlignmentsForWords(connection, foundWords, searchOriginal, hydrate)
     totalCount = len(alignments)
     if totalCount == 0:
         return None
 
     results = addDataToAlignmentsAndClean(alignments)
-    df = pd.DataFrame(results)  # load as dataframe so we can to cool stuff
+    df = setDataFrameTypes(pd.DataFrame(results))  # load as dataframe so we can to cool stuff
     return df
 
+alignmentFrequencyGroups = {
+    'alignmentTxt': 'alignment_txt',
+    'origWordsTxt': 'orig_words_txt',
+    'targetWordsTxt': 'target_words_txt'
+}
+
+# get frequency of alignments for word counted in the database.  Returns same Series as
+#   findAlignmentsForWord(...)[groupBy].value_counts() without loading the alignments.
+#   groupBy can be alignmentTxt, origWordsTxt, targetWordsTxt or a column of alignment_table (e.g. book_id)
+#   For databases that have not been migrated (see isAlignmentDBMigrated) the alignments are loaded and counted.
+def alignmentFrequencies(connection, word, searchOriginal = True, searchLemma = False, caseInsensitive = False, groupBy = 'alignmentTxt'):
+    import pandas as pd
+    column = alignmentFrequencyGroups.get(groupBy, groupBy)
+    if searchLemma:
+        search = f"w.lemma = '{word}'"
+    else:
+        search = f"w.word = '{word}'"
+    if caseInsensitive:
+        search += ' COLLATE NOCASE'
+
+    if searchOriginal:
+        table = original_words_table
+    else:
+        table = target_words_table
+
+    if not isAlignmentDBMigrated(connection) or column not in getTableColumns(connection, alignment_table):
+        logger.debug(f"alignmentFrequencies - database not migrated or {column} not in {alignment_table}, counting loaded alignments of '{word}'")
+        instrument.increment('lookup.frequenciesFromAlignments')
+        df = findAlignmentsForWord(connection, word, searchOriginal, searchLemma, caseInsensitive)
+        if df is None:
+            return pd.Series([], index=pd.Index([], name=groupBy), name='count', dtype='int64')
+        frequencies = df[groupBy].value_counts()
+        frequencies.index.name = groupBy
+        frequencies.name = 'count'
+        return frequencies.astype('int64')
+
+    query = f"""SELECT a.{column} AS value, COUNT(*) AS count
+FROM {table} w JOIN {alignment_table} a ON a.id = w.alignment_id
+WHERE {search}
+GROUP BY a.{column}
+ORDER BY count DESC, MIN(w.id);"""
+    rows = execute_read_query(connection, query) or []
+    index = pd.Index([ row[0] for row in rows ], name=groupBy)
+    return pd.Series([ row[1] for row in rows ], index=index, name='count', dtype='int64')
+
 # modifies alignment
 def convertAlignmentEntryToTable(alignment):
     # get original language words
@@ -973,6 +1836,7 @@ def filterAlignments(alignments, minAlignments=-1):
 
 # adds frequency data and converts identification fields to str
 def addDataToAlignmentsAndClean(alignments):
+    import pandas as pd
     totalCount = len(alignments)
     if totalCount:
         countsMap = pd.DataFrame(alignments)['alignmentTxt'].value_counts()  # get counts for each match type
@@ -1054,8 +1918,7 @@ def findOriginalLanguageWord(origWords, word_, checkLemmas=True):
     return foundOriginalWord
 
 def findOriginalWordsForLemma(connection, lemma, maxRows = None):
-    foundWords = findWord(connection, lemma, searchOriginal = True, searchLemma = True, caseInsensitive = True, maxRows = maxRows )
-    fwd = pd.DataFrame(foundWords)
+    fwd = fetchRecordsDataFrame(connection, original_words_table, f"lemma = '{lemma}'", caseInsensitive = True, maxRows = maxRows)
     return fwd
 
 def findOrignalLangAlignmentsWithTarget(connection, word):
@@ -1084,7 +1947,7 @@ def findUniqueLemmasAlignedWithTargetWords(connection, wordList, threshold = 1):
     words = wordList.split(' ')
     lemmas = []
     for word in words:
-        print(f"searching {word}")
+        logger.debug(f"searching {word}")
         word_lemmas = findLemmasAlignedWithTarget(connection, word)
         if word_lemmas is not None:
             # print(f"lemmas found {word_lemmas}")
@@ -1119,12 +1982,12 @@ def saveUniqueLemmasAlignedWithTargetWords(connection, keyTermsPath, wordList, t
     file.writeJsonFile(keyTermsPath, data) # update file
     return unique
 
-def findAlignmentsForWords(connection, wordList, searchOriginal = True, searchLemma = True, caseInsensitive = False, splitLemma = None):
+def findAlignmentsForWords(connection, wordList, searchOriginal = True, searchLemma = True, caseInsensitive = False, splitLemma = None, hydrate = HYDRATE_BATCH):
     foundWords = findWords(connection, wordList, searchOriginal, searchLemma, caseInsensitive)
-    print (f" for '{wordList}' found {len(foundWords)} usages in database")
+    logger.info(f" for '{wordList}' found {len(foundWords)} usages in database")
 
-    alignments = getAlignmentsForWords(connection, foundWords, searchOriginal)
-    print (f" found {len(alignments)} alignments in database")
+    alignments = getAlignmentsForWords(connection, foundWords, searchOriginal, hydrate)
+    logger.info(f" found {len(alignments)} alignments in database")
 
     totalCount = len(alignments)
     if totalCount == 0:
@@ -1148,7 +2011,7 @@ def saveAlignmentDataForWords(connection, key, wordList_, searchOriginal = True,
     baseFolder = './data/TrainingData'
     file.makeFolder(baseFolder)
 
-    print(f"getting lemmas for {wordList_}")
+    logger.info(f"getting lemmas for {wordList_}")
     lemmas = []
     foundWords = findWords(connection, wordList_, searchOriginal, searchLemma = False)
     for word in foundWords:
@@ -1156,7 +2019,7 @@ def saveAlignmentDataForWords(connection, key, wordList_, searchOriginal = True,
         if not lemma in lemmas:
             lemmas.append(lemma)
     lemmas.sort()
-    print(f"found lemmas: {lemmas}")
+    logger.info(f"found lemmas: {lemmas}")
 
     wordList = list(filterForMinLen(lemmas, minLen))
 
@@ -1180,10 +2043,10 @@ def saveAlignmentDataForWords(connection, key, wordList_, searchOriginal = True,
 def saveAlignmentDataForWordsSub(connection, key, wordList, baseFolder, searchLemma, searchOriginal, caseInsensitive, splitLemma = None):
     alignments = findAlignmentsForWords(connection, wordList, searchOriginal, searchLemma, caseInsensitive, splitLemma = splitLemma)
     if (not alignments) or (len(alignments) < 1):
-        print(f"could not find alignments for {wordList}, skipping")
+        logger.warning(f"could not find alignments for {wordList}, skipping")
         return []
 
-    print(f"for {key} found {len(alignments)} alignments")
+    logger.info(f"for {key} found {len(alignments)} alignments")
     index = {
         'lemmaList': wordList,
         'alignmentsCount': len(alignments)
@@ -1202,6 +2065,7 @@ def saveAlignmentDataForWordsSub(connection, key, wordList, baseFolder, searchLe
     return df
 
 def saveDictOfListsToCSV(csvPath, dictOfList, keyName ='id'):
+    import pandas as pd
     outputList = []
     for key in dictOfList:
         # row = { **listDict[key] }
@@ -1217,6 +2081,7 @@ def saveDictOfListsToCSV(csvPath, dictOfList, keyName ='id'):
     return df
 
 def saveDictOfDictToCSV(csvPath, dict_, keyName ='id'):
+    import pandas as pd
     outputList = []
     for key in dict_:
         row = {}
@@ -1229,6 +2094,7 @@ def saveDictOfDictToCSV(csvPath, dict_, keyName ='id'):
     return df
 
 def saveListToCSV(csvPath, list_):
+    import pandas as pd
     df = pd.DataFrame(list_)
     saveDataFrameToCSV(csvPath, df)
     return df
@@ -1238,16 +2104,17 @@ def saveDataFrameToCSV(csvPath, df):
 
 def saveAlignmentDataForLemmas(connection, keyTermsPath, minLen=-1):
     data = file.initJsonFile(keyTermsPath)
-    print (f"'{keyTermsPath}' has words: {data}")
+    logger.info(f"'{keyTermsPath}' has words: {data}")
 
     keyTermsList = list(data.keys())
     for keyTerm in keyTermsList:
         item = data[keyTerm]
-        print (f"updating '{keyTerm}' = '{item}'")
+        logger.debug(f"updating '{keyTerm}' = '{item}'")
         saveAlignmentDataForWords(connection, keyTerm, item, searchOriginal = True, searchLemma = True, caseInsensitive = True, minLen = minLen)
 
 # reading dataFrame from json:
 def loadAlignmentDataFromFile(lemma):
+    import pandas as pd
     alignment_data_path = f'data/TrainingData/{lemma}.json'
     try:
         f = open(alignment_data_path)
@@ -1256,10 +2123,11 @@ def loadAlignmentDataFromFile(lemma):
         df = pd.DataFrame(data)
     except FileNotFoundError:
         df = None
-        print(f"loadAlignmentDataFromFile - failed to load {lemma} since file not found at {alignment_data_path}")
+        logger.warning(f"loadAlignmentDataFromFile - failed to load {lemma} since file not found at {alignment_data_path}")
     return df
 
 def loadAlignmentData(lemma):
+    import pandas as pd
     alignment_data_path = f'data/TrainingData/{lemma}.json'
     try:
         f = open(alignment_data_path)
@@ -1268,7 +2136,7 @@ def loadAlignmentData(lemma):
         df = pd.DataFrame(data)
     except FileNotFoundError:
         df = None
-        print(f"loadAlignmentDataFromFile - failed to load {lemma} since file not found at {alignment_data_path}")
+        logger.warning(f"loadAlignmentDataFromFile - failed to load {lemma} since file not found at {alignment_data_path}")
     return df
 
 def describeAlignments(alignments, ignore = ['frequency'], silent = False):
@@ -1312,22 +2180,30 @@ def lookupLexicon(lexiconPath, strongs):
             data = file.readJsonFile(filePath)
             return data
         except:
-            print(f"lookupLexicon - could not read {filePath}")
+            logger.warning(f"lookupLexicon - could not read {filePath}")
     else:
         # TODO: Hebrew, Aramaic
-        print(f"lookupLexicon - not supported {strongs}")
+        logger.warning(f"lookupLexicon - not supported {strongs}")
     return None
 
+@instrument.timer('twords.findLemmasForQuotes')
 def findLemmasForQuotes(connection, quotesPath, lemmasPath, lexiconPath = None):
     data = file.readJsonFile(quotesPath)
 
     origWords = {}
 
+    # look up all quote words at once - first by normalized word, then ignoring accents for those not found
+    quoteWords = list(dict.fromkeys([ origWord for key in data.keys() for origWord in data[key] ]))
+    foundWords = findWordsNormalized(connection, quoteWords, searchOriginal = True, searchLemma = False)
+    missing = [ origWord for origWord in quoteWords if not foundWords[origWord] ]
+    if missing:
+        foundWords.update(findWordsNormalized(connection, missing, searchOriginal = True, searchLemma = False, stripAccents = True))
+
     def findLemma(origWord):
         if origWord in origWords:
             return None, 0 # if we already checked, skip
 
-        words = findWord(connection, origWord, searchOriginal = True, searchLemma = False, caseInsensitive = True )
+        words = foundWords[origWord]
         if len(words):
             word = words[0]
             count = len(words)
@@ -1346,7 +2222,7 @@ def findLemmasForQuotes(connection, quotesPath, lemmasPath, lexiconPath = None):
                 if lemma in lemmas:
                     lemmas[lemma]['count'] += count
                 else:
-                    print(f"for {origWord} found '{lemma}'")
+                    logger.debug(f"for {origWord} found '{lemma}'")
                     strong = word['strong']
                     lemmas[lemma] = {
                         'count': count,
@@ -1356,11 +2232,12 @@ def findLemmasForQuotes(connection, quotesPath, lemmasPath, lexiconPath = None):
                     if lex:
                         lemmas[lemma]['lexicon'] = lex
 
-    print(f"findLemmasForQuotes - found {len(lemmas.keys())} lemmas")
+    logger.info(f"findLemmasForQuotes - found {len(lemmas.keys())} lemmas")
     file.writeJsonFile(lemmasPath, lemmas)
     saveDictOfDictToCSV(lemmasPath.replace(".json", ".csv"), lemmas, keyName ='lemma')
 
 def getFrequenciesOfFieldInAlignments(alignmentsForWord, field, sortIndex = False):
+    import pandas as pd
     frequenciesOfAlignments = {}
     stats = {}
     # for each word add line to plot
@@ -1368,7 +2245,7 @@ def getFrequenciesOfFieldInAlignments(alignmentsForWord, field, sortIndex = Fals
         alignmentsForWord_ = alignmentsForWord[origWord]
         for alignment in alignmentsForWord_:
             if field not in alignment:
-                print(f"Field {field} is not in {alignment}")
+                logger.warning(f"Field {field} is not in {alignment}")
                 return None
         wordAlignments_ = pd.DataFrame(alignmentsForWord_)
         wordAlignmentsForField = wordAlignments_[field]
@@ -1403,9 +2280,10 @@ def getFrequenciesOfFieldInAlignments(alignmentsForWord, field, sortIndex = Fals
     return frequenciesOfAlignments, stats
 
 def getDataFrameForOriginalWords(connection, words, searchLemma = True, minAlignments = 100):
+    import pandas as pd
     alignments_ = getAlignmentsForOriginalWords(connection, words, searchLemma)
     alignmentsList, rejectedAlignmentsList = filterAlignments(alignments_, minAlignments)
-    alignments = pd.DataFrame(alignmentsList)
+    alignments = setDataFrameTypes(pd.DataFrame(alignmentsList))
     return alignments
 
 def getFilteredAlignmentsForWord(alignmentsForWord, minAlignments = 100, remove = []):
@@ -1421,18 +2299,18 @@ def getFilteredAlignmentsForWord(alignmentsForWord, minAlignments = 100, remove
                 if (lemma is not None) and (lemma not in remove):
                     filteredAlignmentsForWord[origWord] = alignments
                 else:
-                    print(f"getFilteredAlignmentsForWord - rejecting {lemma} alignments")
+                    logger.debug(f"getFilteredAlignmentsForWord - rejecting {lemma} alignments")
             # else:
             #     print(f"getFilteredAlignmentsForWord - rejecting {origWord} count {alignmentsCount}")
         else:
-            print(f"getFilteredAlignmentsForWord - rejecting {origWord} in remove list")
+            logger.debug(f"getFilteredAlignmentsForWord - rejecting {origWord} in remove list")
 
     return filteredAlignmentsForWord
 
 def getFilteredLemmas(termsPath, minAlignments = 100, remove = []):
     data = file.initJsonFile(termsPath)
     lemmasList = list(data.keys())
-    print (f"'{termsPath}' has count: {len(lemmasList)}")
+    logger.info(f"'{termsPath}' has count: {len(lemmasList)}")
     filteredLemmas = {}
     for lemma in lemmasList:
         item = data[lemma]
@@ -1442,7 +2320,7 @@ def getFilteredLemmas(termsPath, minAlignments = 100, remove = []):
     for item in remove:
         if item in filteredLemmas:
             del filteredLemmas[item]
-    print (f"filtered count: {len(filteredLemmas)}")
+    logger.info(f"filtered count: {len(filteredLemmas)}")
 
     return lemmasList
 
@@ -1462,7 +2340,7 @@ def zeroFillFrequencies(field_frequencies):
             x = key
             y = field_frequency[key]
             if type(x) == str:
-                print(f"not a number")
+                logger.warning(f"not a number")
                 return None
             while x > lastX: # do zero fill
                 appendXY(lastX, 0)
@@ -1476,6 +2354,7 @@ def zeroFillFrequencies(field_frequencies):
         }
     return filledFrequencies
 
+@instrument.timer('warnings.fetchAlignmentDataForTWordCached')
 def fetchAlignmentDataForTWordCached(trainingDataPath, type_, bibleType, minAlignments, remove):
     alignmentsForWordPath = f'{trainingDataPath}/{type_}_{bibleType}_NT_alignments_by_orig.json'
     filteredAlignmentsForWordPath = f'{trainingDataPath}/{type_}_{bibleType}_NT_alignments_by_orig_{minAlignments}.json'
@@ -1487,17 +2366,17 @@ def fetchAlignmentDataForTWordCached(trainingDataPath, type_, bibleType, minAlig
     alignmentsForWord = file.initJsonFile(alignmentsForWordPath)
     unfLen = len(list(alignmentsForWord.keys()))
     if not unfLen:
-        print("alignments cache empty")
+        logger.info("alignments cache empty")
         recreateAlignmentsList = True
     else:
         tWordsAlignmentsTime = file.getModifiedTime(tWordsAlignmentsPath)
         cachedAlignmentsTime = file.getModifiedTime(alignmentsForWordPath)
         if (tWordsAlignmentsTime >= cachedAlignmentsTime):
-            print(f"tWords time '{time.ctime(tWordsAlignmentsTime)}' newer than cached file time '{time.ctime(cachedAlignmentsTime)}'")
+            logger.info(f"tWords time '{time.ctime(tWordsAlignmentsTime)}' newer than cached file time '{time.ctime(cachedAlignmentsTime)}'")
             recreateAlignmentsList = True
 
     if recreateAlignmentsList:
-        print("alignments ... creating")
+        logger.info("alignments ... creating")
         alignments = file.readJsonFile(tWordsAlignmentsPath)
         alignmentsForWord = {}
         for alignment in alignments:
@@ -1508,35 +2387,37 @@ def fetchAlignmentDataForTWordCached(trainingDataPath, type_, bibleType, minAlig
                 else:
                     alignmentsForWord[orig_word] = [ alignment ]
             else:
-                print(f"missing 'originalWord'' in alignment: {alignment}")
+                logger.warning(f"missing 'originalWord'' in alignment: {alignment}")
 
         # save data to speed things up
         file.writeJsonFile(alignmentsForWordPath, alignmentsForWord)
-        print(f"alignments by original list count is {len(alignmentsForWord)}")
-        print(f"Size of alignments by original {alignmentsForWordPath} is {file.getFileSize(alignmentsForWordPath)/1000/1000:.3f} MB")
+        logger.info(f"alignments by original list count is {len(alignmentsForWord)}")
+        logger.info(f"Size of alignments by original {alignmentsForWordPath} is {file.getFileSize(alignmentsForWordPath)/1000/1000:.3f} MB")
         csvPath = alignmentsForWordPath.replace(".json", ".csv")
         saveDictOfListsToCSV(csvPath, alignmentsForWord, 'originalWord')
-        print(f"Size of alignments by original {csvPath} is {file.getFileSize(csvPath)/1000/1000:.3f} MB")
+        logger.info(f"Size of alignments by original {csvPath} is {file.getFileSize(csvPath)/1000/1000:.3f} MB")
 
     else:
-        print("Using cached Alignments")
+        logger.info("Using cached Alignments")
 
-    print(f"Unfiltered Alignments: {len(alignmentsForWord)}")
+    logger.info(f"Unfiltered Alignments: {len(alignmentsForWord)}")
 
     # filter by number of alignments for word
     filteredAlignmentsForWord = getFilteredAlignmentsForWord(alignmentsForWord, minAlignments, remove)
     file.writeJsonFile(filteredAlignmentsForWordPath, filteredAlignmentsForWord)
-    print(f"filtered alignments by original list count is {len(filteredAlignmentsForWord)}")
-    print(f"Size of filtered alignments by original {filteredAlignmentsForWordPath} is {file.getFileSize(filteredAlignmentsForWordPath)/1000/1000:.3f} MB")
+    logger.info(f"filtered alignments by original list count is {len(filteredAlignmentsForWord)}")
+    logger.info(f"Size of filtered alignments by original {filteredAlignmentsForWordPath} is {file.getFileSize(filteredAlignmentsForWordPath)/1000/1000:.3f} MB")
     csvPath = filteredAlignmentsForWordPath.replace(".json", ".csv")
     saveDictOfListsToCSV(csvPath, filteredAlignmentsForWord, 'originalWord')
-    print(f"Size of filtered alignments by original {csvPath} is {file.getFileSize(csvPath)/1000/1000:.3f} MB")
-    print(f"Filtered Alignments: {len(filteredAlignmentsForWord)}")
+    logger.info(f"Size of filtered alignments by original {csvPath} is {file.getFileSize(csvPath)/1000/1000:.3f} MB")
+    logger.info(f"Filtered Alignments: {len(filteredAlignmentsForWord)}")
     return alignmentsForWord, filteredAlignmentsForWord
 
+@instrument.timer('warnings.generateWarnings')
 def generateWarnings(warningsPath, type_, bibleType, alignmentsForWord, alignmentOrigWordsThreshold,
                      alignmentTargetWordsThreshold, origWordsBetweenThreshold,
                      targetWordsBetweenThreshold, alignmentFrequencyMinThreshold, tag=''):
+    import pandas as pd
     alignmentsToCheck = []
 
     for origWord in alignmentsForWord.keys():
@@ -1593,7 +2474,7 @@ def generateWarnings(warningsPath, type_, bibleType, alignmentsForWord, alignmen
     if len(alignmentsToCheck):
         warningData = df.drop(columns=['alignment_key']).sort_values(by=["book_id", "chapter", "verse", "alignment_num"])
     else:
-        print(f"No warnings found!")
+        logger.info(f"No warnings found!")
         warningData = df
     saveDataFrameToCSV(csvPath, warningData)
     return warningData
@@ -1633,7 +2514,9 @@ def getStatsForWord(prefix, numList):
     }
     return stats_
 
+@instrument.timer('warnings.getStatsForAlignments')
 def getStatsForAlignments(alignmentsForWord):
+    import pandas as pd
     summary_ = {}
     for orginalWord in alignmentsForWord.keys():
         alignments = alignmentsForWord[orginalWord]
@@ -1679,50 +2562,58 @@ def fetchAlignmentDataForAllTWordsCached(trainingDataPath, bibleType, types, min
         filteredAlignmentsForWord.update(**filteredAlignmentsForWord_)
     return alignmentsForWord, filteredAlignmentsForWord
 
-def saveAlignmentDataForLemmas(connection_owi, type_, cfg, getTwordsPath, minAlignments = 100):
-    print(f"Saving Alignments for {type_}")
+# getTwordsPath(cfg, type_, bibleType) returns the quotes and lemmas paths (e.g. config.getTwordsPath).
+#   If pool (ReadOnlyConnectionPool) is given, lemmas are looked up using maxWorkers threads
+@instrument.timer('training.saveAlignmentDataForLemmas')
+def saveAlignmentDataForLemmas(connection_owi, type_, cfg, getTwordsPath, minAlignments = 100, pool = None, maxWorkers = 4):
+    logger.info(f"Saving Alignments for {type_}")
     bibleType = cfg['targetBibleType']
     trainingDataPath = cfg['trainingDataPath']
     testamentStr = cfg['testamentStr']
 
     # read alignment data for all the lemmas
-    quotesPath, lemmasPath = getTwordsPath(type_, bibleType)
+    quotesPath, lemmasPath = getTwordsPath(cfg, type_, bibleType)
     termsPath = lemmasPath
     data = file.initJsonFile(termsPath)
-    print (f"'{termsPath}' has {len(list(data.keys()))} words")
+    logger.info(f"'{termsPath}' has {len(list(data.keys()))} words")
     lemmasList = list(data.keys())
     alignments = {}
 
-    for word in lemmasList:
-        alignments_ = findAlignmentsFromIndexDbForOrigWord(connection_owi, word, searchLemma=True, maxRows=None)
-        alignments[word] = alignments_
+    if pool:
+        found = pool.map(lambda connection, word: findAlignmentsFromIndexDbForOrigWord(connection, word, searchLemma=True),
+                         lemmasList, maxWorkers)
+        alignments = dict(zip(lemmasList, found))
+    else:
+        for word in lemmasList:
+            alignments_ = findAlignmentsFromIndexDbForOrigWord(connection_owi, word, searchLemma=True, maxRows=None)
+            alignments[word] = alignments_
 
     # alignments = db.getAlignmentsForOriginalWords(connection, lemmasList)
-    print(f"alignments size is {len(alignments)}")
+    logger.info(f"alignments size is {len(alignments)}")
 
     ################################
     # flatten the lemmas into a filtered alignment list
 
     alignmentsList, rejectedAlignmentsList = filterAlignments(alignments, minAlignments)
     termsPath = f'{trainingDataPath}/{type_}_{bibleType}_{testamentStr}_alignments_filtered_{minAlignments}'
-    print(f"filtered {minAlignments} training list count is {len(alignmentsList)}")
-    print(f"rejected count is {len(rejectedAlignmentsList)}")
+    logger.info(f"filtered {minAlignments} training list count is {len(alignmentsList)}")
+    logger.info(f"rejected count is {len(rejectedAlignmentsList)}")
     jsonPath = termsPath + '.json'
     file.writeJsonFile(jsonPath, alignmentsList)
-    print(f"Size of filtered alignments {jsonPath} is {file.getFileSize(jsonPath)/1000/1000:.3f} MB")
+    logger.info(f"Size of filtered alignments {jsonPath} is {file.getFileSize(jsonPath)/1000/1000:.3f} MB")
     csvPath = termsPath + ".csv"
     saveListToCSV(csvPath, alignmentsList)
-    print(f"Size of filtered alignments {csvPath} is {file.getFileSize(csvPath)/1000/1000:.3f} MB")
+    logger.info(f"Size of filtered alignments {csvPath} is {file.getFileSize(csvPath)/1000/1000:.3f} MB")
 
     ################################
     # merge to make a complete list
 
     alignmentsList.extend(rejectedAlignmentsList)
     termsPath = f'{trainingDataPath}/{type_}_{bibleType}_{testamentStr}_alignments_all'
-    print(f"Unfiltered training list count is {len(alignmentsList)}")
+    logger.info(f"Unfiltered training list count is {len(alignmentsList)}")
     jsonPath = termsPath + '.json'
     file.writeJsonFile(jsonPath, alignmentsList)
-    print(f"Size of filtered alignments {jsonPath} is {file.getFileSize(jsonPath)/1000/1000:.3f} MB")
+    logger.info(f"Size of filtered alignments {jsonPath} is {file.getFileSize(jsonPath)/1000/1000:.3f} MB")
     csvPath = termsPath + ".csv"
     saveListToCSV(csvPath, alignmentsList)
-    print(f"Size of filtered alignments {csvPath} is {file.getFileSize(csvPath)/1000/1000:.3f} MB")
+    logger.info(f"Size of filtered alignments {csvPath} is {file.getFileSize(csvPath)/1000/1000:.3f} MB")
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import threading
+from email.utils import formatdate
+from concurrent.futures import ThreadPoolExecutor
+import utils.file_utils as file
+import utils.instrument_utils as instrument
+
+logger = instrument.getLogger('download_utils')
+
+DOWNLOADED = 'downloaded'
+NOT_MODIFIED = 'not-modified'
+SKIPPED = 'skipped'
+MISSING = 'missing'
+FAILED = 'failed'
+
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+
+def createSession(maxConnections=8, retries=3, backoffFactor=0.5):
+    import requests # imported when used, as it is slow to import
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=backoffFactor, status_forcelist=RETRY_STATUS_CODES,
+                  allowed_methods=['HEAD', 'GET'], raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=maxConnections, pool_maxsize=maxConnections, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+class DownloadManager:
+    """
+    Downloads files over a pooled session with bounded concurrency, retries with backoff, and conditional requests.
+    A manifest of completed downloads (with ETag/Last-Modified) is saved after every file so an interrupted run can be
+    resumed, and later runs can revalidate files instead of downloading them again.
+    """
+
+    def __init__(self, manifestPath=None, maxWorkers=8, retries=3, backoffFactor=0.5, timeout=60):
+        self.manifestPath = manifestPath
+        self.maxWorkers = maxWorkers
+        self.timeout = timeout
+        self.session = createSession(maxWorkers, retries, backoffFactor)
+        self.lock = threading.Lock()
+        self.manifest = self.loadManifest() if manifestPath else {}
+
+    # manifest of an earlier run, or empty if there is none or it cannot be read (downloads are then revalidated)
+    def loadManifest(self):
+        try:
+            manifest = file.initJsonFile(self.manifestPath)
+        except (ValueError, OSError) as e:
+            logger.warning(f"DownloadManager - ignoring unreadable manifest {self.manifestPath}: {e}")
+            return {}
+        return manifest if isinstance(manifest, dict) else {}
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def getConditionalHeaders(self, url, outputPath):
+        headers = {}
+        entry = self.manifest.get(url)
+        if entry and file.doesFileExist(outputPath):
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('lastModified'):
+                headers['If-Modified-Since'] = entry['lastModified']
+            elif not entry.get('etag'):
+                headers['If-Modified-Since'] = formatdate(file.getModifiedTime(outputPath), usegmt=True)
+        return headers
+
+    def updateManifest(self, url, outputPath, response):
+        with self.lock:
+            self.manifest[url] = {
+                'path': outputPath,
+                'etag': response.headers.get('ETag'),
+                'lastModified': response.headers.get('Last-Modified'),
+                'downloaded': time.time()
+            }
+            if self.manifestPath:
+                file.writeJsonFileAtomic(self.manifestPath, self.manifest)
+
+    # download url to outputPath.  If file already exists it is skipped unless refresh is set, in which case the
+    #   server is asked if it changed.  If validateJson, file is only saved if it is valid json.
+    # returns one of DOWNLOADED, NOT_MODIFIED, SKIPPED, MISSING, FAILED
+    def download(self, url, outputPath, refresh=False, validateJson=False):
+        import requests
+        if not refresh and file.doesFileExist(outputPath):
+            logger.debug(f"download - file already exists, skipping {outputPath}")
+            return SKIPPED
+
+        headers = self.getConditionalHeaders(url, outputPath) if refresh else {}
+        partPath = outputPath + '.part'
+        try:
+            with self.session.get(url, headers=headers, timeout=self.timeout, stream=True, allow_redirects=True) as response:
+                if response.status_code == 304:
+                    logger.debug(f"download - not modified {url}")
+                    return NOT_MODIFIED
+                if response.status_code == 404:
+                    logger.warning(f"download - not found {url}")
+                    return MISSING
+                if response.status_code != 200:
+                    logger.error(f"download - error returned {response.status_code} for {url}")
+                    return FAILED
+
+                with open(partPath, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        f.write(chunk)
+
+                if validateJson:
+                    try:
+                        file.readJsonFile(partPath)
+                    except ValueError:
+                        logger.error(f"download - file invalid: {url}")
+                        return FAILED
+
+                os.replace(partPath, outputPath)
+                self.updateManifest(url, outputPath, response)
+        except (requests.RequestException, OSError) as e: # OSError for errors writing the file
+            logger.error(f"download - error loading {url}: {e}")
+            return FAILED
+        finally:
+            if os.path.isfile(partPath): # not saved, don't leave partial download behind
+                os.remove(partPath)
+
+        logger.debug(f"download - saved {outputPath}")
+        return DOWNLOADED
+
+    # download list of (url, outputPath) concurrently.  Returns dict of outputPath mapped to status.
+    def downloadAll(self, jobs, refresh=False, validateJson=False):
+        def downloadJob(job):
+            url, outputPath = job
+            return self.download(url, outputPath, refresh, validateJson)
+
+        with ThreadPoolExecutor(max_workers=self.maxWorkers) as executor:
+            statuses = list(executor.map(downloadJob, jobs))
+
+        results = {}
+        for (url, outputPath), status in zip(jobs, statuses):
+            results[outputPath] = status
+        counts = { status: statuses.count(status) for status in dict.fromkeys(statuses) }
+        logger.info(f"downloadAll - {len(jobs)} files: {counts}")
+        return results
+
+def getManifestPath(outputBasePath):
+    return f"{outputBasePath}/download_manifest.json"
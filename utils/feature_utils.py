@@ -0,0 +1,284 @@
+# alignment feature store - numeric features of every alignment of every original word, computed once per database
+#   and saved as numpy arrays that are memory mapped when loaded, so training reads them without parsing the
+#   alignments json of the original words index or copying the data.  A store is a folder with:
+#
+#   features.npy    float32 matrix, one row per (original word, alignment), a column for each of featureColumns
+#   codes.npy       int32 matrix, a column for each of codeColumns - positions, morph codes of the original word (coded
+#                       same as morph_utils.getIndexForChar) and categories (index into the vocabulary in metadata)
+#   keys.npy        int64 alignment key (id in alignment_table) of each row
+#   train.npy       int64 indexes of rows in the training set
+#   test.npy        int64 indexes of rows in the test set (rows of an alignment are all in the same set)
+#   metadata.json   columns, vocabularies, split settings and fingerprint of the databases it was built from
+#
+# numpy is imported by the functions that use it, pandas only by getFeatureFrame
+
+import os
+import json
+import utils.db_utils as db
+import utils.file_utils as file
+import utils.morph_utils as mu
+import utils.pipeline_utils as pipeline
+import utils.instrument_utils as instrument
+
+logger = instrument.getLogger('feature_utils')
+
+FORMAT_VERSION = 1
+metadataFile = 'metadata.json'
+
+featureColumns = [
+    'origWordsCount',
+    'targetWordsCount',
+    'origWordsBetween',
+    'targetWordsBetween',
+    'origSpan',
+    'targetSpan',
+    'alignmentTxtFrequency', # % of alignments of the original word with this alignment text
+    'alignmentsTextFreqPeak', # highest alignmentTxtFrequency of the original word
+    'frequencyOfPeak', # alignmentTxtFrequency / alignmentsTextFreqPeak
+    'alignmentCount', # alignments of the original word with this alignment text
+    'alignmentsTotal', # alignments of the original word
+]
+
+# categorical columns saved as codes into a vocabulary
+vocabularyColumns = [ 'book_id', 'lemma', 'strong', 'originalWord', 'alignmentText', 'targetWordsText' ]
+
+codeColumns = [ 'chapter', 'verse', 'alignment_num' ] + [ 'morph_' + field for field in mu.morphFields ] + vocabularyColumns
+
+# int of chapter, verse, etc., -1 if not a number (e.g. verse span '1-2')
+def toInt(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return -1
+
+def getFeatureRow(alignment, originalWord):
+    frequency = alignment['alignmentTxtFrequency']
+    peak = originalWord['alignmentsTextFreqPeak']
+    total = originalWord['alignmentsTotal']
+    return [
+        alignment['origWordsCount'],
+        alignment['targetWordsCount'],
+        alignment['origWordsBetween'],
+        alignment['targetWordsBetween'],
+        alignment['origWordsBetween'] + alignment['origWordsCount'] - 1, # same as getSpan
+        alignment['targetWordsBetween'] + alignment['targetWordsCount'] - 1,
+        frequency,
+        peak,
+        frequency / peak if peak > 0 else 0,
+        round(frequency * total / 100),
+        total,
+    ]
+
+class Vocabulary:
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def getCode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+# morph field codes of all the original words, read in one pass over original_words.  Keyed by (word, alignment id)
+#   and by (word, book, chapter, verse) for databases loaded before words had alignment_id
+def getMorphCodesByWord(connection, chunkSize = 10000):
+    query = f"SELECT word, alignment_id, book_id, chapter, verse, morph FROM {db.original_words_table}"
+    morphCodes = {}
+    for rows in db.execute_read_query_chunks(connection, query, chunkSize):
+        for word, alignmentId, bookId, chapter, verse, morph in rows:
+            codes = mu.getMorphFieldCodes(morph)
+            if alignmentId is not None:
+                morphCodes[(word, alignmentId)] = codes
+            morphCodes.setdefault((word, bookId, chapter, verse), codes)
+    return morphCodes
+
+def getMorphCodesForAlignment(morphCodes, word, alignment):
+    codes = morphCodes.get((word, alignment['alignment_key']))
+    if codes is None:
+        codes = morphCodes.get((word, alignment['book_id'], alignment['chapter'], alignment['verse']))
+    return codes
+
+def getSourceFingerprint(dbPaths):
+    fingerprint = []
+    for path_ in dbPaths:
+        fingerprint.extend(pipeline.getPathFingerprint(path_))
+    return fingerprint
+
+def countIndexRows(connection_owi):
+    query = f"SELECT COALESCE(SUM(json_array_length(alignments)), 0) FROM {db.original_words_index_table}"
+    return connection_owi.execute(query).fetchone()[0]
+
+def getSplitIndexes(keys, testFraction, seed):
+    """
+    random split of rows into train and test sets, by alignment so that the rows of an alignment (one for each of its
+        original words) are in the same set
+    """
+    import numpy as np
+    uniqueKeys = np.unique(keys)
+    rng = np.random.default_rng(seed)
+    testKeys = rng.permutation(uniqueKeys)[:int(round(len(uniqueKeys) * testFraction))]
+    isTest = np.isin(keys, testKeys)
+    return np.flatnonzero(~isTest).astype(np.int64), np.flatnonzero(isTest).astype(np.int64)
+
+def isFeatureStoreCurrent(storeFolder, settings):
+    metadataPath = f"{storeFolder}/{metadataFile}"
+    if not os.path.isfile(metadataPath):
+        return False
+    metadata = file.readJsonFile(metadataPath)
+    return metadata.get('formatVersion') == FORMAT_VERSION and metadata.get('settings') == settings
+
+@instrument.timer('features.build')
+def buildFeatureStore(connections, dbPaths, storeFolder, testFraction = 0.2, seed = 0, force = False, chunkSize = 10000):
+    """
+    save features of all the alignments in the original words index to storeFolder.  Skipped if the store was already
+        built from the same databases with the same settings.
+    :param connections: connections of the alignments database (e.g. from ReadOnlyConnectionPool.getConnections())
+    :param dbPaths: paths of the alignments database and original words index, to detect changes
+    :return: metadata of the store
+    """
+    import numpy as np
+    settings = {
+        'source': getSourceFingerprint(dbPaths),
+        'testFraction': testFraction,
+        'seed': seed,
+    }
+    if not force and isFeatureStoreCurrent(storeFolder, settings):
+        logger.info(f"buildFeatureStore - {storeFolder} is up to date")
+        return file.readJsonFile(f"{storeFolder}/{metadataFile}")
+
+    connection = db.getConnectionForTable(connections, db.original_words_table)
+    connection_owi = db.getConnectionForTable(connections, db.original_words_index_table)
+    file.ensureFolderExists(storeFolder)
+    metadataPath = f"{storeFolder}/{metadataFile}"
+    if os.path.isfile(metadataPath):
+        os.remove(metadataPath) # store is incomplete until metadata is written
+
+    rowCount = countIndexRows(connection_owi)
+    features = np.lib.format.open_memmap(f"{storeFolder}/features.npy", mode='w+', dtype=np.float32,
+                                         shape=(rowCount, len(featureColumns)))
+    codes = np.lib.format.open_memmap(f"{storeFolder}/codes.npy", mode='w+', dtype=np.int32,
+                                      shape=(rowCount, len(codeColumns)))
+    keys = np.lib.format.open_memmap(f"{storeFolder}/keys.npy", mode='w+', dtype=np.int64, shape=(rowCount,))
+    vocabularies = { column: Vocabulary() for column in vocabularyColumns }
+    noMorph = (-1,) * len(mu.morphFields)
+    with instrument.timed('features.morph'):
+        morphCodes = getMorphCodesByWord(connection)
+
+    # rows are collected chunkSize at a time and copied into the memory mapped arrays, so memory does not grow
+    #   with the size of the database
+    row = 0
+    featureRows, codeRows, keyRows = [], [], []
+    def flush():
+        nonlocal row
+        if keyRows:
+            end = row + len(keyRows)
+            features[row:end] = featureRows
+            codes[row:end] = codeRows
+            keys[row:end] = keyRows
+            row = end
+            featureRows.clear()
+            codeRows.clear()
+            keyRows.clear()
+
+    for originalWord in db.fetchRecordsIter(connection_owi, db.original_words_index_table):
+        alignments = json.loads(originalWord['alignments'])
+        if not alignments:
+            continue
+        originalWord['alignmentsTextFreqPeak'] = max(alignment['alignmentTxtFrequency'] for alignment in alignments)
+        for alignment in alignments:
+            categories = {
+                'book_id': alignment['book_id'],
+                'lemma': originalWord['lemma'],
+                'strong': originalWord['strong'],
+                'originalWord': originalWord['originalWord'],
+                'alignmentText': alignment['alignmentText'],
+                'targetWordsText': alignment['targetWordsText'],
+            }
+            featureRows.append(getFeatureRow(alignment, originalWord))
+            codeRows.append([ toInt(alignment['chapter']), toInt(alignment['verse']), toInt(alignment['alignment_num']) ]
+                            + list(getMorphCodesForAlignment(morphCodes, originalWord['originalWord'], alignment) or noMorph)
+                            + [ vocabularies[column].getCode(categories[column]) for column in vocabularyColumns ])
+            keyRows.append(alignment['alignment_key'])
+            if len(keyRows) >= chunkSize:
+                flush()
+    flush()
+    if row != rowCount:
+        raise ValueError(f"buildFeatureStore - expected {rowCount} rows in {db.original_words_index_table}, found {row}")
+
+    for array in [features, codes, keys]:
+        array.flush()
+    train, test = getSplitIndexes(keys, testFraction, seed)
+    np.save(f"{storeFolder}/train.npy", train)
+    np.save(f"{storeFolder}/test.npy", test)
+    del features, codes, keys
+
+    metadata = {
+        'formatVersion': FORMAT_VERSION,
+        'settings': settings,
+        'rows': rowCount,
+        'trainRows': len(train),
+        'testRows': len(test),
+        'featureColumns': featureColumns,
+        'codeColumns': codeColumns,
+        'morphFields': mu.morphFields,
+        'vocabularies': { column: vocabulary.values for column, vocabulary in vocabularies.items() },
+    }
+    file.writeJsonFile(metadataPath, metadata)
+    instrument.increment('features.rows', rowCount)
+    logger.info(f"buildFeatureStore - saved {rowCount} rows ({len(train)} train, {len(test)} test) to {storeFolder}")
+    return metadata
+
+def loadFeatureStore(storeFolder, mmap = True):
+    """
+    load feature store, arrays are memory mapped (read only) unless mmap is False
+    :return: dict of metadata, features, codes, keys, train and test
+    """
+    import numpy as np
+    metadataPath = f"{storeFolder}/{metadataFile}"
+    if not os.path.isfile(metadataPath):
+        raise FileNotFoundError(f"feature store not found (or incomplete): {storeFolder}")
+    store = { 'metadata': file.readJsonFile(metadataPath) }
+    mode = 'r' if mmap else None
+    for name in ['features', 'codes', 'keys', 'train', 'test']:
+        store[name] = np.load(f"{storeFolder}/{name}.npy", mmap_mode=mode)
+    return store
+
+def getColumn(store, column):
+    """
+    column of store by name, e.g. getColumn(store, 'alignmentTxtFrequency') or getColumn(store, 'morph_case')
+    """
+    metadata = store['metadata']
+    if column in metadata['featureColumns']:
+        return store['features'][:, metadata['featureColumns'].index(column)]
+    return store['codes'][:, metadata['codeColumns'].index(column)]
+
+def getRowsForLemmas(store, lemmas):
+    """
+    indexes of rows of original words with lemmas (e.g. the lemmas of a tWords type)
+    """
+    import numpy as np
+    lemmas = set(lemmas)
+    vocabulary = store['metadata']['vocabularies']['lemma']
+    lemmaCodes = [ i for i, lemma in enumerate(vocabulary) if lemma in lemmas ]
+    return np.flatnonzero(np.isin(getColumn(store, 'lemma'), lemmaCodes))
+
+def getFeatureFrame(store, rows = None, decode = True):
+    """
+    DataFrame of store (or of rows of store, e.g. store['train']), with vocabulary columns decoded to their values
+    """
+    import numpy as np
+    import pandas as pd
+    metadata = store['metadata']
+    rows = slice(None) if rows is None else rows
+    frame = pd.DataFrame(np.asarray(store['features'][rows]), columns=metadata['featureColumns'])
+    codes = np.asarray(store['codes'][rows])
+    for i, column in enumerate(metadata['codeColumns']):
+        if decode and column in metadata['vocabularies']:
+            frame[column] = np.asarray(metadata['vocabularies'][column], dtype=object)[codes[:, i]]
+        else:
+            frame[column] = codes[:, i]
+    frame['alignment_key'] = np.asarray(store['keys'][rows])
+    return frame
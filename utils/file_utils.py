@@ -1,11 +1,11 @@
 import os
 import time
-import requests
 import json
 from pathlib import Path
 from shutil import copy2
 
 def fetchFile(url):
+    import requests
     print('fetchFile ' + url)
     try:
         data = requests.get(url, allow_redirects=True)
@@ -51,8 +51,16 @@ def writeFile(outputPath, text):
 
 def writeJsonFile(outputPath, data):
     text = json.dumps(data, indent=2, ensure_ascii = False)
-    f = open(outputPath, "w", encoding='utf-8')
-    f.write(text)
+    with open(outputPath, "w", encoding='utf-8') as f:
+        f.write(text)
+
+# write json to a temp file and move it into place, so an interrupted write never leaves a truncated file
+def writeJsonFileAtomic(outputPath, data):
+    text = json.dumps(data, indent=2, ensure_ascii = False)
+    tempPath = outputPath + '.tmp'
+    with open(tempPath, "w", encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tempPath, outputPath)
 
 def downloadJsonFile(url, outputPath):
     data = fetchFile(url)
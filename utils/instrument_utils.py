@@ -0,0 +1,220 @@
+# instrumentation - levelled logging, timers and counters for the pipeline, and optional tracing of sqlite queries.
+#
+# Logging level is INFO by default, set ALIGNMENT_LOG_LEVEL=DEBUG to see progress of each chapter, or WARNING for
+#   quiet production runs.  Timers and counters are collected for the whole process and shown by logReport() at
+#   the end of each script.  Set ALIGNMENT_TRACE_SQL=1 to log every sqlite statement (at DEBUG), and
+#   ALIGNMENT_SLOW_QUERY_MS to change the time above which queries are logged as slow (default 200 ms).
+#   ALIGNMENT_TRACE_MEMORY=N traces python allocations with tracemalloc, and memory checkpoints (see logMemory) also
+#   list the top N allocation sites.
+
+import os
+import sys
+import time
+import logging
+import functools
+import threading
+import contextlib
+import tracemalloc
+
+try:
+    import resource
+except ImportError: # not on windows
+    resource = None
+
+LOGGER_NAME = 'alignment'
+sqlLogger = logging.getLogger(f'{LOGGER_NAME}.sql')
+
+slowQueryMs = float(os.environ.get('ALIGNMENT_SLOW_QUERY_MS', 200))
+traceSql = os.environ.get('ALIGNMENT_TRACE_SQL', '') not in ['', '0']
+traceMemoryTop = int(os.environ.get('ALIGNMENT_TRACE_MEMORY', 0) or 0)
+
+def getLogger(name):
+    """
+    get logger for module, e.g. getLogger(__name__).  Loggers are under 'alignment' so they share configuration.
+    """
+    return logging.getLogger(f'{LOGGER_NAME}.{name}')
+
+# handler that writes to the current sys.stdout, so output still follows contextlib.redirect_stdout (used for the
+#   batch logs of process_all_languages)
+class StdoutHandler(logging.StreamHandler):
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+def configureLogging(level = None):
+    """
+    send logging of pipeline to stdout.  Safe to call more than once.
+    :param level: logging level name or number, default from ALIGNMENT_LOG_LEVEL or INFO
+    """
+    level = level or os.environ.get('ALIGNMENT_LOG_LEVEL', 'INFO')
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    if not any(isinstance(handler, StdoutHandler) for handler in logger.handlers):
+        handler = StdoutHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+    logger.propagate = False
+    if traceMemoryTop and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return logger
+
+#########################
+# timers and counters
+
+statsLock = threading.Lock()
+timers = {} # name: { 'count', 'total', 'max' }
+counters = {} # name: count
+gauges = {} # name: highest value seen
+
+def addTime(name, elapsed):
+    with statsLock:
+        timer = timers.get(name)
+        if timer is None:
+            timers[name] = { 'count': 1, 'total': elapsed, 'max': elapsed }
+        else:
+            timer['count'] += 1
+            timer['total'] += elapsed
+            if elapsed > timer['max']:
+                timer['max'] = elapsed
+
+def increment(name, amount = 1):
+    with statsLock:
+        counters[name] = counters.get(name, 0) + amount
+
+def setMax(name, value):
+    with statsLock:
+        if value > gauges.get(name, value - 1):
+            gauges[name] = value
+
+@contextlib.contextmanager
+def timed(name):
+    """
+    context manager to add time spent in block to timer name, e.g. `with timed('ingest.owIndex'):`
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        addTime(name, time.perf_counter() - start)
+
+def timer(name = None):
+    """
+    decorator to add time spent in function to timer name (default is function name)
+    """
+    def decorator(func):
+        timerName = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                addTime(timerName, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def resetStats():
+    with statsLock:
+        timers.clear()
+        counters.clear()
+        gauges.clear()
+
+def getReport():
+    with statsLock:
+        return {
+            'timers': { name: dict(timer) for name, timer in timers.items() },
+            'counters': dict(counters),
+            'gauges': dict(gauges),
+        }
+
+def logReport(logger = None, title = 'Instrumentation summary'):
+    """
+    log timers (slowest first) and counters collected so far
+    """
+    logger = logger or getLogger('report')
+    report = getReport()
+    if not report['timers'] and not report['counters'] and not report['gauges']:
+        return report
+    lines = [ f"#### {title} ####" ]
+    byTotal = sorted(report['timers'].items(), key=lambda item: -item[1]['total'])
+    for name, timer in byTotal:
+        mean = timer['total'] / timer['count']
+        lines.append(f"  {name}: {timer['total']:.3f}s total, {timer['count']} calls, mean {mean * 1000:.2f}ms, max {timer['max'] * 1000:.2f}ms")
+    for name, count in sorted(report['counters'].items()):
+        lines.append(f"  {name}: {count}")
+    for name, value in sorted(report['gauges'].items()):
+        lines.append(f"  {name}: {value:.1f} (max)")
+    logger.info('\n'.join(lines))
+    return report
+
+#########################
+# memory
+
+MB = 1024 * 1024
+
+# peak resident memory of process in MB, or None if not available
+def getPeakRssMB():
+    if resource is None:
+        return None
+    maxRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin': # bytes on mac, KB on linux
+        return maxRss / MB
+    return maxRss / 1024
+
+def logMemory(label, logger = None, top = None, **extra):
+    """
+    memory checkpoint - logs peak RSS, python allocations if tracemalloc is tracing, and extra values (e.g. sizes of
+        data kept in memory).  Peaks are kept as gauges for the report.
+    :param top: number of top allocation sites to log, default from ALIGNMENT_TRACE_MEMORY
+    """
+    logger = logger or getLogger('memory')
+    parts = []
+    peakRss = getPeakRssMB()
+    if peakRss is not None:
+        setMax('memory.peakRssMB', peakRss)
+        parts.append(f"peak RSS {peakRss:.0f} MB")
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        current, peak = tracemalloc.get_traced_memory()
+        setMax('memory.tracedPeakMB', peak / MB)
+        parts.append(f"traced {current / MB:.0f} MB (peak {peak / MB:.0f} MB)")
+    parts.extend([ f"{name} {value}" for name, value in extra.items() ])
+    logger.info(f"memory {label}: {', '.join(parts)}")
+
+    top = traceMemoryTop if top is None else top
+    if tracing and top:
+        stats = tracemalloc.take_snapshot().statistics('lineno')[:top]
+        logger.info('\n'.join([ f"  {stat}" for stat in stats ]))
+
+#########################
+# sql
+
+def traceConnection(connection):
+    """
+    log every statement run on connection at DEBUG (including those run directly on cursors), and count them
+    """
+    def trace(statement):
+        increment('sql.traced')
+        sqlLogger.debug(statement)
+    connection.set_trace_callback(trace)
+
+@contextlib.contextmanager
+def timedQuery(query, name = 'sql.query'):
+    """
+    time a sql statement: counted, added to timer name, and logged as warning if slower than slowQueryMs
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        addTime(name, elapsed)
+        if elapsed * 1000 >= slowQueryMs:
+            increment('sql.slow')
+            shortQuery = query if len(query) <= 300 else query[:300] + '...' # inserts of many rows are long
+            sqlLogger.warning(f"slow query {elapsed * 1000:.0f}ms: {shortQuery}")
@@ -1,4 +1,5 @@
-import pandas as pd
+# numpy and pandas are imported by the functions that use them, so importing morph_utils is quick
+import functools
 
 def getGreekRoles():
     return list(morphCodeLocalizationMapGrk[2].keys())
@@ -199,6 +200,101 @@ def morphToDict(morph):
         results[field] = getIndexForChar(char)
     return results
 
+# lookup table from ascii byte to same index as getIndexForChar (-1 for ',', padding, and unexpected characters)
+@functools.lru_cache(maxsize=None)
+def getCharIndexTable():
+    import numpy as np
+    charIndexTable = np.full(256, -1, dtype=np.int8)
+    for code_ in range(ord('0'), ord('9') + 1):
+        charIndexTable[code_] = code_ - ord('0')
+    for code_ in range(ord('A'), ord('Z') + 1):
+        charIndexTable[code_] = code_ - ord('A') + 11
+    for code_ in range(ord('a'), ord('z') + 1):
+        charIndexTable[code_] = code_ - ord('a') + 41
+    return charIndexTable
+
+def getMorphCodes(uniqueMorphs):
+    """
+    decode array of morph strings into a matrix of field codes (one column for each of morphFields)
+    :param uniqueMorphs: numpy array of str
+    :return: numpy int8 array of shape (len(uniqueMorphs), len(morphFields))
+    """
+    import numpy as np
+    fieldCount = len(morphFields)
+    width = 3 + fieldCount
+    encoded = np.char.encode(uniqueMorphs.astype(str), 'ascii', 'replace')
+    itemSize = max(encoded.dtype.itemsize, 1)
+    chars = np.frombuffer(encoded.tobytes(), dtype=np.uint8).reshape(len(encoded), itemSize)
+    if itemSize < width: # pad short morphs so every field position exists
+        chars = np.pad(chars, ((0, 0), (0, width - itemSize)))
+    return getCharIndexTable()[chars[:, 3:width]]
+
+def decodeMorphColumn(morphs):
+    """
+    vectorized version of morphToDict for a whole column of morphs.  Each unique morph is only decoded once.
+    :param morphs: list or Series of morph strings (e.g. original_words.morph)
+    :return: DataFrame with morph and an integer column for each of morphFields (same coding as getIndexForChar),
+                indexed the same as morphs
+    """
+    import numpy as np
+    import pandas as pd
+    morphs = pd.Series(morphs).fillna('').astype(str)
+    inverse, uniqueMorphs = pd.factorize(morphs, sort=False)
+    codes = getMorphCodes(np.asarray(uniqueMorphs, dtype=str))
+    results = { 'morph': morphs }
+    fieldCodes = codes[inverse]
+    for i, field in enumerate(morphFields):
+        results[field] = pd.Series(fieldCodes[:, i], index=morphs.index)
+    return pd.DataFrame(results)
+
+@functools.lru_cache(maxsize=None)
+def getMorphFieldCodes(morph):
+    """
+    decode a single morph into tuple of field codes (one for each of morphFields), cached by morph
+    """
+    import numpy as np
+    codes = getMorphCodes(np.array([morph or ''], dtype=str))[0]
+    return tuple(int(code) for code in codes)
+
+# index in morphCodeLocalizationMapGrk for each of morphFields
+morphFieldMapIndex = { field: i + 2 for i, field in enumerate(morphFields) }
+
+def getMorphCodeName(field, code, roleCode=None):
+    """
+    get localized name for field code (e.g. 'case', 17 -> 'genitive').  For 'type' the roleCode is needed since each
+        role has its own types.
+    :return: name or None if not found
+    """
+    if code < 0:
+        return None
+    char = getCharForIndex(code)
+    if field == 'role':
+        return findRoleNameForCharGreek(char)
+    if field == 'type':
+        roles = morphCodeLocalizationMapGrk[2]
+        role = roles.get(getCharForIndex(roleCode)) if roleCode is not None else None
+        return role[3].get(char) if role else None
+    codes = morphCodeLocalizationMapGrk[morphFieldMapIndex[field]]
+    if field == 'person':
+        return codes.get(code)
+    return codes.get(char)
+
+def getMorphFieldFrequencies(morphs, role=None):
+    """
+    get frequency of each field value by role for whole column of morphs in one pass
+    :param morphs: list or Series of morph strings
+    :param role: optional role char to limit to (e.g. 'V')
+    :return: DataFrame with columns role, field, key, count
+    """
+    decoded = decodeMorphColumn(morphs)
+    if role is not None:
+        decoded = decoded[decoded['role'] == getIndexForChar(role)]
+    frequencies = (decoded.melt(id_vars='role', value_vars=morphFields[1:], var_name='field', value_name='code')
+                   .groupby(['role', 'field', 'code'], sort=True).size().reset_index(name='count'))
+    frequencies['role'] = frequencies['role'].map(getCharForIndex)
+    frequencies['key'] = frequencies['code'].map(getCharForIndex)
+    return frequencies[['role', 'field', 'key', 'code', 'count']]
+
 def extract(text, match, start, end):
     subStr = text[start:end]
     if (subStr == match):
@@ -215,6 +311,7 @@ def filterSyntacticalRole(sequence, role):
     return filtered
 
 def findFieldsForRole(unique_morph_list, role):
+    import pandas as pd
     field_data = {}
     print(f"\nFor role: '{role}'")
 
@@ -236,6 +333,7 @@ def findFieldsForRole(unique_morph_list, role):
     return field_data
 
 def findFieldsFrequencyForRole(unique_morph_list, role):
+    import pandas as pd
     field_data = {}
     print(f"\nFor role: '{role}'")
 
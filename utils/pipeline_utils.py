@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import hashlib
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import utils.file_utils as file
+import utils.instrument_utils as instrument
+import utils.profile_utils as profiler
+
+logger = instrument.getLogger('pipeline_utils')
+
+RAN = 'ran'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+NOT_RUN = 'not-run'
+
+class Stage:
+    """
+    A step of the pipeline.  inputs and outputs are file or folder paths.  The stage is skipped when the fingerprint
+    of its inputs and params matches the last successful run, all outputs exist, and none of the stages it depends on
+    ran in this pipeline run.
+    """
+
+    def __init__(self, name, run, inputs=[], outputs=[], dependsOn=[], params=None):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.dependsOn = list(dependsOn)
+        self.params = params
+
+def getPathFingerprint(path_):
+    if os.path.isfile(path_):
+        stat = os.stat(path_)
+        return [ [path_, stat.st_size, stat.st_mtime_ns] ]
+
+    if os.path.isdir(path_):
+        entries = []
+        for root, dirs, files in os.walk(path_):
+            dirs.sort()
+            for fileName in sorted(files):
+                filePath = os.path.join(root, fileName)
+                stat = os.stat(filePath)
+                entries.append([filePath, stat.st_size, stat.st_mtime_ns])
+        return entries
+
+    return [ [path_, None, None] ] # missing
+
+# hash of size and modified time of files (or folders), e.g. to check a cache made from them is still current
+def getPathsHash(paths):
+    hash = hashlib.sha256()
+    for path_ in paths:
+        hash.update(json.dumps(getPathFingerprint(path_)).encode('utf-8'))
+    return hash.hexdigest()
+
+def getStageFingerprint(stage):
+    hash = hashlib.sha256()
+    hash.update(json.dumps(stage.params, sort_keys=True, default=str).encode('utf-8'))
+    for input in stage.inputs:
+        hash.update(json.dumps(getPathFingerprint(input)).encode('utf-8'))
+    return hash.hexdigest()
+
+def doOutputsExist(stage):
+    for output in stage.outputs:
+        if not (os.path.isfile(output) or os.path.isdir(output)):
+            return False
+    return True
+
+def validateStages(stages):
+    names = set()
+    for stage in stages:
+        if stage.name in names:
+            raise ValueError(f"duplicate stage '{stage.name}'")
+        names.add(stage.name)
+    for stage in stages:
+        for dependency in stage.dependsOn:
+            if dependency not in names:
+                raise ValueError(f"stage '{stage.name}' depends on unknown stage '{dependency}'")
+
+# run stages in dependency order.  Stages whose dependencies are finished run concurrently (up to maxWorkers).
+#   State with fingerprints and timings for each stage is saved to statePath.
+# returns dict of stage name mapped to {'status', 'elapsed'}
+def runPipeline(stages, statePath, maxWorkers=4, force=False):
+    validateStages(stages)
+    state = file.initJsonFile(statePath)
+    results = {}
+    stagesByName = { stage.name: stage for stage in stages }
+    pending = dict(stagesByName)
+    running = {}
+    start = time.time()
+
+    def runStage(stage):
+        stageStart = time.time()
+        with instrument.timed(f'stage.{stage.name}'), profiler.profiled(stage.name):
+            stage.run()
+        return time.time() - stageStart
+
+    def saveState():
+        file.writeJsonFile(statePath, state)
+
+    with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+        while pending or running:
+            progressed = False
+            for name in list(pending.keys()):
+                stage = pending[name]
+                dependencyResults = [ results.get(dependency) for dependency in stage.dependsOn ]
+                if None in dependencyResults:
+                    continue # dependencies not finished yet
+
+                del pending[name]
+                progressed = True
+                if any(result['status'] in [FAILED, NOT_RUN] for result in dependencyResults):
+                    logger.warning(f"runPipeline - not running '{name}' since a dependency failed")
+                    results[name] = { 'status': NOT_RUN, 'elapsed': 0 }
+                    continue
+
+                fingerprint = getStageFingerprint(stage)
+                dependencyRan = any(result['status'] == RAN for result in dependencyResults)
+                lastRun = state.get(name, {})
+                if (not force and not dependencyRan and lastRun.get('fingerprint') == fingerprint
+                        and doOutputsExist(stage)):
+                    logger.info(f"runPipeline - skipping '{name}', inputs unchanged")
+                    results[name] = { 'status': SKIPPED, 'elapsed': 0 }
+                    continue
+
+                logger.info(f"\n\nrunPipeline - running '{name}'")
+                running[executor.submit(runStage, stage)] = name
+
+            if not running:
+                if pending and not progressed:
+                    raise ValueError(f"dependency cycle in stages: {list(pending.keys())}")
+                continue
+
+            done, notDone = wait(list(running.keys()), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    elapsed = future.result()
+                    # fingerprint after running since a stage may update its own inputs (e.g. caches)
+                    state[name] = {
+                        'fingerprint': getStageFingerprint(stagesByName[name]),
+                        'elapsed': elapsed,
+                        'finished': time.time()
+                    }
+                    results[name] = { 'status': RAN, 'elapsed': elapsed }
+                    logger.info(f"runPipeline - finished '{name}', Elapsed time: {timedelta(seconds=elapsed)}")
+                except Exception as e:
+                    logger.error(f"runPipeline - stage '{name}' failed: {e}")
+                    state.pop(name, None)
+                    results[name] = { 'status': FAILED, 'elapsed': 0, 'error': str(e) }
+                saveState()
+
+    saveState()
+    printTimings(results, time.time() - start)
+    failed = [ name for name, result in results.items() if result['status'] == FAILED ]
+    if failed:
+        raise RuntimeError(f"pipeline stages failed: {failed}")
+    return results
+
+def printTimings(results, totalElapsed):
+    print("\n#### Pipeline stage timings ####")
+    for name, result in results.items():
+        print(f"  {name}: {result['status']}, {timedelta(seconds=result['elapsed'])}")
+    print(f"  total elapsed time: {timedelta(seconds=totalElapsed)}")
@@ -1,9 +1,10 @@
-import matplotlib.pyplot as plt
-from matplotlib.ticker import ScalarFormatter
-import numpy as np
+# matplotlib and numpy are imported by the functions that use them, so importing plot_utils is quick
 
 # doing plots
 def plotFieldFrequency(frequency, fieldName, xAxisLabel, yAxisLabel = None, max=-1, xNumbers=True, xShowTicks=True, title=None, ylogPlot=False):
+    import matplotlib.pyplot as plt
+    from matplotlib.ticker import ScalarFormatter
+    import numpy as np
     fig = plt.figure()
     if title is None: # use default title
         title = f"Frequency of {xAxisLabel} ('{fieldName}')"
@@ -38,6 +39,7 @@ def plotFieldFrequency(frequency, fieldName, xAxisLabel, yAxisLabel = None, max=
     plt.show()
 
 def plotFrequencies(frequenciesOfAlignments, title='', ylabel='', showXValues=False, xlimit=None):
+    import matplotlib.pyplot as plt
     plt.figure()
     outputTable = []
     for origWord in frequenciesOfAlignments.keys():
@@ -71,6 +73,7 @@ def plotFrequencies(frequenciesOfAlignments, title='', ylabel='', showXValues=Fa
     return outputTable
 
 def plotXYdataDict(dataDict, title='', ylabel='', xlabel='', showXValues=False, xlimit=None, ylimit=None):
+    import matplotlib.pyplot as plt
     plt.figure()
     for origWord in dataDict.keys():
         data = dataDict[origWord]
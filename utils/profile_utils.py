@@ -0,0 +1,254 @@
+# profiling of pipeline stages without editing the scripts.  Every entry point accepts:
+#
+#   --profile cprofile|sample  - profile each stage (each pipeline stage, or the whole script)
+#   --profile-output FOLDER    - where profiles are written, default ./profiles
+#   --profile-top N            - number of hot functions listed, default 30
+#   --profile-interval SECS    - time between samples of the sampling profiler, default 0.005
+#
+# or the same settings from environment ALIGNMENT_PROFILE, ALIGNMENT_PROFILE_OUTPUT, etc.  For each stage these files
+#   are written:
+#   <stage>.collapsed   - collapsed stacks, one `frame;frame;frame count` per line, for flamegraph.pl or speedscope
+#   <stage>_top.txt     - top N hot functions by self time and by total time
+#   <stage>.prof        - (cprofile only) pstats dump, e.g. for `python3 -m pstats` or snakeviz
+#
+# Sampling is low overhead and records real stacks, so is best for flamegraphs and for stages that run in parallel.
+#   cProfile counts every call, but its collapsed stacks are estimated from the caller graph.
+
+import os
+import re
+import sys
+import pstats
+import cProfile
+import argparse
+import threading
+import contextlib
+from collections import Counter
+import utils.instrument_utils as instrument
+
+logger = instrument.getLogger('profile_utils')
+
+PROFILE_CPROFILE = 'cprofile'
+PROFILE_SAMPLE = 'sample'
+profileModes = [PROFILE_CPROFILE, PROFILE_SAMPLE]
+
+settings = {
+    'mode': None,
+    'outputFolder': './profiles',
+    'top': 30,
+    'interval': 0.005,
+}
+
+profilesLock = threading.Lock()
+profiles = {} # stage name: pstats.Stats for cprofile, or Counter of collapsed stacks for sample
+activeProfile = threading.local()
+
+def addProfileArguments(parser):
+    env = os.environ
+    parser.add_argument('--profile', choices=profileModes, default=env.get('ALIGNMENT_PROFILE') or None,
+                        help='profile each stage with cProfile or a sampling profiler')
+    parser.add_argument('--profile-output', default=env.get('ALIGNMENT_PROFILE_OUTPUT', settings['outputFolder']),
+                        help='folder to write profiles to')
+    parser.add_argument('--profile-top', type=int, default=int(env.get('ALIGNMENT_PROFILE_TOP', settings['top'])),
+                        help='number of hot functions to list')
+    parser.add_argument('--profile-interval', type=float,
+                        default=float(env.get('ALIGNMENT_PROFILE_INTERVAL', settings['interval'])),
+                        help='seconds between samples of sampling profiler')
+    return parser
+
+def configureProfiling(mode, outputFolder = None, top = None, interval = None):
+    if mode and mode not in profileModes:
+        raise ValueError(f"unknown profile mode '{mode}', expected one of {profileModes}")
+    settings['mode'] = mode
+    with profilesLock:
+        profiles.clear() # e.g. a forked worker starts its own profiles
+    if outputFolder:
+        settings['outputFolder'] = outputFolder
+    if top:
+        settings['top'] = top
+    if interval:
+        settings['interval'] = interval
+    if mode:
+        logger.info(f"profiling stages with {mode}, saving to {settings['outputFolder']}")
+    return dict(settings)
+
+def configureProfilingFromArgs(args = None):
+    """
+    set up profiling from the --profile arguments.
+    :param args: parsed arguments (from a parser with addProfileArguments), or a list of command line arguments,
+                    default is sys.argv.  Arguments not about profiling are ignored, so scripts without their own
+                    argument parser can just call this.
+    """
+    if args is None or isinstance(args, list):
+        parser = addProfileArguments(argparse.ArgumentParser(add_help=False))
+        args, unknown = parser.parse_known_args(sys.argv[1:] if args is None else args)
+    return configureProfiling(args.profile, args.profile_output, args.profile_top, args.profile_interval)
+
+def getSettings():
+    return dict(settings)
+
+def getFileName(name):
+    return re.sub(r'[^\w.-]+', '_', name)
+
+#########################
+# sampling profiler
+
+def getFrameName(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def getStack(frame):
+    stack = []
+    while frame is not None:
+        stack.append(getFrameName(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+# samples the stack of one thread (the thread running the stage) until stopped
+class Sampler(threading.Thread):
+    def __init__(self, threadId, interval):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.threadId = threadId
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.threadId)
+            if frame is not None:
+                self.stacks[getStack(frame)] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        return self.stacks
+
+def getTopFromStacks(stacks, top):
+    selfCounts = Counter()
+    totalCounts = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        selfCounts[frames[-1]] += count
+        for frame in set(frames): # recursive functions only count once per sample
+            totalCounts[frame] += count
+    samples = sum(stacks.values())
+    lines = [ f"{samples} samples" ]
+    for title, counts in [('self', selfCounts), ('total', totalCounts)]:
+        lines.append(f"\n#### top {top} by {title} samples ####")
+        for frame, count in counts.most_common(top):
+            lines.append(f"  {count:8d} {count / samples:7.1%}  {frame}")
+    return '\n'.join(lines)
+
+#########################
+# cProfile
+
+def getStatsFuncName(func):
+    filename, line, name = func
+    if filename == '~': # builtins
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+def getCollapsedFromStats(stats, maxDepth = 64):
+    """
+    estimate collapsed stacks from cProfile caller graph - the self time of each function is split between its
+        callers by how often each called it, up to the roots.  Times are in microseconds.
+    """
+    entries = stats.stats # func: (primitive calls, calls, self time, total time, callers)
+    stacks = Counter()
+    minAmount = sum(entry[2] for entry in entries.values()) * 1e6 / 100000 # stop splitting tiny amounts
+
+    def addPaths(func, path, amount, seen):
+        callers = entries.get(func, (0, 0, 0, 0, {}))[4]
+        callers = { caller: info for caller, info in callers.items() if caller not in seen and caller in entries }
+        if not callers or len(path) >= maxDepth or amount < minAmount:
+            stacks[';'.join(getStatsFuncName(f) for f in reversed(path))] += amount
+            return
+        calls = sum(info[0] if isinstance(info, tuple) else info for info in callers.values())
+        for caller, info in callers.items():
+            share = (info[0] if isinstance(info, tuple) else info) / calls if calls else 1 / len(callers)
+            addPaths(caller, path + [caller], amount * share, seen | { caller })
+
+    for func, (cc, nc, tt, ct, callers) in entries.items():
+        if tt > 0:
+            addPaths(func, [func], tt * 1e6, { func })
+    return Counter({ stack: round(amount) for stack, amount in stacks.items() if round(amount) > 0 })
+
+def getTopFromStats(stats, top):
+    lines = []
+    for title, column in [('self', 2), ('total', 3)]: # columns of tottime and cumtime
+        entries = sorted(stats.stats.items(), key=lambda item: -item[1][column])
+        lines.append(f"#### top {top} by {title} time ####")
+        lines.append(f"  {'calls':>10} {'self s':>10} {'total s':>10}  function")
+        for func, (cc, nc, tt, ct, callers) in entries[:top]:
+            lines.append(f"  {nc:10d} {tt:10.3f} {ct:10.3f}  {getStatsFuncName(func)}")
+        lines.append('')
+    return '\n'.join(lines)
+
+#########################
+
+def writeCollapsed(path, stacks):
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{stack} {count}\n")
+
+def saveProfile(name, mode, result):
+    """
+    add result to the profile for stage name (a stage run more than once is combined) and write its files
+    """
+    outputFolder = settings['outputFolder']
+    os.makedirs(outputFolder, exist_ok=True)
+    basePath = f"{outputFolder}/{getFileName(name)}"
+    top = settings['top']
+    with profilesLock:
+        if mode == PROFILE_CPROFILE:
+            if name in profiles:
+                profiles[name].add(result)
+            else:
+                profiles[name] = pstats.Stats(result)
+            stats = profiles[name]
+            stats.dump_stats(f"{basePath}.prof")
+            stacks = getCollapsedFromStats(stats)
+            topText = getTopFromStats(stats, top)
+        else:
+            profiles.setdefault(name, Counter()).update(result)
+            stacks = profiles[name]
+            topText = getTopFromStacks(stacks, top)
+        writeCollapsed(f"{basePath}.collapsed", stacks)
+        with open(f"{basePath}_top.txt", 'w', encoding='utf-8') as f:
+            f.write(topText)
+    logger.info(f"profile of '{name}' saved to {basePath}.collapsed and {basePath}_top.txt")
+
+@contextlib.contextmanager
+def profiled(name):
+    """
+    profile block as stage name if profiling is enabled.  Nested blocks in the same thread are included in the
+        outer profile.
+    """
+    mode = settings['mode']
+    if not mode or getattr(activeProfile, 'name', None):
+        yield
+        return
+
+    profiler = None
+    sampler = None
+    if mode == PROFILE_CPROFILE:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e: # only one cProfile can be active at a time in python 3.12+
+            logger.warning(f"profiled - cannot profile '{name}', {e}.  Use --profile sample for parallel stages")
+            profiler = None
+    else:
+        sampler = Sampler(threading.get_ident(), settings['interval'])
+        sampler.start()
+
+    activeProfile.name = name
+    try:
+        yield
+    finally:
+        activeProfile.name = None
+        if profiler:
+            profiler.disable()
+            saveProfile(name, mode, profiler)
+        elif sampler:
+            saveProfile(name, mode, sampler.stop())
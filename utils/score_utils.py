@@ -0,0 +1,198 @@
+# alignment anomaly scoring - a per lemma statistical model over the feature store (see utils/feature_utils.py) that
+#   ranks how unusual each alignment is for its lemma, instead of the fixed thresholds of generateWarnings.
+#
+# The model is fit on the training rows of the store.  For each lemma it keeps the counts of each target text, and the
+#   mean and deviation of the word counts and words between of its alignments (shrunk toward the whole corpus for
+#   lemmas with few alignments, so a rare lemma is not flagged for lack of data).  The score of an alignment adds:
+#   frequency_score        surprise of the target text for the lemma, -log2 of its smoothed frequency
+#   *_score                how many deviations above the lemma mean the counts and words between are (0 if below)
+#
+# All rows are scored in vectorized batches and saved to the alignment_scores table, ranked highest score first.
+#
+# numpy is imported by the functions that use it
+
+import os
+import utils.db_utils as db
+import utils.feature_utils as features
+import utils.instrument_utils as instrument
+
+logger = instrument.getLogger('score_utils')
+
+# feature columns compared to the mean of the lemma, and their column in the scores table
+deviationColumns = {
+    'origWordsCount': 'orig_words_score',
+    'targetWordsCount': 'target_words_score',
+    'origWordsBetween': 'orig_words_between_score',
+    'targetWordsBetween': 'target_words_between_score',
+}
+
+scoreColumns = [ 'frequency_score' ] + list(deviationColumns.values())
+
+defaultPrior = 5.0 # weight of corpus stats in the stats of each lemma, as a number of alignments
+defaultMinStd = 0.5 # smallest deviation used, so lemmas that are always aligned the same way do not blow up scores
+
+def fitLemmaModel(store, rows = None, prior = defaultPrior, minStd = defaultMinStd):
+    """
+    fit per lemma model on rows of feature store (default is the training rows)
+    :return: dict of numpy arrays indexed by lemma code
+    """
+    import numpy as np
+    rows = store['train'] if rows is None else rows
+    metadata = store['metadata']
+    lemmaCount = len(metadata['vocabularies']['lemma'])
+    targetCount = len(metadata['vocabularies']['targetWordsText'])
+    lemmas = np.asarray(features.getColumn(store, 'lemma')[rows], dtype=np.int64)
+    counts = np.bincount(lemmas, minlength=lemmaCount).astype(np.float64)
+
+    model = {
+        'prior': prior,
+        'minStd': minStd,
+        'targetCount': targetCount,
+        'counts': counts,
+        'means': {},
+        'stds': {},
+    }
+    for column in deviationColumns:
+        values = np.asarray(features.getColumn(store, column)[rows], dtype=np.float64)
+        corpusMean = values.mean() if len(values) else 0.0
+        corpusVar = values.var() if len(values) else 0.0
+        sums = np.bincount(lemmas, weights=values, minlength=lemmaCount)
+        sumsSquared = np.bincount(lemmas, weights=values * values, minlength=lemmaCount)
+        means = (sums + prior * corpusMean) / (counts + prior)
+        variances = (sumsSquared + prior * (corpusVar + corpusMean * corpusMean)) / (counts + prior) - means * means
+        model['means'][column] = means
+        model['stds'][column] = np.maximum(np.sqrt(np.maximum(variances, 0)), minStd)
+
+    # counts of each (lemma, target text) pair, sorted by pair key for searchsorted lookups
+    targets = np.asarray(features.getColumn(store, 'targetWordsText')[rows], dtype=np.int64)
+    model['pairKeys'], model['pairCounts'] = np.unique(lemmas * targetCount + targets, return_counts=True)
+    return model
+
+def scoreRows(store, model, start, end):
+    """
+    score rows start to end of feature store
+    :return: dict of numpy arrays - score, and each of scoreColumns
+    """
+    import numpy as np
+    lemmas = np.asarray(features.getColumn(store, 'lemma')[start:end], dtype=np.int64)
+    targets = np.asarray(features.getColumn(store, 'targetWordsText')[start:end], dtype=np.int64)
+
+    pairKeys = lemmas * model['targetCount'] + targets
+    pairCounts = np.zeros(len(pairKeys))
+    if len(model['pairKeys']):
+        positions = np.minimum(np.searchsorted(model['pairKeys'], pairKeys), len(model['pairKeys']) - 1)
+        found = model['pairKeys'][positions] == pairKeys
+        pairCounts[found] = model['pairCounts'][positions[found]]
+    frequency = (pairCounts + 1) / (model['counts'][lemmas] + 2) # smoothed so unseen lemmas are not certain
+    scores = { 'frequency_score': -np.log2(frequency) }
+
+    for column, scoreColumn in deviationColumns.items():
+        values = np.asarray(features.getColumn(store, column)[start:end], dtype=np.float64)
+        deviations = (values - model['means'][column][lemmas]) / model['stds'][column][lemmas]
+        scores[scoreColumn] = np.maximum(deviations, 0)
+
+    scores['score'] = sum(scores[column] for column in scoreColumns)
+    return scores
+
+@instrument.timer('scores.score')
+def scoreFeatureStore(store, model, batchSize = 65536):
+    """
+    score all rows of feature store in batches of batchSize
+    :return: dict of numpy arrays - score, each of scoreColumns, and rank (1 is most unusual)
+    """
+    import numpy as np
+    rowCount = store['metadata']['rows']
+    results = { column: np.zeros(rowCount, dtype=np.float32) for column in ['score'] + scoreColumns }
+    for start in range(0, rowCount, batchSize):
+        end = min(start + batchSize, rowCount)
+        for column, values in scoreRows(store, model, start, end).items():
+            results[column][start:end] = values
+        instrument.increment('scores.rows', end - start)
+
+    order = np.argsort(-results['score'], kind='stable')
+    ranks = np.empty(rowCount, dtype=np.int64)
+    ranks[order] = np.arange(1, rowCount + 1)
+    results['rank'] = ranks
+    return results
+
+@instrument.timer('scores.save')
+def saveScores(connection, store, results, batchSize = 10000):
+    """
+    replace contents of alignment_scores table with results of scoreFeatureStore
+    """
+    import numpy as np
+    metadata = store['metadata']
+    rowCount = metadata['rows']
+    vocabularies = metadata['vocabularies']
+    inTraining = np.zeros(rowCount, dtype=bool)
+    inTraining[store['train']] = True
+    columns = [ 'alignment_id', 'original_word', 'lemma', 'alignment_text', 'score', 'rank', 'top_percent' ] \
+              + scoreColumns + [ 'in_training' ]
+    insert = f"INSERT INTO {db.alignment_scores_table} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))});"
+
+    db.execute_query(connection, f"DROP TABLE IF EXISTS {db.alignment_scores_table};")
+    db.execute_query(connection, db.create_alignment_scores_table)
+    cursor = connection.cursor()
+    with instrument.timedQuery(insert, 'sql.scores.insert'):
+        for start in range(0, rowCount, batchSize):
+            end = min(start + batchSize, rowCount)
+            codes = { column: features.getColumn(store, column)[start:end]
+                      for column in ['originalWord', 'lemma', 'alignmentText'] }
+            scoreValues = [ results[column][start:end].tolist() for column in ['score'] + scoreColumns ]
+            rows = zip(store['keys'][start:end].tolist(),
+                       [ vocabularies['originalWord'][code] for code in codes['originalWord'] ],
+                       [ vocabularies['lemma'][code] for code in codes['lemma'] ],
+                       [ vocabularies['alignmentText'][code] for code in codes['alignmentText'] ],
+                       scoreValues[0],
+                       results['rank'][start:end].tolist(),
+                       (results['rank'][start:end] / rowCount * 100).tolist(),
+                       *scoreValues[1:],
+                       inTraining[start:end].astype(int).tolist())
+            cursor.executemany(insert, rows)
+        connection.commit()
+    db.execute_query(connection, f"CREATE INDEX IF NOT EXISTS idx_{db.alignment_scores_table}_rank ON {db.alignment_scores_table} (rank);")
+    db.execute_query(connection, f"CREATE INDEX IF NOT EXISTS idx_{db.alignment_scores_table}_alignment_id ON {db.alignment_scores_table} (alignment_id);")
+
+def scoreAlignments(storeFolder, dbPath, prior = defaultPrior, minStd = defaultMinStd, batchSize = 65536):
+    """
+    fit model on feature store in storeFolder, score every alignment, and save scores in the scores database of dbPath
+    :return: number of rows scored
+    """
+    store = features.loadFeatureStore(storeFolder)
+    with instrument.timed('scores.fit'):
+        model = fitLemmaModel(store, prior=prior, minStd=minStd)
+    results = scoreFeatureStore(store, model, batchSize)
+
+    scoresPath = db.getScoresSqlPath(dbPath)
+    # written to a scratch file that replaces the scores database when done, so readers never see a half written
+    #   table and crash safety is not needed
+    tempPath = scoresPath + '.tmp'
+    if os.path.isfile(tempPath):
+        os.remove(tempPath)
+    connection = db.create_connection(tempPath, db.PROFILE_BULK_LOAD_UNSAFE, allowUnsafe=True)
+    try:
+        saveScores(connection, store, results)
+    finally:
+        connection.close()
+    os.replace(tempPath, scoresPath)
+
+    rowCount = store['metadata']['rows']
+    logger.info(f"scoreAlignments - scored {rowCount} alignments of {len(model['counts'])} lemmas, saved to {scoresPath}")
+    return rowCount
+
+def getTopScores(dbPath, limit = 100):
+    """
+    highest scoring alignments, with their verse from alignment_table
+    """
+    query = f"""
+SELECT s.rank, s.score, s.top_percent, a.book_id, a.chapter, a.verse, a.alignment_num, s.original_word, s.lemma,
+  s.alignment_text, {', '.join('s.' + column for column in scoreColumns)}, s.in_training, s.alignment_id
+FROM {db.alignment_scores_table} s
+JOIN {db.alignment_table} a ON a.id = s.alignment_id
+ORDER BY s.rank
+LIMIT {int(limit)};"""
+    connection = db.create_read_only_connection(dbPath)
+    try:
+        return db.execute_read_query_dict(connection, query)
+    finally:
+        connection.close()
@@ -0,0 +1,219 @@
+# full text search of original and target words, and of alignment text, using sqlite FTS5.  Text is folded (accents
+#   and case removed, see text_utils.foldText) before it is indexed and before it is searched, so 'θεου' finds 'Θεοῦ'
+#   and 'бог' finds 'Бог'.  The search index is built on first use and rebuilt when the words change.
+
+import json
+import sqlite3
+from sqlite3 import Error
+import utils.db_utils as db
+import utils.file_utils as file
+import utils.text_utils as text
+import utils.instrument_utils as instrument
+
+logger = instrument.getLogger('search_utils')
+
+search_index_info_table = 'search_index_info'
+
+def getFtsTable(table):
+    return f"{table}_fts"
+
+# columns indexed for each table
+ftsColumns = {
+    db.original_words_table: ['word', 'lemma'],
+    db.target_words_table: ['word'],
+    db.alignment_table: ['orig_words_txt', 'target_words_txt'],
+}
+
+create_search_index_info_table = f"""
+CREATE TABLE IF NOT EXISTS {search_index_info_table} (
+  table_name TEXT PRIMARY KEY,
+  row_count INTEGER,
+  max_id INTEGER
+);
+"""
+
+def getTableState(connection, table):
+    row = db.execute_query_single(connection, f"SELECT COUNT(*), MAX(id) FROM {table};")
+    return row[0], row[1]
+
+def hasTable(connection, table):
+    found = db.execute_query_single(connection, f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = '{table}';")
+    return bool(found and found[0])
+
+def isReadOnlyConnection(connection):
+    found = db.execute_query_single(connection, "PRAGMA query_only;")
+    return bool(found and found[0])
+
+def getReadOnlyError(table):
+    return RuntimeError(f"search index of {table} is missing or out of date and the connection is read only, build it "
+                        f"first with a writable connection (e.g. ensureSearchIndexes(db.initAlignmentDB(dbPath)['default']))")
+
+def isSearchIndexCurrent(connection, table):
+    if not hasTable(connection, search_index_info_table) or not hasTable(connection, getFtsTable(table)):
+        return False
+    found = db.execute_query_single(connection, f"SELECT row_count, max_id FROM {search_index_info_table} WHERE table_name = '{table}';")
+    if not found:
+        return False
+    return tuple(found) == getTableState(connection, table)
+
+def buildSearchIndex(connection, table):
+    if isReadOnlyConnection(connection):
+        raise getReadOnlyError(table)
+    columns = ftsColumns[table]
+    ftsTable = getFtsTable(table)
+    logger.info(f"buildSearchIndex - indexing {table}")
+    rows = db.execute_read_query(connection, f"SELECT id, {', '.join(columns)} FROM {table};") or []
+    foldedRows = [ [row[0]] + [ text.foldText(value) for value in row[1:] ] for row in rows ]
+    marks = text.getCombiningMarks([ value for row in foldedRows for value in row[1:] ])
+    tokenize = "unicode61 remove_diacritics 0"
+    if marks:
+        tokenize += f" tokenchars '{marks}'"
+
+    placeholders = ', '.join(['?'] * (len(columns) + 1))
+    insert = f"INSERT INTO {ftsTable} (rowid, {', '.join(columns)}) VALUES ({placeholders});"
+    cursor = connection.cursor()
+    try:
+        cursor.execute(create_search_index_info_table)
+        cursor.execute(f"DROP TABLE IF EXISTS {ftsTable};")
+        cursor.execute(f"CREATE VIRTUAL TABLE {ftsTable} USING fts5({', '.join(columns)}, tokenize=\"{tokenize}\");")
+        with instrument.timedQuery(insert, 'sql.search.index'):
+            cursor.executemany(insert, foldedRows)
+        rowCount, maxId = getTableState(connection, table)
+        cursor.execute(f"REPLACE INTO {search_index_info_table} (table_name, row_count, max_id) VALUES (?, ?, ?);",
+                       (table, rowCount, maxId))
+        connection.commit()
+    except Error as e:
+        connection.rollback()
+        db.logQueryError("buildSearchIndex", e, insert)
+        if 'readonly' in str(e): # e.g. opened with mode=ro but not query_only
+            raise getReadOnlyError(table) from e
+        raise
+
+# make sure search index for table exists and matches the table (tables are only changed by reloading books, which
+#   always changes count or max id).  On a read only connection the index must already have been built.
+def ensureSearchIndex(connection, table, force=False):
+    if force or not isSearchIndexCurrent(connection, table):
+        buildSearchIndex(connection, table)
+
+def ensureSearchIndexes(connection, force=False):
+    for table in ftsColumns.keys():
+        ensureSearchIndex(connection, table, force)
+
+# make FTS5 match expression for term in column.  Term is folded and searched as a phrase (so multiple words must
+#   be consecutive).  If prefix, last word of term only has to match the start of a word.
+def getMatchQuery(term, column, prefix=False):
+    phrase = text.foldText(term).replace('"', '""')
+    query = f'{column} : "{phrase}"'
+    if prefix:
+        query += '*'
+    return query
+
+def getWordsTable(searchOriginal):
+    return db.original_words_table if searchOriginal else db.target_words_table
+
+def getWordsColumn(searchLemma):
+    return 'lemma' if searchLemma else 'word'
+
+def searchWords(connection, term, searchOriginal = False, searchLemma = False, prefix = False, maxRows = None):
+    """
+    find words matching term ignoring accents and case
+    :param term: word to find
+    :param searchOriginal: if True search original language words, otherwise target language words
+    :param searchLemma: if True search lemma of original language words
+    :param prefix: if True match words starting with term
+    :param maxRows: optional limit
+    :return: list of word records (same as db.findWord)
+    """
+    table = getWordsTable(searchOriginal)
+    ensureSearchIndex(connection, table)
+    query = f"""SELECT w.* FROM {getFtsTable(table)} f JOIN {table} w ON w.id = f.rowid
+WHERE {getFtsTable(table)} MATCH ?
+ORDER BY w.id"""
+    if maxRows is not None:
+        query += f"\nLIMIT {maxRows}"
+    return fetchRecordsForQuery(connection, query, [getMatchQuery(term, getWordsColumn(searchLemma), prefix)])
+
+def searchWordsBatch(connection, terms, searchOriginal = False, searchLemma = False, prefix = False, chunkSize = 200):
+    """
+    find words for each of terms, doing many terms in each query
+    :return: dict of term mapped to list of word records (ordered by id)
+    """
+    table = getWordsTable(searchOriginal)
+    ensureSearchIndex(connection, table)
+    ftsTable = getFtsTable(table)
+    column = getWordsColumn(searchLemma)
+    results = { term: [] for term in terms }
+    uniqueTerms = list(results.keys())
+    for i in range(0, len(uniqueTerms), chunkSize):
+        chunk = uniqueTerms[i:i + chunkSize]
+        selects = [ f"SELECT {j} AS term_index, w.* FROM {ftsTable} f JOIN {table} w ON w.id = f.rowid WHERE {ftsTable} MATCH ?"
+                    for j in range(len(chunk)) ]
+        query = '\nUNION ALL\n'.join(selects) + "\nORDER BY term_index, id"
+        params = [ getMatchQuery(term, column, prefix) for term in chunk ]
+        for record in fetchRecordsForQuery(connection, query, params):
+            term = chunk[record.pop('term_index')]
+            results[term].append(record)
+    return results
+
+def searchAlignments(connection, phrase, searchOriginal = False, prefix = False, maxRows = None):
+    """
+    find alignments whose original (or target) text contains phrase, ignoring accents and case
+    :return: list of alignment records
+    """
+    table = db.alignment_table
+    ensureSearchIndex(connection, table)
+    column = 'orig_words_txt' if searchOriginal else 'target_words_txt'
+    query = f"""SELECT a.* FROM {getFtsTable(table)} f JOIN {table} a ON a.id = f.rowid
+WHERE {getFtsTable(table)} MATCH ?
+ORDER BY a.id"""
+    if maxRows is not None:
+        query += f"\nLIMIT {maxRows}"
+    return fetchRecordsForQuery(connection, query, [getMatchQuery(phrase, column, prefix)])
+
+def fetchRecordsForQuery(connection, query, params):
+    cursor = connection.cursor()
+    cursor.row_factory = sqlite3.Row
+    try:
+        cursor.execute(query, params)
+        return [ dict(row) for row in cursor.fetchall() ]
+    except Error as e:
+        db.logQueryError("fetchRecordsForQuery", e, query)
+        return []
+
+def findLemmasAlignedWithTargetWords(connection, words, prefix = False):
+    """
+    for each of target words find the lemmas of single original word alignments that contain it
+    :return: dict of word mapped to list of lemmas (one for each alignment)
+    """
+    wordsForTerms = searchWordsBatch(connection, words, searchOriginal=False, prefix=prefix)
+    alignmentIds = [ word['alignment_id'] for found in wordsForTerms.values() for word in found
+                     if word['alignment_id'] is not None ]
+    alignmentsById = db.fetchRecordsByIds(connection, alignmentIds, db.alignment_table)
+
+    lemmas = {}
+    for term, found in wordsForTerms.items():
+        lemmas[term] = []
+        for word in found:
+            alignment = alignmentsById.get(word['alignment_id'])
+            if alignment:
+                origWords = json.loads(alignment['orig_lang_words'])
+                if len(origWords) == 1:
+                    lemmas[term].append(origWords[0]['lemma'])
+    return lemmas
+
+# search version of db.findUniqueLemmasAlignedWithTargetWords - looks up all of the space separated words in
+#   wordList at once, ignoring accents and case
+def findUniqueLemmasAlignedWithTargetWords(connection, wordList, threshold = 1, prefix = False):
+    words = wordList.split(' ')
+    lemmasForWords = findLemmasAlignedWithTargetWords(connection, words, prefix)
+    lemmas = []
+    for word in words:
+        lemmas.extend(lemmasForWords[word])
+    return db.getUnique(threshold, lemmas)
+
+def saveUniqueLemmasAlignedWithTargetWords(connection, keyTermsPath, wordList, threshold = 2, prefix = False):
+    data = file.initJsonFile(keyTermsPath)
+    unique = findUniqueLemmasAlignedWithTargetWords(connection, wordList, threshold, prefix)
+    data[wordList] = unique # add unique words
+    file.writeJsonFile(keyTermsPath, data) # update file
+    return unique
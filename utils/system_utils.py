@@ -2,6 +2,11 @@ import sys
 import os
 import platform
 import subprocess
+import json
+import atexit
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
 
 
 def printSystemInfo():
@@ -30,30 +35,140 @@ def downloadAndProcessResource(cfg, base_url_of_resource, destination_folder, la
     cmd = createNodeDownloadCommand(cfg, base_url_of_resource, destination_folder, languageId, resourceId, version, resource_name)
     runNodeCommand(cmd)
 
+NODE_FOLDER = './node_stuff'
+
+class NodeCommandError(Exception):
+    def __init__(self, cmd, returncode, stderr):
+        super().__init__(f"{cmd} failed with return code {returncode}")
+        self.cmd = cmd
+        self.returncode = returncode
+        self.stderr = stderr
+
+class UsfmConversionError(Exception):
+    def __init__(self, sourceUsfmPath, outputJsonPath, error):
+        super().__init__(error)
+        self.sourceUsfmPath = sourceUsfmPath
+        self.outputJsonPath = outputJsonPath
+        self.error = error
+
 def createNodeUsfmConvertCommand(sourceUsfmPath, outputJsonPath):
     cmd = ['node','./parseUsfmFile.js']
-    sourceUsfmPath = sourceUsfmPath.replace('./', '../')
-    outputJsonPath = outputJsonPath.replace('./', '../')
-    cmd.extend([sourceUsfmPath, outputJsonPath])
+    cmd.extend([os.path.abspath(sourceUsfmPath), os.path.abspath(outputJsonPath)])
     return cmd
 
+class UsfmConversionWorker:
+    """
+    Long running node process (node_stuff/usfmWorker.js) that converts usfm books to json.  Jobs are sent one per
+    line on stdin and results read back one per line on stdout.
+    """
+
+    def __init__(self):
+        self.nextId = 1
+        self.lock = threading.Lock()
+        self.process = subprocess.Popen(['node', './usfmWorker.js'],
+                                        cwd=NODE_FOLDER,
+                                        stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE,
+                                        universal_newlines=True,
+                                        encoding='utf-8',
+                                        bufsize=1)
+
+    def convert(self, sourceUsfmPath, outputJsonPath):
+        with self.lock:
+            if self.process.poll() is not None:
+                raise NodeCommandError(self.process.args, self.process.returncode, 'usfm worker exited')
+
+            job = {
+                'id': self.nextId,
+                'sourceUsfmPath': os.path.abspath(sourceUsfmPath),
+                'outputJsonPath': os.path.abspath(outputJsonPath)
+            }
+            self.nextId += 1
+            self.process.stdin.write(json.dumps(job, ensure_ascii = False) + '\n')
+            self.process.stdin.flush()
+            line = self.process.stdout.readline()
+
+        if not line:
+            raise NodeCommandError(self.process.args, self.process.poll(), 'usfm worker exited')
+        result = json.loads(line)
+        if not result['success']:
+            raise UsfmConversionError(sourceUsfmPath, outputJsonPath, result['error'])
+        return result
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+sharedUsfmWorker = None
+
+def getSharedUsfmWorker():
+    global sharedUsfmWorker
+    if sharedUsfmWorker is None:
+        sharedUsfmWorker = UsfmConversionWorker()
+        atexit.register(sharedUsfmWorker.close)
+    return sharedUsfmWorker
+
 def convertUsfmToJson(sourceUsfmPath, outputJsonPath):
-    cmd = createNodeUsfmConvertCommand(sourceUsfmPath, outputJsonPath)
-    runNodeCommand(cmd)
+    print(f"Converting {sourceUsfmPath} to {outputJsonPath}")
+    getSharedUsfmWorker().convert(sourceUsfmPath, outputJsonPath)
+
+# convert list of (sourceUsfmPath, outputJsonPath) using maxWorkers node workers, each started once.
+#   Returns list of results in job order: {'sourceUsfmPath', 'outputJsonPath', 'success', 'error'}
+def convertUsfmBooksToJson(jobs, maxWorkers=2):
+    workerCount = max(1, min(maxWorkers, len(jobs)))
+    workers = [ UsfmConversionWorker() for i in range(workerCount) ]
+    idleWorkers = queue.Queue()
+    for worker in workers:
+        idleWorkers.put(worker)
+
+    def convertJob(index):
+        sourceUsfmPath, outputJsonPath = jobs[index]
+        worker = idleWorkers.get()
+        result = {
+            'sourceUsfmPath': sourceUsfmPath,
+            'outputJsonPath': outputJsonPath,
+            'success': True,
+            'error': None
+        }
+        try:
+            worker.convert(sourceUsfmPath, outputJsonPath)
+            print(f"Converted {sourceUsfmPath}")
+        except (UsfmConversionError, NodeCommandError) as e:
+            print(f"convertUsfmBooksToJson - {e}")
+            result['success'] = False
+            result['error'] = str(e)
+        finally:
+            idleWorkers.put(worker)
+        return result
+
+    try:
+        with ThreadPoolExecutor(max_workers=workerCount) as executor:
+            results = list(executor.map(convertJob, range(len(jobs))))
+    finally:
+        for worker in workers:
+            worker.close()
+    return results
 
 def runNodeCommand(cmd):
-    cwd = os.getcwd()
-    os.chdir("./node_stuff")
     print(f"Downloading and processing {cmd}")
     process = subprocess.run(cmd,
+                             cwd=NODE_FOLDER,
                              stderr=subprocess.PIPE,
                              universal_newlines=True)
-    os.chdir(cwd)
     returncode = process.returncode
     if returncode > 0:
         print("\n\n################\nError\n################")
         print(process.stderr)
-        exit(returncode)
+        raise NodeCommandError(cmd, returncode, process.stderr)
 
     print(f"Finished processing {cmd}")
-
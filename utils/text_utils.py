@@ -0,0 +1,36 @@
+import re
+import unicodedata
+
+# combining marks that are folded away for matching: greek/latin/cyrillic accents (and greek breathings) and hebrew
+#   points and cantillation.  Marks of other scripts (e.g. devanagari vowel signs) change the letter so are kept.
+foldedMarks = re.compile('[\u0300-\u036f\u0591-\u05bd\u05bf\u05c1\u05c2\u05c4\u05c5\u05c7]')
+cyrillicShortI = re.compile('([иИ])\u0306') # й is a separate letter, not и with an accent
+
+def normalizeText(text, form='NFC'):
+    if text is None:
+        return ''
+    return unicodedata.normalize(form, text)
+
+def stripAccents(text):
+    decomposed = normalizeText(text, 'NFD')
+    decomposed = cyrillicShortI.sub('\\1\u0000', decomposed) # protect breve of й
+    stripped = foldedMarks.sub('', decomposed).replace('\u0000', '\u0306')
+    return unicodedata.normalize('NFC', stripped)
+
+# normalize text for matching regardless of unicode composition and case, but keeping accents
+def getNormalizedKey(text):
+    return normalizeText(normalizeText(text).casefold())
+
+# fold text for matching regardless of accents and case (e.g. 'Θεοῦ' -> 'θεου')
+def foldText(text):
+    return stripAccents(text).casefold()
+
+# get combining marks used in texts.  Tokenizers like sqlite's unicode61 split words at these unless told otherwise,
+#   which breaks up words in scripts such as devanagari
+def getCombiningMarks(texts):
+    marks = set()
+    for text in texts:
+        for char in text:
+            if unicodedata.category(char).startswith('M'):
+                marks.add(char)
+    return ''.join(sorted(marks))